@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#
+# List built-ins on a large list of numbers, stored boxed (one LiNumber per
+# element, `LiList`) and unboxed (`LiArray`).
+#
+#     python benchmarks/bench_arrays.py [--size N]
+#
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li, KEYWORDS  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1000000)
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    words = KEYWORDS[li.lang]
+    catalog = li.CATALOG
+    raw = list(range(opts.size))
+    boxed = li.LiList([li.Lit(x) for x in raw], None, li)
+    unboxed = li.Lit(raw)
+    assert isinstance(unboxed, li.LiArray)
+    env = li.Scope({}, None)
+    positive = li.LiFunction(li.Parse('f:fonc(x) { >(x 0) }')['f'], env, li)
+    double = li.LiFunction(li.Parse('f:fonc(x) { *(x 2) }')['f'], env, li)
+
+    cases = [
+        ('taille', 'len', lambda l: [l]),
+        ('cut', 'cut', lambda l: [l, li.Lit(opts.size // 2)]),
+        ('+ (concat)', '+', lambda l: [l, l]),
+        ('fold +', 'fold', lambda l: [words['+'], l]),
+        ('fold *', 'fold', lambda l: [words['*'], l]),
+        ('map round', 'map', lambda l: [words['round'], l]),
+        ('map fonc', 'map', lambda l: [double, l]),
+        ('filter fonc', 'filter', lambda l: [positive, l]),
+    ]
+    print('%-14s %12s %12s %10s' % ('operation', 'LiList (s)', 'LiArray (s)', 'speedup'))
+    for (label, name, make_args) in cases:
+        func = catalog[words[name]]
+        times = []
+        for seq in (boxed, unboxed):
+            args = make_args(seq)
+            start = time.perf_counter()
+            # map and filter are lazy, read `val` to run them
+            li.Lit(func(args)).val
+            times.append(time.perf_counter() - start)
+        print('%-14s %12.3f %12.3f %9.1fx' % (label, times[0], times[1], times[0] / times[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# Many I/O-bound scripts at once with `Li.RunAsync`.
+#
+# Each script waits a few times on a simulated I/O call (`attends(ms)`, a
+# built-in added the way `import` adds them) and does a little work in
+# between. They are run one after the other with `Run` and a blocking
+# built-in (on a sample of them, the rest would only take longer), then all
+# together on one event loop and one interpreter with `RunAsync` and a
+# coroutine built-in. The results must match.
+#
+#     python benchmarks/bench_async.py [-n SCRIPTS] [--waits N] [--ms MS] [--sample N]
+#
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+SCRIPT = '''
+main: fonc() {
+    total: 0
+    i: 0
+    tantque <(i waits) {
+        total: +(total attends(ms) id)
+        i: +(i 1)
+    }
+    total
+}
+'''
+
+
+def interpreter(wait):
+    """
+    An interpreter with `wait` as the built-in `attends`.
+
+    :param wait:
+    :return:
+    """
+    li = Li()
+    li.CATALOG['attends'] = wait
+    li.RESERVED.append('attends')
+    return li
+
+
+def blocking(args):
+    time.sleep(args[0].val / 1000)
+    return args[0].val
+
+
+async def waiting(args):
+    await asyncio.sleep(args[0].val / 1000)
+    return args[0].val
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--scripts', type=int, default=1000)
+    parser.add_argument('--waits', type=int, default=5, help='I/O calls per script (default: 5)')
+    parser.add_argument('--ms', type=int, default=10, help='duration of an I/O call (default: 10)')
+    parser.add_argument('--sample', type=int, default=20, help='scripts run serially (default: 20)')
+    opts = parser.parse_args(argv)
+
+    def variables(i):
+        return {'id': i, 'waits': opts.waits, 'ms': opts.ms}
+
+    li = interpreter(blocking)
+    program = li.Load(SCRIPT)
+    sample = min(opts.sample, opts.scripts)
+    start = time.perf_counter()
+    serial = [li.Run(program, variables(i)).Get() for i in range(sample)]
+    serial_s = time.perf_counter() - start
+
+    li = interpreter(waiting)
+
+    async def run_all():
+        return await asyncio.gather(*[li.RunAsync(program, variables(i)) for i in range(opts.scripts)])
+
+    start = time.perf_counter()
+    results = [r.Get() for r in asyncio.run(run_all())]
+    async_s = time.perf_counter() - start
+
+    print('%d scripts, %d waits of %d ms each' % (opts.scripts, opts.waits, opts.ms))
+    print('%-8s %8s %10s %12s' % ('mode', 'scripts', 'time (s)', 'scripts/s'))
+    print('%-8s %8d %10.2f %12.1f' % ('serial', sample, serial_s, sample / serial_s))
+    print('%-8s %8d %10.2f %12.1f' % ('async', opts.scripts, async_s, opts.scripts / async_s))
+    if results[:sample] != serial:
+        print('results differ')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
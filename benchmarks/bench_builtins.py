@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+#
+# Cost of one call of each built-in of `CATALOG`, including the wrapping of
+# the result into a Li value done at every call site.
+#
+# Built-ins that do I/O (files, console, import) or start processes are
+# listed but not timed.
+#
+#     python benchmarks/bench_builtins.py [-n CALLS] [name ...]
+#
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li, KEYWORDS  # noqa: E402
+
+SKIPPED = ['open', 'read', 'write', 'close', 'print', 'println', 'scanf', 'import',
+           'fopen', 'fread', 'freadline', 'lines', 'fwrite', 'fclose', 'mmap', 'pmap', 'pfilter']
+
+
+def cases(li):
+    """
+    Argument lists to time, by the canonical (untranslated) name of the
+    built-in.
+
+    :param li:
+    :return:
+    """
+    lit = li.Lit
+    env = li.Scope({}, None)
+    identity = li.LiFunction(li.Parse('f:fonc(x) { x }')['f'], env, li)
+    add = li.LiFunction(li.Parse('f:fonc(x y) { +(x y) }')['f'], env, li)
+    numbers = [lit(i) for i in range(10)]
+    table = li.Parse('d: {a: 1, b: 2, c: 3, d: 4, e: 5}')['d']
+    table = li._Eval(table, env)
+    return {
+        '+': [('2 ints', [lit(3), lit(4)]),
+              ('2 floats', [lit(3.5), lit(4.25)]),
+              ('5 ints', [lit(i) for i in range(5)]),
+              ('2 strings', [lit('ab'), lit('cd')]),
+              ('5 strings', [lit(c) for c in 'abcde']),
+              ('2 lists', [lit([1, 2]), lit([3, 4])])],
+        '-': [('2 ints', [lit(3), lit(4)]),
+              ('5 ints', [lit(i) for i in range(5)])],
+        '*': [('2 ints', [lit(3), lit(4)]),
+              ('2 floats', [lit(3.5), lit(4.25)])],
+        '/': [('2 ints', [lit(3), lit(4)]),
+              ('2 floats', [lit(3.5), lit(4.25)])],
+        '=': [('2 ints', [lit(3), lit(3)]),
+              ('2 strings', [lit('ab'), lit('ab')]),
+              ('4 ints', [lit(3)] * 4)],
+        '!': [('2 ints', [lit(3), lit(4)])],
+        '<': [('2 ints', [lit(3), lit(4)]),
+              ('4 ints', [lit(i) for i in range(4)])],
+        '>': [('2 ints', [lit(3), lit(4)])],
+        '<=': [('2 ints', [lit(3), lit(4)])],
+        '>=': [('2 ints', [lit(3), lit(4)])],
+        'len': [('list of 10', [lit(list(numbers))]),
+                ('string', [lit('abcdef')])],
+        'ins': [('append to list', [lit([]), lit(2 ** 62), lit(1)])],
+        'del': [('list', None)],
+        'cut': [('list of 10', [lit(list(numbers)), lit(5)])],
+        'map': [('identity over 10', [identity, lit(list(numbers))])],
+        'fold': [('add over 10', [add, lit(list(numbers))])],
+        'filter': [('identity over 10', [identity, lit(list(numbers))])],
+        'assert': [('2 ints', [lit(3), lit(3)])],
+        'round': [('float', [lit(3.7)])],
+        'type': [('number', [lit(3)])],
+        'memo': [('function', [add])],
+        'memo_stats': [('function', [li._Memo([add])])],
+        'join': [('10 strings', [lit([lit(c) for c in 'abcdefghij']), lit(',')]),
+                 ('10 numbers', [lit(list(numbers))])],
+        'split': [('5 words', [lit('a b c d e')]),
+                  ('separator', [lit('a,b,c,d,e'), lit(',')])],
+        'find': [('string', [lit('abcdef'), lit('de')])],
+        'replace': [('string', [lit('a.b.c.d'), lit('.'), lit('/')])],
+        'format': [('2 fields', [lit('{} = {:.2f}'), lit('x'), lit(2.5)])],
+        'keys': [('dict of 5', [table])],
+        'values': [('dict of 5', [table])],
+        'items': [('dict of 5', [table])],
+        'has': [('dict of 5', [table, lit('c')])],
+        'merge': [('2 dicts of 5', [table, table])],
+        'update': [('dict of 5', [table, table]),
+                   ('2 pairs', [table, lit([lit([lit('a'), 1]), lit([lit('b'), 2])])])],
+        'group': [('identity over 10', [identity, lit(list(numbers))])],
+    }
+
+
+def bench(li, func, args, calls):
+    """
+    Time `calls` calls of `func(args)` wrapped by `Li.Lit`, in ns per call.
+
+    :param li:
+    :param func:
+    :param args:
+    :param calls:
+    :return:
+    """
+    lit = li.Lit
+    start = time.perf_counter()
+    for _ in range(calls):
+        lit(func(args))
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--calls', type=int, default=100000)
+    parser.add_argument('names', nargs='*', help='canonical names of the built-ins to time')
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    words = KEYWORDS[li.lang]
+    table = cases(li)
+    print('%-10s %-10s %-20s %12s' % ('built-in', 'keyword', 'arguments', 'ns / call'))
+    for name in words:
+        if opts.names and name not in opts.names:
+            continue
+        func = li.CATALOG[words[name]]
+        if name in SKIPPED:
+            print('%-10s %-10s %-20s %12s' % (name, words[name], '-', 'skipped'))
+            continue
+        for (label, args) in table[name]:
+            if args is None:
+                # `del` consumes its list, time it on a fresh one each call
+                args = [li.Lit(list(range(opts.calls))), li.Lit(-1)]
+            print('%-10s %-10s %-20s %12.1f' % (name, words[name], label, bench(li, func, args, opts.calls)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+#
+# Startup time of `li.py` on synthetic scripts without the parse cache, with
+# an empty cache (cold) and with the tree already cached (warm).
+#
+#     python benchmarks/bench_cache.py [--start KB] [--steps N]
+#
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_parse import synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LI = os.path.join(ROOT, 'li.py')
+
+
+def run(script, cache=None):
+    """
+    Wall time of one `li.py` process.
+
+    :param script:
+    :param cache:
+    :return:
+    """
+    cmd = [sys.executable, LI, script]
+    if cache is not None:
+        cmd[2:2] = ['--cache', cache]
+    start = time.perf_counter()
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--start', type=int, default=64, help='smallest size in KB')
+    parser.add_argument('--steps', type=int, default=5)
+    parser.add_argument('-n', '--runs', type=int, default=3)
+    opts = parser.parse_args(argv)
+
+    work = tempfile.mkdtemp(prefix='li-bench-cache-')
+    try:
+        script = os.path.join(work, 'script.l')
+        cache = os.path.join(work, 'cache')
+        print('%10s %12s %12s %12s %10s' % ('size (KB)', 'no cache (s)', 'cold (s)', 'warm (s)', 'speedup'))
+        size = opts.start * 1024
+        for _ in range(opts.steps):
+            with open(script, 'w') as f:
+                f.write(synthetic(size))
+            plain = min(run(script) for _ in range(opts.runs))
+            cold = []
+            for _ in range(opts.runs):
+                shutil.rmtree(cache, ignore_errors=True)
+                cold.append(run(script, cache))
+            warm = min(run(script, cache) for _ in range(opts.runs))
+            print('%10d %12.3f %12.3f %12.3f %9.1fx' % (size // 1024, plain, min(cold), warm, plain / warm))
+            size *= 2
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == '__main__':
+    main()
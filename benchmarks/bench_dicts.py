@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+#
+# Dict built-ins against their emulation with lists and linear scans.
+#
+# - lookup: `n` [key value] pairs are loaded into a dict with `actualise` and
+#           `n` keys (half of them missing) are looked up with `contient`,
+#           against a scan of the list of pairs for each key
+# - group:  `n` numbers are grouped under ten keys (x minus x/10 rounded,
+#           times 10) with `groupe`, against a list of keys scanned for each
+#           number
+#
+# Both versions must give the same result. Reports the time of each and the
+# speedup of the built-ins.
+#
+#     python benchmarks/bench_dicts.py [-n SIZE] [-e ENGINE]
+#
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+PAIRS = '''
+pairs: fonc() {
+    l: []
+    i: 0
+    tantque <(i n) {
+        ins(l i [formate("k{}" *(i 2)) i])
+        i: +(i 1)
+    }
+    l
+}
+'''
+
+LOOKUP_NATIVE = PAIRS + '''
+main: fonc() {
+    d: actualise({} pairs())
+    total: 0
+    i: 0
+    tantque <(i n) {
+        k: formate("k{}" i)
+        if contient(d k) { total: +(total d(k)) }
+        i: +(i 1)
+    }
+    total
+}
+'''
+
+LOOKUP_LISTS = PAIRS + '''
+main: fonc() {
+    l: pairs()
+    size: taille(l)
+    total: 0
+    i: 0
+    tantque <(i n) {
+        k: formate("k{}" i)
+        j: 0
+        tantque <(j size) {
+            if =(l(j)(0) k) {
+                total: +(total l(j)(1))
+                j: size
+            } else {
+                j: +(j 1)
+            }
+        }
+        i: +(i 1)
+    }
+    total
+}
+'''
+
+GROUP_NATIVE = '''
+main: fonc() {
+    l: []
+    i: 0
+    tantque <(i n) { ins(l i i) i: +(i 1) }
+    g: groupe(fonc(x) { -(x *(round(/(x 10)) 10)) } l)
+    taille(g(0))
+}
+'''
+
+GROUP_LISTS = '''
+main: fonc() {
+    l: []
+    i: 0
+    tantque <(i n) { ins(l i i) i: +(i 1) }
+    keys: []
+    groups: []
+    i: 0
+    tantque <(i n) {
+        x: l(i)
+        k: -(x *(round(/(x 10)) 10))
+        j: 0
+        found: -1
+        tantque <(j taille(keys)) {
+            if =(keys(j) k) { found: j j: taille(keys) } else { j: +(j 1) }
+        }
+        if =(found -1) {
+            ins(keys taille(keys) k)
+            ins(groups taille(groups) [x])
+        } else {
+            ins(groups(found) taille(groups(found)) x)
+        }
+        i: +(i 1)
+    }
+    j: 0
+    tantque !(keys(j) 0) { j: +(j 1) }
+    taille(groups(j))
+}
+'''
+
+
+def run(li, script, n, engine):
+    """
+    Run `script` for size `n`, return (result, seconds).
+
+    :param li:
+    :param script:
+    :param n:
+    :param engine:
+    :return:
+    """
+    program = li.Load(script)
+    start = time.perf_counter()
+    result = li.Run(program, {'n': n}, engine=engine).Get()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--size', type=int, default=300)
+    parser.add_argument('-e', '--engine', default='tree', choices=['tree', 'closure', 'stack', 'vm'])
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    failed = False
+    print('%d elements, %s engine' % (opts.size, opts.engine))
+    print('%-8s %12s %12s %9s' % ('workload', 'lists (ms)', 'dict (ms)', 'speedup'))
+    for (name, emulated, native) in [('lookup', LOOKUP_LISTS, LOOKUP_NATIVE), ('group', GROUP_LISTS, GROUP_NATIVE)]:
+        expected, slow = run(li, emulated, opts.size, opts.engine)
+        result, fast = run(li, native, opts.size, opts.engine)
+        if result != expected:
+            failed = True
+            print('%-8s results differ: %r != %r' % (name, result, expected))
+            continue
+        print('%-8s %12.1f %12.1f %8.1fx' % (name, slow * 1e3, fast * 1e3, slow / fast))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+#
+# Latency of evaluating a small rule per request when Li is embedded.
+#
+# - fresh:   a new `Li`, `Parse` and `Eval` per request (what the CLI does)
+# - program: one interpreter, the script loaded once with `Load`, `Run` per
+#            request with the request's variables
+# - pool:    `Li.Pool` lending warm interpreters to a thread pool
+#
+# Every mode must give the same decisions. Reports the evaluations per second
+# and the median and 99th percentile latency.
+#
+#     python benchmarks/bench_embed.py [-n REQUESTS] [-t THREADS] [-e ENGINE]
+#
+
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+RULE = '''
+limit: 500
+fee: fonc(x) { *(x 0.02) }
+main: fonc() {
+    if >(+(amount fee(amount)) limit) { "review" } else { "accept" }
+}
+'''
+
+
+def fresh(amount, engine):
+    """
+    One request the way the command line runs a script.
+
+    :param amount:
+    :param engine:
+    :return:
+    """
+    sink = io.StringIO()
+    li = Li(output=Li.Output(sink))
+    tree = li.Parse(RULE + 'amount: %d\n' % amount)
+    with contextlib.redirect_stdout(sink):
+        return li.Eval(tree, engine=engine).val
+
+
+def measure(requests, call, threads=1):
+    """
+    Run `call(i)` for i in range(requests), return (results, seconds,
+    latencies).
+
+    :param requests:
+    :param call:
+    :param threads:
+    :return:
+    """
+    def timed(i):
+        start = time.perf_counter()
+        result = call(i)
+        return result, time.perf_counter() - start
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            done = list(pool.map(timed, range(requests)))
+    else:
+        done = [timed(i) for i in range(requests)]
+    spent = time.perf_counter() - start
+    return [r for (r, _) in done], spent, sorted([t for (_, t) in done])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--requests', type=int, default=10000)
+    parser.add_argument('-t', '--threads', type=int, default=4)
+    parser.add_argument('-e', '--engine', default='tree', choices=['tree', 'closure', 'stack', 'vm'])
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    program = li.Load(RULE)
+    pool = Li.Pool(opts.threads)
+    modes = [
+        ('fresh', lambda i: fresh(i % 1000, opts.engine), 1),
+        ('program', lambda i: li.Run(program, {'amount': i % 1000}, engine=opts.engine).Get(), 1),
+        ('pool', lambda i: pool.Run(program, {'amount': i % 1000}, engine=opts.engine).Get(), opts.threads),
+    ]
+
+    expected = None
+    failed = False
+    print('%-10s %8s %12s %10s %10s' % ('mode', 'threads', 'evals/s', 'p50 (us)', 'p99 (us)'))
+    for (name, call, threads) in modes:
+        results, spent, latencies = measure(opts.requests, call, threads)
+        if expected is None:
+            expected = results
+        elif results != expected:
+            failed = True
+            print('%-10s results differ' % name)
+            continue
+        print('%-10s %8d %12.0f %10.1f %10.1f' % (
+            name, threads, opts.requests / spent,
+            latencies[len(latencies) // 2] * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+#
+# Differential run and timing of the evaluation engines.
+#
+# Every script is run once per engine; the output of each engine must match
+# the output of the tree-walking reference engine, hold no failed `assert`
+# and no exception, then the best of N timed runs is reported. The scripts
+# of `BUDGETS` run under their budget and must end with a budget error.
+# The reference output must also come back from `Run`, `RunAsync`, every
+# buffering of `Li.Output` and a tree read from a `ParseCache`.
+#
+# The scripts run in a temporary directory, where they may write files.
+#
+#     python benchmarks/bench_engines.py [-n RUNS] [-e ENGINE ...] [script.l ...]
+#
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+REFERENCE = 'tree'
+ENGINES = ['tree', 'closure', 'stack', 'vm']
+DEFAULT_SCRIPTS = [
+    os.path.join(ROOT, 'tests', 'sort.l'),
+    os.path.join(ROOT, 'tests', 'count.l'),
+    os.path.join(ROOT, 'tests', 'test.l'),
+    os.path.join(ROOT, 'tests', 'constants.l'),
+    os.path.join(ROOT, 'tests', 'dicts.l'),
+    os.path.join(ROOT, 'tests', 'streams.l'),
+    os.path.join(ROOT, 'tests', 'strings.l'),
+    os.path.join(ROOT, 'tests', 'memo.l'),
+    os.path.join(ROOT, 'tests', 'parallel.l'),
+    os.path.join(ROOT, 'tests', 'files.l'),
+    os.path.join(ROOT, 'tests', 'budget.l'),
+    os.path.join(ROOT, 'tests', 'steps.l'),
+]
+# Scripts that must be stopped by a budget
+BUDGETS = {
+    'budget.l': Li.Budget(size=1000),
+    'steps.l': Li.Budget(steps=10000),
+}
+
+
+def run(tree, engine, budget=None):
+    """
+    Run a parsed program on a fresh interpreter, return (output, seconds).
+
+    :param tree:
+    :param engine:
+    :param budget:
+    :return:
+    """
+    sink = io.StringIO()
+    li = Li()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        li.Eval(tree, engine=engine, budget=budget)
+    return sink.getvalue(), time.perf_counter() - start
+
+
+def check(output, budget):
+    """
+    What is wrong with the output of a script, None if nothing.
+
+    :param output:
+    :param budget:
+    :return:
+    """
+    if '[x] Assert failed' in output:
+        return 'an assert failed'
+    lines = output.splitlines()
+    if budget is not None:
+        if not lines or not lines[-1].startswith('Exception: [$]'):
+            return 'not stopped by its budget'
+    elif 'Exception: ' in output:
+        return 'raised an exception'
+    return None
+
+
+def printed(result):
+    """
+    The output of a `Result` as `Eval` prints it.
+
+    :param result:
+    :return:
+    """
+    if result.error is None:
+        return result.output
+    return result.output + 'Exception: %s\n' % result.error
+
+
+def embedded(code, budget, expected, cache_dir):
+    """
+    Names of the ways of running `code` from Python whose output differs
+    from `expected`.
+
+    :param code:
+    :param budget:
+    :param expected:
+    :param cache_dir:
+    :return:
+    """
+    failed = []
+    li = Li()
+    if printed(li.Run(li.Load(code), budget=budget)) != expected:
+        failed.append('Run')
+    li = Li()
+    if printed(asyncio.run(li.RunAsync(li.Load(code), budget=budget))) != expected:
+        failed.append('RunAsync')
+    for mode in Li.Output.MODES:
+        sink = Li.Output(io.StringIO(), mode)
+        li = Li(output=sink)
+        li.Eval(li.Parse(code), budget=budget)
+        if sink.Getvalue() != expected:
+            failed.append('Output %s' % mode)
+    cache = Li.ParseCache(cache_dir)
+    Li().Parse(code, cache)
+    tree = Li().Parse(code, cache)
+    if (cache.hits, cache.misses) != (1, 1) or run(tree, REFERENCE, budget)[0] != expected:
+        failed.append('ParseCache')
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=20)
+    parser.add_argument('-e', '--engine', action='append', choices=ENGINES)
+    parser.add_argument('scripts', nargs='*', default=DEFAULT_SCRIPTS)
+    opts = parser.parse_args(argv)
+    engines = opts.engine or ENGINES
+    scripts = [os.path.abspath(path) for path in opts.scripts]
+
+    failed = False
+    print('%-12s %-10s %12s %10s' % ('script', 'engine', 'best (ms)', 'speedup'))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work:
+        os.chdir(work)
+        try:
+            for (i, path) in enumerate(scripts):
+                name = os.path.basename(path)
+                budget = BUDGETS.get(name)
+                with open(path, 'r') as f:
+                    code = f.read()
+                tree = Li().Parse(code)
+                expected, _ = run(tree, REFERENCE, budget)
+                problem = check(expected, budget)
+                if problem is not None:
+                    failed = True
+                    print('%-12s %-10s %s' % (name, REFERENCE, problem))
+                for way in embedded(code, budget, expected, os.path.join(work, 'cache%d' % i)):
+                    failed = True
+                    print('%-12s %-10s output differs from %s' % (name, way, REFERENCE))
+                reference_time = None
+                for engine in [REFERENCE] + [e for e in engines if e != REFERENCE]:
+                    output, best = run(tree, engine, budget)
+                    if output != expected:
+                        failed = True
+                        print('%-12s %-10s output differs from %s' % (name, engine, REFERENCE))
+                        continue
+                    for _ in range(opts.runs - 1):
+                        best = min(best, run(tree, engine, budget)[1])
+                    if reference_time is None:
+                        reference_time = best
+                    print('%-12s %-10s %12.3f %9.2fx' % (name, engine, best * 1e3, reference_time / best))
+        finally:
+            os.chdir(cwd)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
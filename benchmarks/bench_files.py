@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+#
+# Throughput of the file built-ins: the raw `open`/`read`/`write` wrappers
+# over file descriptors against the buffered `fopen`/`fread`/`lines`/`fwrite`
+# built-ins and `mmap`.
+#
+#     python benchmarks/bench_files.py [--mb SIZE]
+#
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li, KEYWORDS  # noqa: E402
+
+LINE = 'a line of text with some words in it, 0123456789\n'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=float, default=8, help='size of the file read in MB')
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    words = KEYWORDS[li.lang]
+    catalog = li.CATALOG
+    lit = li.Lit
+
+    def builtin(name, *args):
+        return lit(catalog[words[name]](list(args)))
+
+    work = tempfile.mkdtemp(prefix='li-bench-files-')
+    try:
+        path = os.path.join(work, 'data.txt')
+        nlines = int(opts.mb * 1e6) // len(LINE)
+        with open(path, 'w') as f:
+            f.write(LINE * nlines)
+        size = os.path.getsize(path) / 1e6
+
+        def fd_lines():
+            # what a script can do with `read`: one byte at a time up to the line break
+            fd = builtin('open', lit(path))
+            n, one = 0, lit(1)
+            while True:
+                b = builtin('read', fd, one).val
+                if not b:
+                    break
+                if b == b'\n':
+                    n += 1
+            builtin('close', fd)
+            return n
+
+        def fd_chunks():
+            fd = builtin('open', lit(path))
+            chunk = lit(65536)
+            while builtin('read', fd, chunk).val:
+                pass
+            builtin('close', fd)
+
+        def fd_write():
+            out = os.path.join(work, 'out-fd.txt')
+            open(out, 'w').close()
+            fd = builtin('open', lit(out))
+            args = [fd, lit(LINE)]
+            write = catalog[words['write']]
+            for _ in range(nlines):
+                lit(write(args))
+            builtin('close', fd)
+
+        def buffered_write():
+            f = builtin('fopen', lit(os.path.join(work, 'out.txt')), lit('w'))
+            args = [f, lit(LINE)]
+            write = catalog[words['fwrite']]
+            for _ in range(nlines):
+                lit(write(args))
+            builtin('fclose', f)
+
+        last = li.LiFunction(li.Parse('f:fonc(a b) { b }')['f'], li.Scope({}, None), li)
+
+        cases = [
+            ('read, 1 byte per call', fd_lines, 0.02),
+            ('read, 64 KB chunks', fd_chunks, 1),
+            ('fread', lambda: builtin('fread', lit(path)), 1),
+            ('fread of an mmap', lambda: builtin('fread', builtin('mmap', lit(path))), 1),
+            ('taille(lines(path))', lambda: builtin('len', builtin('lines', lit(path))), 1),
+            ('taille(lines(mmap))', lambda: builtin('len', builtin('lines', builtin('mmap', lit(path)))), 1),
+            ('fold over lines(path)', lambda: builtin('fold', last, builtin('lines', lit(path))), 1),
+            ('write, 1 call per line', fd_write, 1),
+            ('fwrite, 1 call per line', buffered_write, 1),
+        ]
+        print('%-26s %10s %10s %10s' % ('case', 'MB', 'time (s)', 'MB/s'))
+        for (name, run, share) in cases:
+            # the slow cases only go through a part of the file
+            if share < 1:
+                with open(path, 'w') as f:
+                    f.write(LINE * int(nlines * share))
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            mb = size * share
+            if share < 1:
+                with open(path, 'w') as f:
+                    f.write(LINE * nlines)
+            print('%-26s %10.2f %10.3f %10.1f' % (name, mb, elapsed, mb / elapsed))
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == '__main__':
+    main()
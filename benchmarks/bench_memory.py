@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+#
+# Memory held by Li lists of numbers, compared with the same data in a plain
+# Python list.
+#
+#     python benchmarks/bench_memory.py [--size N]
+#
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+
+def measure(build):
+    """
+    Memory still allocated by the value `build()` returns, and the time it
+    takes to build it.
+
+    :param build:
+    :return: (bytes, seconds)
+    """
+    gc.collect()
+    start = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - start
+    del value
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return current, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1000000)
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    n = opts.size
+    identity = li.LiFunction({'params': ['x'], 'fonc': ['x']}, li.Scope({}, None), li)
+    cases = [
+        ('python list of ints', lambda: list(range(n))),
+        ('Li list of ints', lambda: li.Lit(list(range(n)))),
+        ('Li list of small ints', lambda: li.Lit([i % 100 for i in range(n)])),
+        ('Li list of floats', lambda: li.Lit([i + 0.5 for i in range(n)])),
+        ('Li list of booleans', lambda: li.Lit([i % 2 == 0 for i in range(n)])),
+        ('Li map over ints', lambda: li.Lit(li.CATALOG['map']([identity, li.Lit(list(range(n)))]))),
+    ]
+    baseline = None
+    print('%-24s %12s %10s %10s %10s' % ('case', 'MB', 'B / item', 'vs python', 'time (s)'))
+    for (name, build) in cases:
+        size, elapsed = measure(build)
+        baseline = baseline or size
+        print('%-24s %12.1f %10.1f %9.1fx %10.3f' % (name, size / 1e6, size / n, size / baseline, elapsed))
+
+
+if __name__ == '__main__':
+    main()
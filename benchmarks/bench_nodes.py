@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+#
+# Per-node evaluation overhead of the tree-walking interpreter.
+#
+# Runs each script several times, counts the `_Eval` calls it performs and
+# reports the average time spent per evaluated node.
+#
+#     python benchmarks/bench_nodes.py [-n RUNS] [script.l ...]
+#
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+DEFAULT_SCRIPTS = [
+    os.path.join(ROOT, 'tests', 'sort.l'),
+    os.path.join(ROOT, 'tests', 'count.l'),
+]
+
+
+def count_nodes(tree):
+    """
+    Run the program once with `_Eval` wrapped to count its invocations.
+
+    :param tree:
+    :return:
+    """
+    calls = [0]
+    original = Li._Eval
+
+    def counting(self, *args, **kwargs):
+        calls[0] += 1
+        return original(self, *args, **kwargs)
+
+    Li._Eval = counting
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            Li().Eval(tree)
+    finally:
+        Li._Eval = original
+    return calls[0]
+
+
+def bench(path, runs):
+    """
+
+    :param path:
+    :param runs:
+    :return:
+    """
+    with open(path, 'r') as f:
+        code = f.read()
+    tree = Li().Parse(code)
+    nodes = count_nodes(tree)
+    best = None
+    for _ in range(runs):
+        li = Li()
+        sink = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            li.Eval(tree)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return nodes, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=20)
+    parser.add_argument('scripts', nargs='*', default=DEFAULT_SCRIPTS)
+    opts = parser.parse_args(argv)
+
+    print('%-20s %10s %12s %14s' % ('script', 'nodes', 'best (ms)', 'per node (us)'))
+    for path in opts.scripts:
+        nodes, best = bench(path, opts.runs)
+        print('%-20s %10d %12.3f %14.3f' % (
+            os.path.basename(path), nodes, best * 1e3, best * 1e6 / nodes))
+
+
+if __name__ == '__main__':
+    main()
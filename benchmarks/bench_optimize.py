@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#
+# Effect of the constant folding pass (`Li.Optimize`) run by `Parse`.
+#
+# Every script is run on each engine with and without the pass; the outputs
+# must all match the unoptimized tree engine, then the best of N timed runs
+# is reported for both.
+#
+#     python benchmarks/bench_optimize.py [-n RUNS] [-e ENGINE ...] [script.l ...]
+#
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+ENGINES = ['tree', 'closure', 'stack', 'vm']
+DEFAULT_SCRIPTS = [
+    os.path.join(ROOT, 'tests', name) for name in sorted(os.listdir(os.path.join(ROOT, 'tests')))
+    if name.endswith('.l')
+]
+
+# Constant expressions, a constant condition and a literal list in a loop
+CONSTANTS = '''
+main:fonc() {
+    i:0 n:0
+    tantque <(i 20000) {
+        l:[1 2 3 4 "a" "b"]
+        n:+(n *(2 3) -(10 4) taille(l))
+        if =(1 1) { n:+(n 1) } else { n:0 }
+        i:+(i 1)
+    }
+    affiche_xa(n)
+}
+'''
+
+
+def run(source, engine, optimize):
+    """
+    Parse and run a script on a fresh interpreter, return (output, seconds,
+    number of rewrites).
+
+    :param source:
+    :param engine:
+    :param optimize:
+    :return:
+    """
+    sink = io.StringIO()
+    li = Li(optimize=optimize)
+    tree = li.Parse(source)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        li.Eval(tree, engine=engine)
+    return sink.getvalue(), time.perf_counter() - start, len(li.optimizations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('-e', '--engine', action='append', choices=ENGINES)
+    parser.add_argument('scripts', nargs='*', default=DEFAULT_SCRIPTS + [None])
+    opts = parser.parse_args(argv)
+    engines = opts.engine or ENGINES
+
+    failed = False
+    print('%-14s %-8s %9s %12s %12s %9s' % ('script', 'engine', 'rewrites', 'plain (ms)', 'folded (ms)', 'speedup'))
+    for path in opts.scripts:
+        if path is None:
+            name, source = '<constants>', CONSTANTS
+        else:
+            name = os.path.basename(path)
+            with open(path, 'r') as f:
+                source = f.read()
+        expected = run(source, 'tree', False)[0]
+        for engine in engines:
+            best = {}
+            for optimize in (False, True):
+                output, spent, rewrites = run(source, engine, optimize)
+                if output != expected:
+                    failed = True
+                    print('%-14s %-8s output differs with optimize=%s' % (name, engine, optimize))
+                    break
+                for _ in range(opts.runs - 1):
+                    spent = min(spent, run(source, engine, optimize)[1])
+                best[optimize] = spent
+            else:
+                print('%-14s %-8s %9d %12.3f %12.3f %8.2fx' % (
+                    name, engine, rewrites, best[False] * 1e3, best[True] * 1e3, best[False] / best[True]))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
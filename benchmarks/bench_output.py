@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+#
+# Cost of `affiche` in a `tantque` loop for each buffering mode of the output
+# sink, writing to a file and to an in-memory buffer. 'none' flushes at every
+# `affiche`, as `print` always did before the sink.
+#
+#     python benchmarks/bench_output.py [--lines N]
+#
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+SCRIPT = '''
+main: fonc() {
+    i:0
+    tantque <(i %d) {
+        affiche("line " i "\\n")
+        i:+(i 1)
+    }
+}
+'''
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=200000, help='number of lines printed')
+    parser.add_argument('--engine', default='vm', help='evaluation engine (default: vm)')
+    opts = parser.parse_args(argv)
+
+    tree = Li().Parse(SCRIPT % opts.lines)
+    fd, path = tempfile.mkstemp(prefix='li-bench-output-')
+    os.close(fd)
+    try:
+        print('%-8s %-8s %10s %12s' % ('stream', 'mode', 'time (s)', 'lines/s'))
+        for target in ('file', 'memory'):
+            for mode in Li.Output.MODES:
+                stream = open(path, 'w') if target == 'file' else io.StringIO()
+                li = Li(output=Li.Output(stream, mode))
+                start = time.perf_counter()
+                li.Eval(tree, engine=opts.engine)
+                elapsed = time.perf_counter() - start
+                stream.close()
+                print('%-8s %-8s %10.3f %12.0f' % (target, mode, elapsed, opts.lines / elapsed))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
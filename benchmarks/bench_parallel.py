@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# Scaling of `pmap` and `pfilter` with the number of worker processes.
+#
+# A CPU-bound callback (a naive fib) is mapped and filtered over a list with
+# the serial `map` and `filter`, then with `pmap` and `pfilter` on pools of
+# 1, 2, 4, ... workers (1 runs in-process). The outputs must all match; the
+# best of N runs is reported, the first one also starts the pool.
+#
+#     python benchmarks/bench_parallel.py [-n RUNS] [-w WORKERS ...] [--size N] [--depth D]
+#
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+SCRIPT = '''
+fib: fonc(n){
+    if <(n 2) { n } else { +(fib(-(n 1)) fib(-(n 2))) }
+}
+main: fonc() {
+    l: []
+    i: 0
+    tantque <(i %(size)d) {
+        ins(l i %(depth)d)
+        i: +(i 1)
+    }
+    affiche_xa(fold(+ %(map)s(fib l)))
+    affiche_xa(taille(%(filter)s(fonc(x){ >(fib(x) 100) } l)))
+}
+'''
+
+
+def run(li, tree):
+    """
+    Run a parsed script, return (output, seconds).
+
+    :param li:
+    :param tree:
+    :return:
+    """
+    sink = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        li.Eval(tree)
+    return sink.getvalue(), time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=3)
+    parser.add_argument('-w', '--workers', type=int, action='append')
+    parser.add_argument('--size', type=int, default=32, help='length of the list (default: 32)')
+    parser.add_argument('--depth', type=int, default=13, help='argument of fib (default: 13)')
+    opts = parser.parse_args(argv)
+    cpus = os.cpu_count() or 1
+    workers = opts.workers or sorted(set([1, 2, 4, cpus]))
+
+    params = {'size': opts.size, 'depth': opts.depth}
+    serial = Li().Parse(SCRIPT % dict(params, map='map', filter='filter'))
+    parallel = Li().Parse(SCRIPT % dict(params, map='pmap', filter='pfiltre'))
+
+    expected, base = run(Li(), serial)
+    for _ in range(opts.runs - 1):
+        base = min(base, run(Li(), serial)[1])
+    print('%d elements, fib(%d), %d CPUs' % (opts.size, opts.depth, cpus))
+    print('%-12s %10s %9s' % ('workers', 'time (ms)', 'speedup'))
+    print('%-12s %10.1f %8.2fx' % ('serial', base * 1e3, 1))
+
+    failed = False
+    for count in workers:
+        li = Li(workers=count)
+        try:
+            best = float('inf')
+            for _ in range(opts.runs):
+                output, spent = run(li, parallel)
+                if output != expected:
+                    failed = True
+                    print('%-12d output differs: %r' % (count, output))
+                    break
+                best = min(best, spent)
+            else:
+                print('%-12d %10.1f %8.2fx' % (count, best * 1e3, base / best))
+        finally:
+            li.Shutdown()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
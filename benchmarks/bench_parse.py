@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+#
+# Parse throughput over synthetic scripts of increasing size.
+#
+# Each size doubles the previous one; with a linear parser the time per KB
+# stays flat across the table.
+#
+#     python benchmarks/bench_parse.py [--start KB] [--steps N]
+#
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+FUNCTION = '''
+f%(n)d:fonc(l c) {
+   if >(taille(l) 1) {
+      p:l(0)
+      lo:f%(n)d(filter(fonc(x) { c(p x) } l) c)
+      eq:filter(fonc(x) { =(p x) } l)
+      +(lo eq [1 2.5 "str\\"ing" {k: null}])
+   } elif =(c 0) {
+      tantque <(p 10) { p:+(p 1) }
+   } else {
+      l
+   }
+}
+'''
+
+
+def synthetic(size):
+    """
+    Build a script of at least `size` bytes out of numbered functions.
+
+    :param size:
+    :return:
+    """
+    parts, total, n = [], 0, 0
+    while total < size:
+        part = FUNCTION % {'n': n}
+        parts.append(part)
+        total += len(part)
+        n += 1
+    parts.append('main:fonc() { f0([3 1 2] <) }\n')
+    return ''.join(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--start', type=int, default=64, help='smallest size in KB')
+    parser.add_argument('--steps', type=int, default=8)
+    parser.add_argument('-n', '--runs', type=int, default=3)
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    print('%10s %12s %12s %12s' % ('size (KB)', 'best (ms)', 'MB/s', 'us per KB'))
+    for step in range(opts.steps):
+        code = synthetic(opts.start * 1024 << step)
+        best = None
+        for _ in range(opts.runs):
+            start = time.perf_counter()
+            li.Parse(code)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        kb = len(code) / 1024.0
+        print('%10d %12.1f %12.2f %12.2f' % (kb, best * 1e3, kb / 1024.0 / best, best * 1e6 / kb))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#
+# A filter -> map -> fold pipeline with Li callbacks over a large list, run
+# lazily (the stages are fused and the elements stream through them) and
+# eagerly (every stage is materialized before the next one).
+#
+#     python benchmarks/bench_pipelines.py [--size N] [--no-memory]
+#
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li, KEYWORDS  # noqa: E402
+
+
+def pipeline(li, data, below, double, eager):
+    """
+    fold(+ map(double filter(below data)))
+
+    :param li:
+    :param data:
+    :param below:
+    :param double:
+    :param eager:
+    :return:
+    """
+    catalog, words = li.CATALOG, KEYWORDS[li.lang]
+    kept = li.Lit(catalog[words['filter']]([below, data]))
+    if eager:
+        kept = li.LiList(kept.val, None, li)
+    doubled = li.Lit(catalog[words['map']]([double, kept]))
+    if eager:
+        doubled = li.LiList(doubled.val, None, li)
+    return catalog[words['fold']]([words['+'], doubled])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=2000000)
+    parser.add_argument('--no-memory', action='store_true', help='skip the (slow) tracemalloc pass')
+    opts = parser.parse_args(argv)
+
+    li = Li()
+    env = li.Scope({}, None)
+    below = li.LiFunction(li.Parse('f:fonc(x) { <(x 1000000000) }')['f'], env, li)
+    double = li.LiFunction(li.Parse('f:fonc(x) { *(x 2) }')['f'], env, li)
+    data = li.Lit(list(range(opts.size)))
+
+    print('%-8s %12s %14s %20s' % ('mode', 'time (s)', 'peak (MB)', 'result'))
+    for (mode, eager) in (('lazy', False), ('eager', True)):
+        start = time.perf_counter()
+        result = pipeline(li, data, below, double, eager)
+        elapsed = time.perf_counter() - start
+        peak = float('nan')
+        if not opts.no_memory:
+            tracemalloc.start()
+            pipeline(li, data, below, double, eager)
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+        print('%-8s %12.3f %14.1f %20s' % (mode, elapsed, peak, result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+#
+# Deep recursion on every engine.
+#
+# Tail calls (self and mutual) must run in constant stack on all engines;
+# non-tail recursion nests Python calls on the tree and closure engines, so
+# the scripts run in a thread with the stack the command line gives them.
+#
+#     python benchmarks/bench_recursion.py [--depth N] [--max-depth N]
+#
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li, _run_with_stack  # noqa: E402
+
+ENGINES = ['tree', 'closure', 'stack', 'vm']
+
+SCRIPTS = {
+    'countdown (tail)': '''
+rec:fonc(n) { if >(n 0) { rec(-(n 1)) } else { n } }
+main:fonc() { affiche_xa(rec(%(depth)d)) }
+''',
+    'even/odd (mutual tail)': '''
+even:fonc(n) { if =(n 0) { 1 } else { odd(-(n 1)) } }
+odd:fonc(n) { if =(n 0) { 0 } else { even(-(n 1)) } }
+main:fonc() { affiche_xa(even(%(depth)d)) }
+''',
+    'sum (non-tail)': '''
+sum:fonc(n) { if =(n 0) { 0 } else { +(n sum(-(n 1))) } }
+main:fonc() { affiche_xa(sum(%(depth)d)) }
+''',
+    'qsort sorted input': '''
+qsort:fonc(l) {
+   if >(taille(l) 1) {
+      p:l(0)
+      +(qsort(filter(fonc(x) { <(x p) } l)) filter(fonc(x) { =(x p) } l) qsort(filter(fonc(x) { >(x p) } l)))
+   } else {
+      l
+   }
+}
+range:fonc(n acc) { if =(n 0) { acc } else { ins(acc 0 n) range(-(n 1) acc) } }
+main:fonc() { affiche_xa(taille(qsort(range(%(sort_depth)d [])))) }
+''',
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--depth', type=int, default=100000)
+    parser.add_argument('--sort-depth', type=int, default=500)
+    parser.add_argument('--max-depth', type=int, default=200000)
+    opts = parser.parse_args(argv)
+
+    print('%-24s %-8s %10s  %s' % ('script', 'engine', 'time (s)', 'result'))
+    for name, template in SCRIPTS.items():
+        tree = Li().Parse(template % {'depth': opts.depth, 'sort_depth': opts.sort_depth})
+        for engine in ENGINES:
+            sink = io.StringIO()
+            li = Li(max_depth=opts.max_depth)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(sink):
+                _run_with_stack(lambda: li.Eval(tree, engine=engine), li.StackSize())
+            elapsed = time.perf_counter() - start
+            result = sink.getvalue().strip().splitlines()[-1]
+            print('%-24s %-8s %10.3f  %s' % (name, engine, elapsed, result[:60]))
+
+
+if __name__ == '__main__':
+    main()
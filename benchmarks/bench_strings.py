@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+#
+# Building a large text in a `tantque` loop.
+#
+# - plus:   `s: +(s line)` at each turn, the string stays a `LiRope`
+# - taille: the same loop, stopped by `taille(s)`, which must not join the rope
+# - join:   the lines are put in a list with `ins` and joined once by `joindre`
+# - copy:   `+` copying the whole string at each turn, as before ropes (run on
+#           a sample of the size only, it is quadratic)
+#
+# Every mode must build the same text, and `taille` must leave a rope in
+# pieces. Reports the time and the MB built per second.
+#
+#     python benchmarks/bench_strings.py [--mb MB] [--line CHARS] [--sample MB] [-e ENGINE]
+#
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+
+PLUS = '''
+main: fonc() {
+    s: ""
+    i: 0
+    tantque <(i count) {
+        s: +(s line)
+        i: +(i 1)
+    }
+    s
+}
+'''
+
+SIZED = '''
+main: fonc() {
+    s: ""
+    tantque <(taille(s) *(count taille(line))) {
+        s: +(s line)
+    }
+    s
+}
+'''
+
+JOIN = '''
+main: fonc() {
+    l: []
+    i: 0
+    tantque <(i count) {
+        ins(l i line)
+        i: +(i 1)
+    }
+    joindre(l)
+}
+'''
+
+
+def build(li, script, line, count, engine):
+    """
+    Run `script` appending `count` times `line`, return (text, seconds).
+
+    :param li:
+    :param script:
+    :param line:
+    :param count:
+    :param engine:
+    :return:
+    """
+    program = li.Load(script)
+    start = time.perf_counter()
+    text = li.Run(program, {'line': line, 'count': count}, engine=engine).Get()
+    return text, time.perf_counter() - start
+
+
+def flattens():
+    """
+    Whether `taille` joins the pieces of a rope.
+
+    :return:
+    """
+    li = Li()
+    rope = li._Add([li.LiString('x' * li.ROPE_MIN_SIZE), li.LiString('y')])
+    size = li._Len([rope])
+    return type(rope) is not li.LiRope or rope._text is not None or size != li.ROPE_MIN_SIZE + 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mb', type=int, default=100, help='size of the text (default: 100)')
+    parser.add_argument('--line', type=int, default=1000, help='characters appended per turn (default: 1000)')
+    parser.add_argument('--sample', type=int, default=2, help='size built by the copy mode (default: 2)')
+    parser.add_argument('-e', '--engine', default='tree', choices=['tree', 'closure', 'stack', 'vm'])
+    opts = parser.parse_args(argv)
+
+    line = ('x' * (opts.line - 1)) + '\n'
+    count = opts.mb * 1024 * 1024 // opts.line
+    sample = min(count, opts.sample * 1024 * 1024 // opts.line)
+    copying = Li()
+    copying.ROPE_MIN_SIZE = float('inf')
+    modes = [
+        ('plus', Li(), PLUS, count),
+        ('taille', Li(), SIZED, count),
+        ('join', Li(), JOIN, count),
+        ('copy', copying, PLUS, sample),
+    ]
+
+    print('%d MB in lines of %d characters, %s engine' % (opts.mb, opts.line, opts.engine))
+    print('%-8s %10s %10s %10s' % ('mode', 'MB', 'time (s)', 'MB/s'))
+    failed = flattens()
+    if failed:
+        print('taille joined a rope')
+    for (name, li, script, turns) in modes:
+        text, spent = build(li, script, line, turns, opts.engine)
+        if text != line * turns:
+            failed = True
+            print('%-8s text differs' % name)
+            continue
+        size = len(text) / (1024 * 1024)
+        print('%-8s %10.1f %10.2f %10.1f' % (name, size, spent, size / spent))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+#
+# Benchmark suite: runs the Li scripts of benchmarks/workloads and a
+# parse-only workload, and reports for each engine the parse and eval times,
+# the runs per second and the memory peak.
+#
+# Results can be saved as JSON and compared with a saved baseline; a workload
+# that got slower (or bigger) than the baseline by more than the threshold is
+# flagged and the exit status is 1.
+#
+#     python benchmarks/suite.py [-n RUNS] [-e ENGINE ...] [--save FILE]
+#                                [--baseline FILE] [--threshold PCT] [workload ...]
+#
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from li import Li  # noqa: E402
+from bench_parse import synthetic  # noqa: E402
+
+WORKLOADS = os.path.join(ROOT, 'benchmarks', 'workloads')
+ENGINES = ['tree', 'closure', 'stack', 'vm']
+
+# Size of the source of the parse-only workload
+PARSE_SIZE = 256 * 1024
+
+
+def workloads():
+    """
+    The workloads by name, with their source and whether they are run or
+    only parsed.
+
+    :return: name -> (source, evaluated)
+    """
+    found = {}
+    for name in sorted(os.listdir(WORKLOADS)):
+        if name.endswith('.l'):
+            with open(os.path.join(WORKLOADS, name), 'r') as f:
+                found[name[:-2]] = (f.read(), True)
+    found['parse'] = (synthetic(PARSE_SIZE), False)
+    return found
+
+
+def run(tree, engine):
+    """
+    Run a parsed program on a fresh interpreter, return (output, seconds).
+
+    :param tree:
+    :param engine:
+    :return:
+    """
+    sink = io.StringIO()
+    li = Li()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        li.Eval(tree, engine=engine)
+    return sink.getvalue(), time.perf_counter() - start
+
+
+def measure(source, evaluated, engine, runs, memory):
+    """
+    Best parse and eval times out of `runs`, and the memory peak of one more
+    run of both.
+
+    :param source:
+    :param evaluated:
+    :param engine:
+    :param runs:
+    :param memory:
+    :return: the result entry
+    """
+    parse_s = eval_s = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        tree = Li().Parse(source)
+        parse_s = min(parse_s, time.perf_counter() - start)
+        if evaluated:
+            output, spent = run(tree, engine)
+            if 'Exception:' in output:
+                raise RuntimeError(output.strip().splitlines()[-1])
+            eval_s = min(eval_s, spent)
+    result = {
+        'parse_s': parse_s,
+        'eval_s': eval_s if evaluated else None,
+        'ops_per_s': 1 / (eval_s if evaluated else parse_s),
+        'peak_kb': None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            tree = Li().Parse(source)
+            if evaluated:
+                run(tree, engine)
+            result['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def compare(result, base, threshold):
+    """
+    The measures of `result` that are worse than in `base` by more than
+    `threshold`, as 'name +x%' strings. The parse time of the scripts is
+    left out: it is well under a millisecond and mostly noise.
+
+    :param result:
+    :param base:
+    :param threshold:
+    :return:
+    """
+    worse = []
+    main_time = 'eval_s' if result.get('eval_s') is not None else 'parse_s'
+    for key in (main_time, 'peak_kb'):
+        new, old = result.get(key), base.get(key)
+        if new is None or not old:
+            continue
+        change = new / old - 1
+        if change > threshold:
+            worse.append('%s %+.0f%%' % (key, 100 * change))
+    return worse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('-e', '--engine', action='append', choices=ENGINES)
+    parser.add_argument('--no-memory', action='store_true', help='skip the (slow) tracemalloc pass')
+    parser.add_argument('--save', metavar='FILE', help='write the results to FILE as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='compare with results saved by --save')
+    parser.add_argument('--threshold', type=float, default=10, metavar='PCT',
+                        help='slowdown flagged as a regression, in percent (default: 10)')
+    parser.add_argument('names', nargs='*', help='workloads to run (default: all)')
+    opts = parser.parse_args(argv)
+    engines = opts.engine or ['tree']
+
+    available = workloads()
+    names = opts.names or list(available)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        parser.error('unknown workload: %s (choose from %s)' % (', '.join(unknown), ', '.join(available)))
+    baseline = {}
+    if opts.baseline:
+        with open(opts.baseline, 'r') as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    regressions = 0
+    print('%-10s %-8s %10s %10s %10s %10s  %s' % (
+        'workload', 'engine', 'parse (ms)', 'eval (ms)', 'runs/s', 'peak (KB)', 'baseline'))
+    for name in names:
+        source, evaluated = available[name]
+        # parsing does not depend on the engine
+        for engine in (engines if evaluated else [None]):
+            key = '%s/%s' % (name, engine) if engine else name
+            result = results[key] = measure(source, evaluated, engine, opts.runs, not opts.no_memory)
+            note = ''
+            if key in baseline:
+                worse = compare(result, baseline[key], opts.threshold / 100)
+                regressions += bool(worse)
+                note = 'REGRESSION ' + ', '.join(worse) if worse else 'ok'
+            print('%-10s %-8s %10.2f %10s %10.1f %10s  %s' % (
+                name, engine or '-', result['parse_s'] * 1e3,
+                '%.2f' % (result['eval_s'] * 1e3) if evaluated else '-',
+                result['ops_per_s'],
+                '%.0f' % result['peak_kb'] if result['peak_kb'] is not None else '-',
+                note))
+
+    if opts.save:
+        with open(opts.save, 'w') as f:
+            json.dump({
+                'li': Li().version,
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'runs': opts.runs,
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,13 +14,36 @@
 # -----------------------------------------------------------------------------------------------------
 #
 
+from array import array
+import argparse
+import asyncio
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from functools import reduce
-import copy
+import gc
+import hashlib
+import inspect
+import io
+import mmap
 import numbers
+import operator
+import os
+import pickle
+import queue
 import sys
+import tempfile
+import threading
+import time
 from os import open as os_open, O_RDWR as os_O_RDWR, read as os_read, write as os_write, close as os_close
+import re
 import string
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
 # KEYWORDS = {
 #     "lang": {
 #         'open': 'open', 'read': 'read', 'write': 'write', 'close': 'close',
@@ -28,7 +51,13 @@ import string
 #         'println': 'println', '=': '=', '!': '!', '<': '<', '>': '>', '<=': '<=',
 #         '>=': '>=', 'len': 'len', 'ins': 'ins', 'del': 'del', 'cut': 'cut',
 #         'map': 'map', 'fold': 'fold', 'filter': 'filter', 'assert': 'assert',
-#         'round': 'round', 'type': 'type', 'import': 'import'
+#         'round': 'round', 'type': 'type', 'import': 'import',
+#         'fopen': 'fopen', 'fread': 'fread', 'freadline': 'freadline', 'lines': 'lines',
+#         'fwrite': 'fwrite', 'fclose': 'fclose', 'mmap': 'mmap',
+#         'memo': 'memo', 'memo_stats': 'memo_stats', 'pmap': 'pmap', 'pfilter': 'pfilter',
+#         'join': 'join', 'split': 'split', 'find': 'find', 'replace': 'replace', 'format': 'format',
+#         'keys': 'keys', 'values': 'values', 'items': 'items', 'has': 'has', 'merge': 'merge',
+#         'update': 'update', 'group': 'group'
 #     },
 # }
 
@@ -39,7 +68,13 @@ KEYWORDS = {
         'println': 'affiche_xa', 'scanf': 'demande', '=': '=', '!': '!', '<': '<',
         '>': '>', '<=': '<=', '>=': '>=', 'len': 'taille', 'ins': 'ins', 'del': 'supr',
         'cut': 'cut', 'map': 'map', 'fold': 'fold', 'filter': 'filter', 'assert': 'assert',
-        'round': 'round', 'type': 'type', 'import': 'import'
+        'round': 'round', 'type': 'type', 'import': 'import',
+        'fopen': 'ouvre', 'fread': 'lis', 'freadline': 'lis_ligne', 'lines': 'lignes',
+        'fwrite': 'ecris', 'fclose': 'ferme', 'mmap': 'mmap',
+        'memo': 'memo', 'memo_stats': 'memo_stats', 'pmap': 'pmap', 'pfilter': 'pfiltre',
+        'join': 'joindre', 'split': 'decoupe', 'find': 'cherche', 'replace': 'remplace', 'format': 'formate',
+        'keys': 'cles', 'values': 'valeurs', 'items': 'paires', 'has': 'contient', 'merge': 'fusionne',
+        'update': 'actualise', 'group': 'groupe'
     }
 }
 
@@ -65,44 +100,254 @@ def li_read(args):
 
 
 def li_write(args):
-    return os_write(args[0].val, args[1].val)
+    data = args[1].val
+    return os_write(args[0].val, data.encode('utf-8') if isinstance(data, str) else data)
 
 
 def li_close(args):
     return os_close(args[0].val)
 
 
+_SOURCE_DIGEST = None
+
+
+def _source_digest():
+    """
+    Hash of this file, so that cached parse trees do not outlive the parser
+    that produced them.
+
+    :return:
+    """
+    global _SOURCE_DIGEST
+    if _SOURCE_DIGEST is None:
+        with open(__file__, 'rb') as f:
+            _SOURCE_DIGEST = hashlib.sha256(f.read()).hexdigest()
+    return _SOURCE_DIGEST
+
+
+def _thread_stack():
+    """
+    Bytes of stack of the running thread: the size it was started with by
+    `_run_with_stack`, else the limit of the process.
+
+    :return:
+    """
+    size = getattr(threading.current_thread(), 'stack', None)
+    if size is not None:
+        return size
+    if resource is None:
+        return 1 << 20
+    size = resource.getrlimit(resource.RLIMIT_STACK)[0]
+    return sys.maxsize if size == resource.RLIM_INFINITY else size
+
+
+def _run_with_stack(func, size):
+    """
+    Run func() in a thread with `size` bytes of stack, return what it
+    returns or raise what it raises.
+
+    :param func:
+    :param size:
+    :return:
+    """
+    outcome = []
+
+    def run():
+        try:
+            outcome.append((True, func()))
+        except BaseException as e:
+            outcome.append((False, e))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.stack = size
+    previous = threading.stack_size(size)
+    try:
+        thread.start()
+    finally:
+        threading.stack_size(previous)
+    thread.join()
+    (ok, value) = outcome[0]
+    if not ok:
+        raise value
+    return value
+
+
+# Runs of the tree and closure engines that raised the recursion limit of
+# Python, and the limit before the first one, see `Li._RecursionLimit`
+_DEEP_LOCK = threading.Lock()
+_DEEP = {'runs': 0, 'limit': None}
+
+
+def _unpickle_list(val):
+    seq = Li.LiList.__new__(Li.LiList)
+    seq.val = val
+    return seq
+
+
+# Interpreter of a worker process of `pmap` and `pfilter`
+_POOL_LI = None
+
+
+def _pool_init(lang, keywords, max_depth):
+    global _POOL_LI
+    _POOL_LI = Li(lang, keywords, max_depth, optimize=False)
+
+
+def _pool_run(payload):
+    return _POOL_LI._RunChunk(payload)
+
+
+def _batch_run(path, settings):
+    """
+    Run one script of a `--jobs` batch in a fresh interpreter, capturing
+    what it prints.
+
+    :param path:
+    :param settings: engine, max_depth, optimize, cache (a directory or None),
+        cache_size and budget (a `Li.Budget` or None)
+    :return: (status, output, seconds), status is 'ok', 'error', 'syntax' or
+        'unreadable'
+    """
+    sink = io.StringIO()
+    li = Li(max_depth=settings['max_depth'], output=Li.Output(sink, 'block'),
+            optimize=settings['optimize'], workers=1)
+    cache = Li.ParseCache(settings['cache'], settings['cache_size']) if settings['cache'] else None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        try:
+            with open(path, 'r') as f:
+                tree = li.Parse(f.read(), cache)
+        except OSError as e:
+            print('Error:', path, e)
+            status = 'unreadable'
+        except Li.LiSyntaxError as e:
+            print('SyntaxError:', path, e)
+            status = 'syntax'
+        else:
+            li.Eval(tree, engine=settings['engine'], budget=settings['budget'])
+            status = 'error' if li.error is not None else 'ok'
+    return status, sink.getvalue(), time.perf_counter() - start
+
+
+def _batch(scripts, jobs, settings, out, report):
+    """
+    Run `scripts` in isolated interpreters, `jobs` at a time, write what
+    each printed to `out` in the order of `scripts` and a summary of the
+    status and time of each to `report`.
+
+    :param scripts:
+    :param jobs:
+    :param settings: see `_batch_run`
+    :param out:
+    :param report:
+    :return: the number of scripts that did not end normally
+    """
+    # a forked worker must not inherit text still waiting to be written
+    sys.stdout.flush()
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max(1, min(jobs, len(scripts)))) as pool:
+        for (path, result) in zip(scripts, pool.map(_batch_run, scripts, [settings] * len(scripts))):
+            out.write(result[1])
+            out.flush()
+            results.append((path,) + result)
+    failed = len([r for r in results if r[1] != 'ok'])
+    report.write('-- %d scripts, %d failed, %.2f s with %d jobs\n' % (
+        len(results), failed, time.perf_counter() - start, jobs))
+    for (path, status, _, spent) in results:
+        report.write('%-10s %10.1f ms  %s\n' % (status, spent * 1e3, path))
+    return failed
+
+
 # ------------------------------------------------------------------------------
 # > The class LI                                                           #
 # ------------------------------------------------------------------------------
 
 class Li:
-    def __init__(self, lang="lang", keywords=None, ):
+    def __init__(self, lang="lang", keywords=None, max_depth=100000, output=None, optimize=True,
+                 workers=None):
         if keywords is None:
             keywords = KEYWORDS
         self.version = "0.1"
 
+        # Where `print` and `println` write, see `Output`
+        self.output = output if output is not None else self.Output()
+
         self.lang = lang
+        self.keywords = keywords
+
+        # Nesting limit for calls that are not in tail position
+        self.max_depth = max_depth
+        self._depth = 0
+
+        # The `Budget` of the running script, and what is left of it, see `_Limits`
+        self.budget = None
+        self._fuel = self.FUEL
+        self._steps_left = None
+        self._deadline = None
+        self._max_size = None
+
+        # `format` with the size budget of this interpreter, see `_Formatter`
+        self.formatter = self._Formatter(self)
+
+        # What stopped the last script run by `Eval`, None when it ended normally
+        self.error = None
+
+        # The `Profiler` recording the running script, see `Profile`
+        self.profiler = None
+
+        # (view, mapping) of the files the running script mapped with `mmap`, see `_Unmap`
+        self._mappings = []
+
+        # Hits and misses of the call site caches by kind, see `TrackCallSites`
+        self.site_stats = None
+
+        # Whether `Parse` runs `Optimize`, and what it did to the last script
+        self.optimize = optimize
+        self.optimizations = []
+
+        # Size of the process pool of `pmap` and `pfilter`, started on first use
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self._pool = None
+        self._shipped = None
 
         self.TYPES = {
             self.LiList: "LiList",
+            self.LiArray: "LiList",
+            self.LiStream: "LiList",
             self.LiDict: "LiDict",
             self.LiString: "LiString",
+            self.LiRope: "LiString",
             self.LiNumber: "LiNumber",
             self.LiFunction: "LiFunction",
-            self.LiNull: "LiNull"
+            self.LiMemo: "LiFunction",
+            self.LiNull: "LiNull",
+            self.LiFile: "LiFile",
+            self.LiBuffer: "LiBuffer"
         }
 
         self.NoneType = type(None)
 
+        # Immutable values shared by the whole interpreter
+        self.null = self.LiNull(None)
+        self.true = self.LiNumber(True)
+        self.false = self.LiNumber(False)
+        self.small_ints = [self.LiNumber(i) for i in range(self.SMALL_INT_MIN, self.SMALL_INT_MAX + 1)]
+
         self.LITERALS = {
-            list: self.LiList,
+            list: self._List,
+            array: self.LiArray,
             dict: self.LiDict,
+            self.Node: self._List,
+            self.ConstList: self._List,
+            self.NodeDict: self.LiDict,
             str: self.LiString,
             int: self.LiNumber,
             bool: self.LiNumber,
             float: self.LiNumber,
             self.NoneType: self.LiNull,
+            bytes: self.LiBuffer,
+            memoryview: self.LiBuffer,
         }
 
         self.CATALOG = {
@@ -216,11 +461,118 @@ class Li:
 
             safe_check_attr_keyword(
                 keywords[lang], 'import'
-            ): self._Import
+            ): self._Import,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'fopen'
+            ): self._FileOpen,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'fread'
+            ): self._FileRead,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'freadline'
+            ): self._FileReadLine,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'lines'
+            ): self._FileLines,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'fwrite'
+            ): self._FileWrite,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'fclose'
+            ): self._FileClose,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'mmap'
+            ): self._FileMap,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'memo'
+            ): self._Memo,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'memo_stats'
+            ): self._MemoStats,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'pmap'
+            ): self._PMap,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'pfilter'
+            ): self._PFilter,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'join'
+            ): self._Join,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'split'
+            ): self._Split,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'find'
+            ): self._Find,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'replace'
+            ): self._Replace,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'format'
+            ): self._Format,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'keys'
+            ): self._Keys,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'values'
+            ): self._Values,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'items'
+            ): self._Pairs,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'has'
+            ): self._Has,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'merge'
+            ): self._Merge,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'update'
+            ): self._Update,
+
+            safe_check_attr_keyword(
+                keywords[lang], 'group'
+            ): self._Group
         }
 
         self.RESERVED = [*self.CATALOG.keys(), 'if', 'params', 'fonc', 'lit', 'tantque']
 
+        # Built-ins that `map` and `fold` apply straight to the numbers of a LiArray
+        self.ARRAY_MAP = {
+            self._Add: array.__copy__,
+            self._Sub: array.__copy__,
+            self._Mult: array.__copy__,
+            self._Div: array.__copy__,
+            self._Round: lambda a: self._List([int(round(x)) for x in a]),
+        }
+        self.ARRAY_FOLD = {
+            self._Add: operator.add,
+            self._Sub: operator.sub,
+            self._Mult: operator.mul,
+            self._Div: operator.truediv,
+        }
+
     # ------------------------------------------------------------------------------
     # > Errors                                                                     #
     # ------------------------------------------------------------------------------
@@ -257,17 +609,109 @@ class Li:
         def __str__(self):
             return '[-]' + self.word + ' is a reserved word'
 
+    class LiImpureFunctionError(Error):
+        def __init__(self, effects):
+            self.effects = effects
+
+        def __str__(self):
+            return '[~]' + 'Function with side effects cannot be memoized: ' + ', '.join(self.effects)
+
+    class LiBudgetError(Error):
+        def __init__(self, what):
+            self.what = what
+
+        def __str__(self):
+            return '[$]' + 'Budget exceeded: ' + self.what
+
+    class LiRecursionError(LiBudgetError):
+        def __init__(self, depth, host=False):
+            self.depth = depth
+            self.host = host
+
+        def __str__(self):
+            if self.host:
+                # the Python stack ran out before `max_depth`, see `_RecursionLimit`
+                return '[!]' + 'Python stack exhausted at ' + str(self.depth) + ' nested calls'
+            return '[!]' + 'Maximum recursion depth exceeded at ' + str(self.depth) + ' nested calls'
+
+    # -----------------------------------------------------------------------------
+    # > Environments                                                              #
+    # -----------------------------------------------------------------------------
+
+    class Scope(object):
+        """
+        One frame of variables chained to the scope it was created in. Reads
+        walk the chain up to the global scope; an assignment rebinds the
+        nearest frame that already holds the name, or creates it locally.
+        """
+        __slots__ = ('vars', 'parent')
+
+        def __init__(self, vars=None, parent=None):
+            self.vars = {} if vars is None else vars
+            self.parent = parent
+
+        def Find(self, k):
+            """
+            The nearest scope holding `k`, or None.
+
+            :param k:
+            :return:
+            """
+            scope = self
+            while scope is not None:
+                if k in scope.vars:
+                    return scope
+                scope = scope.parent
+            return None
+
+        def get(self, k, default=None):
+            """
+
+            :param k:
+            :param default:
+            :return:
+            """
+            scope = self.Find(k)
+            return default if scope is None else scope.vars[k]
+
+        def __contains__(self, k):
+            return self.Find(k) is not None
+
+        def __getitem__(self, k):
+            scope = self
+            while scope is not None:
+                vars = scope.vars
+                if k in vars:
+                    return vars[k]
+                scope = scope.parent
+            raise KeyError(k)
+
+        def __setitem__(self, k, v):
+            scope = self
+            while scope is not None:
+                vars = scope.vars
+                if k in vars:
+                    vars[k] = v
+                    return
+                scope = scope.parent
+            self.vars[k] = v
+
     # -----------------------------------------------------------------------------
     # > Types                                                                     #
     # -----------------------------------------------------------------------------
 
     class Type(object):
-        pass
+        __slots__ = ()
 
     class LiLiteral(Type):
-        def __init__(self, val, env):
-            self.env = env
-            self.val = copy.copy(val)
+        """
+        Values hold nothing but `val`; numbers, strings and null are
+        immutable and shared as they are.
+        """
+        __slots__ = ('val',)
+
+        def __init__(self, val, env=None, li=None):
+            self.val = val
 
         def __eq__(self, o):
             return self.val == o.val
@@ -279,28 +723,120 @@ class Li:
             return dict([('lit', self.val)])
 
     class LiList(LiLiteral):
-        def __init__(self, val, env):
-            li = Li()
-            super(li.LiList, self).__init__(val, env)
-            for (i, v) in enumerate(self.val):
-                self.val[i] = li._Eval(v, env)
+        __slots__ = ()
+
+        def __init__(self, val, env, li):
+            # a new list, the parse tree or the caller's list is not touched
+            Type, lit = li.Type, li.Lit
+            self.val = [lit(v) if type(v) in (int, float) else v if isinstance(v, Type) else li._Eval(v, env)
+                        for v in val]
+
+        def __eq__(self, o):
+            if type(o.val) is array:
+                return o == self
+            return self.val == o.val
+
+        def __str__(self):
+            return str(list(map(lambda x: x.__str__(), self.val)))
+
+        def json(self):
+            return dict([('lit', list(map(lambda x: x.json(), self.val)))])
+
+    class LiArray(LiList):
+        """
+        A list holding only ints or only floats, kept unboxed in an `array`
+        ('q' or 'd'). Reading an element gives back a LiNumber; storing
+        anything else turns it into a plain LiList (see `Li._Store`).
+        """
+        __slots__ = ()
+
+        def __init__(self, val, env=None, li=None):
+            self.val = val
+
+        def __eq__(self, o):
+            other = o.val
+            if type(other) is array:
+                return self.val == other
+            return len(self.val) == len(other) and all(
+                isinstance(y, Li.LiNumber) and x == y.val for (x, y) in zip(self.val, other))
 
         def __str__(self):
-            return str(map(lambda x: x.__str__(), self.val))
+            return str([str(x) for x in self.val])
 
         def json(self):
-            return dict([('lit', map(lambda x: x.json(), self.val))])
+            return dict([('lit', list(self.val))])
+
+    class LiStream(LiList):
+        """
+        Lazy result of `map` and `filter`: a source sequence and the stages
+        to run over it. A stage added to a stream that has not run yet joins
+        its pipeline, so chained calls pass the elements one at a time
+        through all the stages without intermediate lists.
+
+        `fold` pulls the elements without keeping them, so a stream folded
+        and then read again runs its stages twice; anything that reads `val`
+        (indexing, printing, `taille`, `cut`, ...) runs the pipeline once and
+        keeps the result. Only functions that give the same results whenever
+        they run are deferred, over a copy of the list taken by `map` or
+        `filter`: any other function builds its list at once (see
+        `Li._Pipe`). The source is a Li value or a function returning an
+        iterator of Li values.
+        """
+        __slots__ = ('_li', '_source', '_stages', '_items')
+
+        def __init__(self, source, stages, li):
+            self._li = li
+            self._source = source
+            self._stages = stages
+            self._items = None
+
+        @property
+        def val(self):
+            if self._items is None:
+                self._items = list(self.Iter())
+                self._source = self._stages = None
+            return self._items
+
+        @val.setter
+        def val(self, val):
+            self._items = val
+
+        def Iter(self):
+            """
+            Iterator over the elements, running the pipeline if the stream
+            has not been materialized.
+
+            :return:
+            """
+            if self._items is not None:
+                return iter(self._items)
+            if callable(self._source):
+                it = self._source()
+            else:
+                it = self._li._Iter(self._source)
+            for (kind, func) in self._stages:
+                it = map(func, it) if kind == 'map' else filter(func, it)
+            return it
+
+        def __reduce__(self):
+            # pickled as the list of its elements, see `_Parallel`
+            return (_unpickle_list, (self.val,))
 
     class LiDict(LiLiteral):
-        def __init__(self, val, env):
-            li = Li()
-            super(li.LiDict, self).__init__(val, env)
-            dict_env = env.copy()
-            for (k, v) in self.val.items():
-                self.val[k] = li._Eval(v, dict_env)
-            for v in self.val.values():
-                if isinstance(v, li.LiFunction):
-                    v._env = self.val
+        """
+        A dict literal of the tree engine: its values are evaluated in the
+        scope of the literal, the other engines evaluate them first and call
+        `Li._Dict`.
+        """
+        __slots__ = ()
+
+        def __init__(self, val, env, li):
+            _eval = li._Eval
+            self.val = dict([(k, _eval(v, env)) for (k, v) in val.items()])
+            li._Methods(self.val, env)
+
+        def __str__(self):
+            return str(dict([(k, v.__str__()) for (k, v) in self.val.items()]))
 
         def json(self):
             return dict([('lit',
@@ -308,9 +844,54 @@ class Li:
                                    map(lambda x: x.json(), self.val.values()))))])
 
     class LiString(LiLiteral):
-        pass
+        __slots__ = ()
+
+    class LiRope(LiString):
+        """
+        A long string built by `+`: the pieces appended so far, joined when
+        `val` is first read. The list of pieces is shared with the ropes made
+        by appending to this one; a rope that sees the whole list appends in
+        place, any other copies its part first. Building a string piece by
+        piece in a loop is then linear, and a value once built never changes.
+        """
+        __slots__ = ('_pieces', '_count', 'size', '_text')
+
+        def __init__(self, pieces, count, size):
+            self._pieces = pieces
+            self._count = count
+            self.size = size
+            self._text = None
+
+        @property
+        def val(self):
+            if self._text is None:
+                pieces = self._pieces
+                self._text = ''.join(pieces if len(pieces) == self._count else pieces[:self._count])
+                # later appends start from the joined text
+                self._pieces = [self._text]
+                self._count = 1
+            return self._text
+
+        def Append(self, texts, size):
+            """
+            The rope of this text followed by `texts`, `size` characters in all.
+
+            :param texts: Python strings
+            :param size:
+            :return:
+            """
+            pieces = self._pieces
+            if len(pieces) != self._count:
+                pieces = pieces[:self._count]
+            pieces.extend(texts)
+            return Li.LiRope(pieces, len(pieces), self.size + size)
+
+        def __reduce__(self):
+            return (Li.LiString, (self.val,))
 
     class LiNumber(LiLiteral):
+        __slots__ = ()
+
         def json(self):
             """
 
@@ -319,6 +900,8 @@ class Li:
             return self.val
 
     class LiNull(LiLiteral):
+        __slots__ = ()
+
         def json(self):
             """
 
@@ -329,49 +912,37 @@ class Li:
         def __str__(self):
             return 'LiNull'
 
+    class LiFile(LiLiteral):
+        """
+        A file opened with `fopen`, `val` is the buffered Python file object.
+        """
+        __slots__ = ()
+
+        def __str__(self):
+            return '<LiFile %s>' % self.val.name
+
+    class LiBuffer(LiLiteral):
+        """
+        Raw bytes: the result of `read`, or a file mapped in memory by `mmap`
+        (`val` is then a memoryview over the mapping, and `cut` slices it
+        without copying). Printed as UTF-8 text.
+        """
+        __slots__ = ()
+
+        def __str__(self):
+            return str(self.val, 'utf-8', 'replace')
+
     class LiFunction(Type):
-        class _LiFunctionEnv(object):
-            def __init__(self, env, run_env, og_func):
-                self.val = og_func
-                self._env = env
-                self._run_env = run_env
-
-            def copy(self):
-                """
-
-                :return:
-                """
-                env = {}
-                env.update(self._env)
-                env.update(self._run_env)
-                return env
-
-            def __eq__(self, o):
-                return o == self.val
-
-            def get(self, k, default=None):
-                """
-
-                :param k:
-                :param default:
-                :return:
-                """
-                return self.copy().get(k, default)
-
-            def __getitem__(self, k):
-                return self.copy()[k]
-
-            def __setitem__(self, k, v):
-                if k in self._run_env or k not in self._env:
-                    self._run_env[k] = v
-                else:
-                    self._env[k] = v
+        __slots__ = ('_li', '_env', '_params', '_def', '_body', '_code', '_globals', 'val')
 
-        def __init__(self, d, env):
-            self._env = env.copy()
+        def __init__(self, d, env, li, body=None, code=None):
+            self._li = li
+            self._env = env
             self._params = d.get('params', [])
             self._def = d.get('fonc', [])
-            self._run_env = {}
+            self._body = body
+            self._code = code
+            self._globals = None
             self.val = self
 
         def json(self):
@@ -381,111 +952,464 @@ class Li:
             """
             return dict([('params', self._params), ('fonc', self._def)])
 
+        def __getstate__(self):
+            # the definition and the variables it sees, without the
+            # interpreter or the compiled body, see `_Parallel`
+            return (self._params, self._def, self._li._Portable(self._env))
+
+        def __setstate__(self, state):
+            self._params, self._def, self._env = state
+            self._li = Li._loading
+            self._body = self._code = self._globals = None
+            self.val = self
+
         def Eval(self, args):
             """
+            Call the function. Calls in tail position come back as a
+            `TailCall` and are run here in a loop, so they don't nest.
 
             :param args:
             :return:
             """
-            li = Li()
-            return li._ExecLiList(
-                self._def,
-                self._LiFunctionEnv(self._env, dict(zip(self._params, args)), self))
-
-    def Lit(self, val, env=None):
+            li = self._li
+            if li.profiler is not None:
+                return li.profiler.Call(self, args)
+            li._depth += 1
+            try:
+                if li._depth > li.max_depth:
+                    raise li.LiRecursionError(li._depth)
+                func = self
+                while True:
+                    li._fuel -= 1
+                    if li._fuel < 0:
+                        li._Refuel()
+                    if func._code is not None:
+                        return li._RunVM(func._code, li._VmSlots(func._code, args), func._env, func._globals)
+                    env = li.Scope(dict(zip(func._params, args)), func._env)
+                    if func._body is not None:
+                        result = func._body(env)
+                    else:
+                        result = li._ExecLiList(func._def, env, True)
+                    if type(result) is not li.TailCall:
+                        return result
+                    func, args = result.func, result.args
+            finally:
+                li._depth -= 1
+
+    class LiMemo(Type):
+        """
+        A Li function whose results are kept in an LRU cache of at most `size`
+        entries, keyed on the frozen values of the arguments (see `_Frozen`).
+        Calls with arguments that cannot be frozen, like functions, are not
+        cached. Lists and dicts are cached and returned as copies (see
+        `_Copied`), so changing a result does not change the next one.
+
+        When `memo` runs, a function may call names bound later, like its
+        own in `fib: memo(fonc(n) {...})`; `pending` is then set, and the
+        first call checks the function again (see `Li._Memo`).
         """
+        __slots__ = ('_li', 'func', 'size', 'cache', 'hits', 'misses', 'pending', 'val')
+
+        def __init__(self, func, size, li, pending=False):
+            self._li = li
+            self.func = func
+            self.size = size
+            self.cache = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+            self.pending = pending
+            self.val = self
 
-        :param val:
-        :param env:
-        :return:
+        def Eval(self, args):
+            """
+
+            :param args:
+            :return:
+            """
+            if self.pending:
+                self._li._CheckMemo(self.func, True)
+                self.pending = False
+            try:
+                key = tuple([self._li._Frozen(arg) for arg in args])
+            except TypeError:
+                self.misses += 1
+                return self.func.Eval(args)
+            cache = self.cache
+            result = cache.get(key)
+            if result is not None:
+                self.hits += 1
+                cache.move_to_end(key)
+                return self._li._Copied(result)
+            self.misses += 1
+            result = self.func.Eval(args)
+            cache[key] = self._li._Copied(result)
+            if len(cache) > self.size:
+                cache.popitem(last=False)
+            return result
+
+        def __getstate__(self):
+            return (self.func, self.size, self.cache, self.hits, self.misses, self.pending)
+
+        def __setstate__(self, state):
+            self.func, self.size, self.cache, self.hits, self.misses, self.pending = state
+            self._li = Li._loading
+            self.val = self
+
+    class TailCall(object):
         """
-        if env is None:
-            env = {}
-        if isinstance(val, self.Type):
-            return val
-        return self.LITERALS[type(val)](val, env)
+        A call to a Li function in tail position, left for the caller's
+        `LiFunction.Eval` to run.
+        """
+        __slots__ = ('func', 'args')
+
+        def __init__(self, func, args):
+            self.func = func
+            self.args = args
 
     # -----------------------------------------------------------------------------
-    # > Built-in LiFunctions                                                      #
+    # > Parse tree                                                                #
     # -----------------------------------------------------------------------------
 
-    def _Cond(self, func, val):
+    class Node(list):
+        """
+        List node of the parse tree (calls, blocks, `if`, `tantque`, list
+        literals). `pos` is the (line, col) where it starts, `child_pos` the
+        position of each element.
         """
 
-        :param func:
-        :param val:
-        :return:
+        # Kind of call site cached by `_EvalCall`
+        site = 0
+
+        # What `_ScanEffects` found in a function body, computed once
+        effects = None
+
+        def __init__(self, pos, items=(), child_pos=()):
+            super(Li.Node, self).__init__(items)
+            self.pos = pos
+            self.child_pos = list(child_pos)
+
+    class ConstList(Node):
+        """
+        List literal whose elements are all constants, turned into Li values
+        once by `Optimize`; `packed` holds them in an array when the list is
+        stored as a LiArray.
         """
-        return all(func(val[i].val, val[i + 1].val) for i in range(len(val) - 1))
 
-    def _Add(self, args):
+        def __init__(self, pos, items=(), child_pos=(), packed=None):
+            super(Li.ConstList, self).__init__(pos, items, child_pos)
+            self.packed = packed
+
+    class NodeDict(dict):
+        """
+        Dict node of the parse tree (definitions, functions, literals);
+        `child_pos` maps each key to the position of its value.
         """
 
-        :param args:
-        :return:
+        def __init__(self, pos, items=(), child_pos=()):
+            super(Li.NodeDict, self).__init__(items)
+            self.pos = pos
+            self.child_pos = dict(child_pos)
+
+    # Range of the integers `Lit` hands out from a cache
+    SMALL_INT_MIN = -5
+    SMALL_INT_MAX = 256
+
+    # Shortest list of numbers stored as a LiArray
+    ARRAY_MIN_SIZE = 16
+
+    # Most stages fused in one stream, a longer pipeline is run at that point
+    PIPELINE_MAX_STAGES = 16
+
+    # Shortest string made by `+` kept as a LiRope
+    ROPE_MIN_SIZE = 256
+
+    def _List(self, val, env=None, li=None):
         """
-        return reduce(lambda x, y: self.Lit(x.val + y.val), args)
+        Li value of a list: a `LiArray` when it holds enough numbers of one
+        type, else a `LiList`.
 
-    def _Sub(self, args):
+        :param val:
+        :param env:
+        :param li:
+        :return:
+        """
+        if type(val) is self.ConstList:
+            # a copy of the elements built by `Optimize`
+            if val.packed is not None:
+                return self.LiArray(val.packed.__copy__())
+            seq = self.LiList.__new__(self.LiList)
+            seq.val = list(val)
+            return seq
+        if len(val) >= self.ARRAY_MIN_SIZE:
+            packed = self._Unboxed(val)
+            if packed is not None:
+                return self.LiArray(packed)
+        return self.LiList(val, env, self)
+
+    def _Dict(self, vals, env=None):
         """
+        Li value of a dict of Li values, built in `env`, see `_Methods`.
 
-        :param args:
+        :param vals:
+        :param env: None to keep the functions among `vals` as they are
         :return:
         """
-        return reduce(lambda x, y: self.Lit(x.val - y.val), args)
+        d = self.LiDict.__new__(self.LiDict)
+        d.val = vals
+        if env is not None:
+            self._Methods(vals, env)
+        return d
 
-    def _Mult(self, args):
+    def _Methods(self, vals, env):
         """
+        Give the functions among the values of a dict built in `env` a scope
+        holding the members in front of their own, so that a function sees
+        the other members of its dict as variables. The functions created by
+        the literal share one such scope.
 
-        :param args:
+        :param vals:
+        :param env:
         :return:
         """
-        return reduce(lambda x, y: self.Lit(x.val * y.val), args)
+        members = None
+        LiFunction = self.LiFunction
+        for v in vals.values():
+            if isinstance(v, LiFunction):
+                if v._env is env:
+                    if members is None:
+                        members = self.Scope(vals, env)
+                    v._env = members
+                else:
+                    v._env = self.Scope(vals, v._env)
 
-    def _Div(self, args):
+    def _Unboxed(self, val):
         """
+        The numbers of `val` in an array, None unless they are all ints (that
+        fit in 64 bits) or all floats, raw or as LiNumbers.
 
-        :param args:
+        :param val:
         :return:
         """
-        return reduce(lambda x, y: self.Lit(x.val / y.val), args)
+        LiNumber = self.LiNumber
+        first = val[0]
+        kind = type(first.val if type(first) is LiNumber else first)
+        if kind is not int and kind is not float:
+            return None
+        raw = [v.val if type(v) is LiNumber else v for v in val]
+        for x in raw:
+            if type(x) is not kind:
+                return None
+        try:
+            return array('q' if kind is int else 'd', raw)
+        except OverflowError:
+            return None
 
-    def _Println(self, args):
+    def _Boxed(self, val):
         """
+        The elements of a list as Li values.
 
-        :param args:
+        :param val:
         :return:
         """
-        for arg_ in args:
-            print(arg_)
+        if type(val) is array:
+            return [self.Lit(x) for x in val]
+        return val
 
-    def _Scanf(self, args=None):
+    def _Store(self, seq, item):
         """
+        What to put in `seq.val` to store `item`: its raw number when `seq`
+        is a LiArray of that type, else `item` itself, after turning the
+        LiArray into a plain LiList.
 
-        :param args:
+        :param seq:
+        :param item:
         :return:
         """
-        return input()
+        val = seq.val
+        if type(val) is not array:
+            return item
+        if type(item) is self.LiNumber:
+            raw = item.val
+            if val.typecode == 'd' and type(raw) is float:
+                return raw
+            if val.typecode == 'q' and type(raw) is int and -2 ** 63 <= raw < 2 ** 63:
+                return raw
+        seq.val = self._Boxed(val)
+        seq.__class__ = self.LiList
+        return item
 
-    def _Print(self, args):
+    def Lit(self, val, env=None):
         """
 
-        :param args:
+        :param val:
+        :param env: scope of the elements of a list or dict literal
         :return:
         """
-        for arg_ in args:
-            sys.stdout.write(arg_.__str__())
-        sys.stdout.flush()
+        t = type(val)
+        if t is int:
+            if self.SMALL_INT_MIN <= val <= self.SMALL_INT_MAX:
+                return self.small_ints[val - self.SMALL_INT_MIN]
+            return self.LiNumber(val)
+        if val is None:
+            return self.null
+        if t is bool:
+            return self.true if val else self.false
+        if isinstance(val, self.Type):
+            return val
+        return self.LITERALS[t](val, env, self)
 
-    def _Eq(self, args):
+    # -----------------------------------------------------------------------------
+    # > Built-in LiFunctions                                                      #
+    # -----------------------------------------------------------------------------
+
+    def _Cond(self, func, val):
         """
 
-        :param args:
+        :param func:
+        :param val:
         :return:
         """
-        return self._Cond(lambda x, y: x == y, args)
+        for i in range(len(val) - 1):
+            if not func(val[i].val, val[i + 1].val):
+                return False
+        return True
 
-    def _NEq(self, args):
+    def _Reduce(self, func, args):
+        """
+        Fold `args` with `func` on their raw values, the call site wraps the
+        result into a Li value once.
+
+        :param func:
+        :param args:
+        :return:
+        """
+        if len(args) < 2:
+            return reduce(lambda x, y: self.Lit(func(x.val, y.val)), args)
+        acc = args[0].val
+        if func is operator.add and type(acc) is str and all(type(arg.val) is str for arg in args):
+            return ''.join([arg.val for arg in args])
+        for arg in args[1:]:
+            acc = func(acc, arg.val)
+        return acc
+
+    def _Add(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        if type(args[0]) is self.LiRope:
+            return self._Concat(args[0], args[1:])
+        try:
+            if len(args) == 2:
+                result = args[0].val + args[1].val
+            else:
+                result = self._Reduce(operator.add, args)
+        except TypeError:
+            if not any(type(arg.val) is array for arg in args):
+                raise
+            # a LiArray joined to a list it cannot hold unboxed
+            result = self._Reduce(operator.add, [self.LiList(self._Boxed(arg.val), None, self)
+                                                 if type(arg.val) is array else arg for arg in args])
+        if type(result) is str and len(result) >= self.ROPE_MIN_SIZE:
+            # long enough to be appended to again, see `LiRope`
+            return self._Concat(self.LiRope([result], 1, len(result)), ())
+        if self._max_size is not None:
+            self._CheckSize(result)
+        return result
+
+    def _Concat(self, rope, args):
+        """
+        `+` on a `LiRope`: the strings of `args` appended to it.
+
+        :param rope:
+        :param args:
+        :return:
+        """
+        texts = [arg.val for arg in args]
+        size = 0
+        for text in texts:
+            if type(text) is not str:
+                raise TypeError('can only concatenate str (not "%s") to str' % type(text).__name__)
+            size += len(text)
+        if self._max_size is not None:
+            self._CheckLength(rope.size + size)
+        return rope.Append(texts, size) if texts else rope
+
+    def _Sub(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        if len(args) == 2:
+            return args[0].val - args[1].val
+        return self._Reduce(operator.sub, args)
+
+    def _Mult(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        if self._max_size is not None:
+            self._CheckRepeat(args)
+        if len(args) == 2:
+            return args[0].val * args[1].val
+        return self._Reduce(operator.mul, args)
+
+    def _Div(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        if len(args) == 2:
+            return args[0].val / args[1].val
+        return self._Reduce(operator.truediv, args)
+
+    def _Println(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        if args:
+            self.output.Write('\n'.join(map(str, args)) + '\n')
+
+    def _Scanf(self, args=None):
+        """
+
+        :param args:
+        :return:
+        """
+        # the prompt written with `print` must be seen before waiting
+        self.output.Flush()
+        return input()
+
+    def _Print(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        if len(args) == 1:
+            self.output.Write(args[0].__str__())
+        else:
+            self.output.Write(''.join(map(str, args)))
+
+    def _Eq(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        if len(args) == 2:
+            x, y = args[0].val, args[1].val
+            return x == y or (type(x) is array or type(y) is array) and args[0] == args[1]
+        return all(self._Eq([args[i], args[i + 1]]) for i in range(len(args) - 1))
+
+    def _NEq(self, args):
         """
 
         :param args:
@@ -499,7 +1423,9 @@ class Li:
         :param args:
         :return:
         """
-        return self._Cond(lambda x, y: x < y, args)
+        if len(args) == 2:
+            return args[0].val < args[1].val
+        return self._Cond(operator.lt, args)
 
     def _Gt(self, args):
         """
@@ -507,7 +1433,9 @@ class Li:
         :param args:
         :return:
         """
-        return self._Cond(lambda x, y: x > y, args)
+        if len(args) == 2:
+            return args[0].val > args[1].val
+        return self._Cond(operator.gt, args)
 
     def _LtE(self, args):
         """
@@ -515,7 +1443,9 @@ class Li:
         :param args:
         :return:
         """
-        return self._Cond(lambda x, y: x <= y, args)
+        if len(args) == 2:
+            return args[0].val <= args[1].val
+        return self._Cond(operator.le, args)
 
     def _GtE(self, args):
         """
@@ -523,7 +1453,9 @@ class Li:
         :param args:
         :return:
         """
-        return self._Cond(lambda x, y: x >= y, args)
+        if len(args) == 2:
+            return args[0].val >= args[1].val
+        return self._Cond(operator.ge, args)
 
     def _Len(self, args):
         """
@@ -531,7 +1463,9 @@ class Li:
         :param args:
         :return:
         """
-        return sum(map(lambda x: len(x.val), args))
+        LiRope = self.LiRope
+        # a rope knows its length without joining its pieces
+        return sum(map(lambda x: x.size if type(x) is LiRope else len(x.val), args))
 
     def _Ins(self, args):
         """
@@ -539,7 +1473,10 @@ class Li:
         :param args:
         :return:
         """
-        args[0].val.insert(args[1].val, args[2])
+        item = self._Store(args[0], args[2])
+        args[0].val.insert(args[1].val, item)
+        if self._max_size is not None:
+            self._CheckSize(args[0].val)
         return args[2]
 
     def _Del(self, args):
@@ -558,13 +1495,147 @@ class Li:
         """
         return [self.Lit(args[0].val[:args[1].val]), self.Lit(args[0].val[args[1].val:])]
 
+    def _Callable(self, func):
+        """
+        Python callable running a Li function or a built-in on a list of Li
+        values.
+
+        :param func:
+        :return:
+        """
+        if isinstance(func, str):
+            builtin = self.CATALOG[func]
+            return lambda args: self.Lit(builtin(args))
+        return func.Eval
+
+    def _Pipe(self, seq, kind, func):
+        """
+        `map` or `filter` (`kind`) of `func`, a Li function or a built-in,
+        over the elements of `seq`.
+
+        When `func` is `_Closed` the result is a stream, run when it is read:
+        it joins the pipeline of `seq` when that is a stream that has not run
+        yet and has fewer than `PIPELINE_MAX_STAGES` stages, else it reads a
+        copy of the elements of `seq` taken now, provided none of them can
+        change (numbers, strings and null). An error raised when the stream
+        is read is reported as an error of `map` or `filter`. In any other
+        case, and under the profiler, the list is built at once.
+
+        :param seq:
+        :param kind: 'map' or 'filter'
+        :param func:
+        :return:
+        """
+        call = self._Callable(func)
+        if self.profiler is None and self._Closed(func):
+            stage = (kind, self._Deferred(kind, call))
+            if type(seq) is self.LiStream and seq._items is None and len(seq._stages) < self.PIPELINE_MAX_STAGES:
+                return self.LiStream(seq._source, seq._stages + (stage,), self)
+            source = self._Snapshot(seq)
+            if source is not None:
+                return self.LiStream(source, (stage,), self)
+        items = self._Iter(seq)
+        if kind == 'map':
+            return self._List([call([x]) for x in items])
+        return self._List([x for x in items if call([x]).val])
+
+    def _Deferred(self, kind, call):
+        """
+        The stage of a stream running `call` for `map` or `filter` (`kind`),
+        with the errors it raises once the built-in has returned reported as
+        errors of that built-in rather than of the one reading the stream.
+
+        :param kind:
+        :param call:
+        :return:
+        """
+        name = self.keywords[self.lang][kind]
+        passed = (self.LiBudgetError, RecursionError)
+        LiLiFunctionError = self.LiLiFunctionError
+        if kind == 'map':
+            def stage(x):
+                try:
+                    return call([x])
+                except passed:
+                    raise
+                except Exception as e:
+                    raise LiLiFunctionError(e, name)
+        else:
+            def stage(x):
+                try:
+                    return call([x]).val
+                except passed:
+                    raise
+                except Exception as e:
+                    raise LiLiFunctionError(e, name)
+        return stage
+
+    def _Snapshot(self, seq):
+        """
+        A stream source over the elements `seq` holds now, or None when one
+        of them could still change (a list, a dict, a function...) or `seq`
+        is not a list.
+
+        :param seq:
+        :return:
+        """
+        val = seq.val
+        if type(val) is array:
+            packed, lit = val.__copy__(), self.Lit
+            return lambda: map(lit, packed)
+        if type(val) is not list:
+            return None
+        items = list(val)
+        scalars = (self.LiNumber, self.LiString, self.LiRope, self.LiNull)
+        for x in items:
+            if type(x) not in scalars:
+                return None
+        return lambda: iter(items)
+
+    def _Closed(self, func):
+        """
+        Whether `func` gives the same results whenever it runs: a built-in
+        without side effects, or a Li function using nothing but its
+        parameters, its own variables and such built-ins, and calling none of
+        its parameters.
+
+        :param func:
+        :return:
+        """
+        effects = self._EffectWords()
+        if isinstance(func, str):
+            return func not in effects
+        if type(func) is not self.LiFunction:
+            return False
+        for (kind, k) in self._Scanned(func):
+            if kind == 'assigns' or kind == 'applies' or k not in self.CATALOG or k in effects:
+                return False
+        return True
+
+    def _Iter(self, seq):
+        """
+        Iterator over the elements of `seq` as Li values.
+
+        :param seq:
+        :return:
+        """
+        if type(seq) is self.LiStream:
+            return seq.Iter()
+        if type(seq.val) is array:
+            return map(self.Lit, seq.val)
+        return iter(seq.val)
+
     def _Map(self, args):
         """
 
         :param args:
         :return:
         """
-        return map(lambda x: args[0].Eval([x]), args[1].val)
+        if type(args[1]) is self.LiArray and isinstance(args[0], str):
+            vectorized = self.ARRAY_MAP.get(self.CATALOG[args[0]])
+            if vectorized is not None:
+                return vectorized(args[1].val)
+        return self._Pipe(args[1], 'map', args[0])
 
     def _Fold(self, args):
         """
@@ -572,7 +1643,12 @@ class Li:
         :param args:
         :return:
         """
-        return reduce(lambda x, y: args[0].Eval([x, y]), args[1].val)
+        if type(args[1]) is self.LiArray and isinstance(args[0], str):
+            vectorized = self.ARRAY_FOLD.get(self.CATALOG[args[0]])
+            if vectorized is not None:
+                return reduce(vectorized, args[1].val)
+        call = self._Callable(args[0])
+        return reduce(lambda x, y: call([x, y]), self._Iter(args[1]))
 
     def _Filter(self, args):
         """
@@ -580,7 +1656,7 @@ class Li:
         :param args:
         :return:
         """
-        return filter(lambda x: args[0].Eval([x]).val, args[1].val)
+        return self._Pipe(args[1], 'filter', args[0])
 
     def _Assert(self, args):
         """
@@ -589,7 +1665,7 @@ class Li:
         :return:
         """
         if not self._Eq(args):
-            print('[x] Assert failed:', args[0], args[1])
+            self.output.Write('[x] Assert failed: %s %s\n' % (args[0], args[1]))
 
     def _Round(self, args):
         """
@@ -616,357 +1692,3459 @@ class Li:
         for arg_ in args:
             module = __import__(arg_.val)
             self.CATALOG.update(module.CATALOG)
+            self.RESERVED.extend(module.CATALOG.keys())
 
     # -----------------------------------------------------------------------------
-    # > Interpreter                                                                 #
+    # > Strings                                                                   #
     # -----------------------------------------------------------------------------
 
-    def _ExecLiList(self, val, env):
+    class _Formatter(string.Formatter):
         """
-
-        :param val:
-        :param env:
-        :return:
+        `str.format` restricted to the arguments themselves: a field can
+        give a position and a format spec, not reach into an attribute or
+        an item of the value. Under a size budget, a width or precision
+        larger than the budget is refused before the field is formatted.
         """
-        if len(val) == 0:
-            return self.Lit(None)
-        for exp in val[:-1]:
-            self._Eval(exp, env)
-        return self._Eval(val[-1], env, True)
+        # [[fill]align][sign][z][#][0][width][grouping][.precision]
+        SPEC = re.compile(r'(?:.?[<>=^])?[-+ ]?z?#?0?(\d*)[,_]?(?:\.(\d+))?', re.DOTALL)
 
-    def _EvalLiList(self, exp, env, tail_pos=False):
+        def __init__(self, li):
+            self.li = li
+
+        def get_field(self, field_name, args, kwargs):
+            if not field_name.isdigit():
+                raise ValueError('a field is {} or {<position>}, not {%s}' % field_name)
+            return args[int(field_name)], field_name
+
+        def format_field(self, value, format_spec):
+            li = self.li
+            if li._max_size is not None and format_spec:
+                (width, precision) = self.SPEC.match(format_spec).groups()
+                li._CheckLength(max(int(width or 0), int(precision or 0)))
+            return format(value, format_spec)
+
+    def _Text(self, value):
         """
+        A Python string holding `value` as `print` shows it.
 
-        :param exp:
-        :param env:
-        :param tail_pos:
+        :param value:
         :return:
         """
-        if exp[0] in self.CATALOG:
-            return self.Lit(self.CATALOG[exp[0]](exp[1:]))
-        if isinstance(exp[0], (self.LiDict, self.LiList, self.LiString)):
-            if len(exp) == 2:
-                return self.Lit(exp[0].val[exp[1].val])
-            ret = exp[0].val[exp[1].val] = exp[2]
-            return ret
-        if isinstance(exp[0], self.LiFunction):
-            return exp[0].Eval(exp[1:])
-        raise self.LiSyntaxError('not a function name, env:', env)
+        return value.val if isinstance(value, self.LiString) else value.__str__()
 
-    def _IfBlock(self, exp, env, tail_pos=False):
+    def _Join(self, args):
         """
+        join(list [separator]): the elements of a list, as they are printed,
+        one after the other with `separator` (nothing by default) between
+        them. The string is built once, however long the list.
 
-        :param exp:
-        :param env:
-        :param tail_pos:
+        :param args:
         :return:
         """
-        for i in range(0, len(exp) - 1, 2):
-            if self._Eval(exp[i], env).val:
-                return self._ExecLiList(exp[i + 1], env)
-        if len(exp) % 2:
-            return self._ExecLiList(exp[-1], env)
-        return self.Lit(None)
-
-    def _LoopBlock(self, exp, env, tail_pos=False):
+        separator = args[1].val if len(args) > 1 else ''
+        text = self._Text
+        texts = [text(v) for v in self._Iter(args[0])]
+        if self._max_size is not None and texts:
+            self._CheckLength(sum(map(len, texts)) + len(separator) * (len(texts) - 1))
+        return separator.join(texts)
+
+    def _Split(self, args):
         """
+        split(string [separator [count]]): the parts of a string between the
+        occurrences of `separator`, or between runs of white space without
+        one, at most `count` splits.
 
-        :param exp:
-        :param env:
-        :param tail_pos:
+        :param args:
         :return:
         """
-        for i in range(0, len(exp) - 1, 2):
-            while self._Eval(exp[i], env).val:
-                self._ExecLiList(exp[i + 1], env)
-        if len(exp) % 2:
-            return self._ExecLiList(exp[-1], env)
-        return self.Lit(None)
+        separator = args[1].val if len(args) > 1 else None
+        count = args[2].val if len(args) > 2 else -1
+        LiString = self.LiString
+        return [LiString(part) for part in args[0].val.split(separator, count)]
 
-    def _Eval(self, exp, env, tail_pos=False):
+    def _Find(self, args):
         """
+        find(string part [start]): position of the first `part` in a string
+        from `start`, -1 when there is none.
 
-        :param exp:
-        :param env:
-        :param tail_pos:
+        :param args:
         :return:
         """
-        li = Li()
-        if isinstance(exp, self.Type):
-            return exp
-        if isinstance(exp, str) and exp in li.CATALOG:
-            return exp
-        if isinstance(exp, numbers.Number):
-            return self.Lit(exp, env)
-        if isinstance(exp, dict):
-            if 'lit' in exp:
-                return self.Lit(exp['lit'], env)
-            if 'fonc' in exp:
-                return self.LiFunction(exp, env)
-            new_env = copy.copy(env)
-            ret = self.Lit(None)
-            for (k, v) in exp.items():
-                if k in self.RESERVED: raise self.LiReservedWordError(k)
-                ret = env[k] = self._Eval(v, new_env)
-            for k in exp:
-                if isinstance(env[k], self.LiFunction):
-                    temp_env = env.copy()
-                    temp_env.update(env[k]._env)
-                    env[k]._env = temp_env
-            return ret
-        if isinstance(exp, list):
-            name = exp[0]
-            if name == 'if':
-                return self._IfBlock(exp[1:], env, tail_pos)
-            if name == 'tantque':
-                return self._LoopBlock(exp[1:], env, tail_pos)
-            exp = list(map(lambda x: self._Eval(x, env), exp))
-            if exp[0] == env and tail_pos:
-                return exp, env
-            try:
-                result = self._EvalLiList(exp, env, tail_pos)
-                while isinstance(result, tuple):
-                    result = self._EvalLiList(result[0], result[1], tail_pos)
-                return result
-            except Exception as e:
-                raise self.LiLiFunctionError(e, name)
-        try:
-            return env[exp]
-        except Exception as e:
-            raise self.LiUnboundVariableError(e)
+        return args[0].val.find(args[1].val, args[2].val if len(args) > 2 else 0)
 
-    def Eval(self, json_dict, **kwargs):
+    def _Replace(self, args):
         """
+        replace(string old new [count]): a string with `old` replaced by
+        `new`, only the first `count` ones if given.
 
-        :param json_dict:
-        :param kwargs:
+        :param args:
         :return:
         """
-        env = {}
-        if kwargs:
-            json_dict.update(kwargs)
-        try:
-            self._Eval(json_dict, env)
-            return env['main'].Eval([])
-        except Exception as e:
-            print('Exception:', e)
-
-    def Error(self, s):
+        (text, old, new) = (args[0].val, args[1].val, args[2].val)
+        count = args[3].val if len(args) > 3 else -1
+        if self._max_size is not None and len(new) > len(old):
+            found = text.count(old) if old else len(text) + 1
+            self._CheckLength(len(text) + (len(new) - len(old)) * (found if count < 0 else min(found, count)))
+        return text.replace(old, new, count)
+
+    def _Format(self, args):
         """
+        format(template value...): the template with each `{}` replaced by
+        the next value, or `{n}` by the value at position n. A field can give
+        a Python format spec, as in `{:.2f}` or `{0:>8}`.
 
-        :param s:
+        :param args:
         :return:
         """
-        print(s)
-        exit(0)
+        values = [arg.val if isinstance(arg, (self.LiNumber, self.LiString)) else arg.__str__() for arg in args[1:]]
+        result = self.formatter.vformat(args[0].val, values, {})
+        if self._max_size is not None:
+            self._CheckSize(result)
+        return result
+
+    # -----------------------------------------------------------------------------
+    # > Dictionaries                                                              #
+    # -----------------------------------------------------------------------------
 
-    def _ParseLiString(self, code):
+    def _Keys(self, args):
         """
+        keys(dict): the keys of a dict, in the order they were added.
 
-        :param code:
+        :param args:
         :return:
         """
-        buf = ''
-        for i in range(len(code)):
-            if code[i] == '"' and code[i - 1] != '\\':
-                return code[i + 1:], {'lit': buf}
-            if code[i] != '\\' or code[i - 1] == '\\':
-                if code[i - 1] == '\\' and code[i] == 'n':
-                    buf += '\n'
-                    continue
-                buf += code[i]
+        lit = self.Lit
+        return [lit(k) for k in args[0].val]
 
-    def _GetParens(self, code):
+    def _Values(self, args):
         """
+        values(dict): the values of a dict, in the order of `keys`.
 
-        :param code:
+        :param args:
         :return:
         """
-        val = 0
-        for i in range(len(code)):
-            if code[i] == '(':
-                val += 1
-            if code[i] == ')':
-                if val == 0:
-                    return code[:i], code[i + 1:]
-                val -= 1
-        self.Error('No closing parens')
+        return list(args[0].val.values())
 
-    def _ParseCall(self, code, name):
+    def _Pairs(self, args):
         """
+        items(dict): the [key value] pairs of a dict, in the order of `keys`.
 
-        :param code:
-        :param name:
+        :param args:
         :return:
         """
-        args, rest = self._GetParens(code)
-        args_list = []
-        while len(args.strip()):
-            args, arg_ = self._Parse(args)
-            args_list.append(arg_)
-        return rest, [name] + args_list
-
-    def _ParseCond(self, if_list, code):
+        lit, LiList = self.Lit, self.LiList
+        pairs = []
+        for (k, v) in args[0].val.items():
+            pair = LiList.__new__(LiList)
+            pair.val = [lit(k), v]
+            pairs.append(pair)
+        return pairs
+
+    def _Has(self, args):
         """
+        has(dict key...): whether the dict holds all the keys.
 
-        :param if_list:
-        :param code:
+        :param args:
         :return:
         """
-        cond, code = code.split('{', 1)
-        if_list.append(self._Parse(cond)[1])
-        code, statements = self._ParseBlock('{' + code)
-        if_list.append(statements)
-        return code
+        vals = args[0].val
+        for key in args[1:]:
+            if key.val not in vals:
+                return False
+        return True
 
-    def _ParseIf(self, code):
+    def _Merge(self, args):
         """
+        merge(dict...): a new dict with the entries of all the dicts, the
+        later ones winning. The dicts are not changed.
 
-        :param code:
+        :param args:
         :return:
         """
-        if_list = ['if']
-        code = self._ParseCond(if_list, code)
-        temp, next_ = self._Parse(code)
-        while next_ == 'elif':
-            code = temp
-            self._ParseCond(if_list, code)
-            temp, next_ = self._Parse(code)
-        if next_ == 'else':
-            code = temp
-            code, statements = self._ParseBlock(code)
-            if_list.append(statements)
-        return code, if_list
+        vals = {}
+        for arg in args:
+            vals.update(arg.val)
+        return self._Dict(vals)
 
-    def _ParseLoop(self, code):
+    def _Update(self, args):
         """
+        update(dict source...): add the entries of each source, a dict or a
+        list of [key value] pairs, to the dict, in place.
 
-        :param code:
-        :return:
+        :param args:
+        :return: the dict
         """
-        tantque_list = ['tantque']
-        code = self._ParseCond(tantque_list, code)
-        temp, next_ = self._Parse(code)
-        return code, tantque_list
+        vals = args[0].val
+        for source in args[1:]:
+            if isinstance(source, self.LiDict):
+                vals.update(source.val)
+                continue
+            for pair in self._Iter(source):
+                (k, v) = self._Iter(pair)
+                vals[k.val] = v
+        return args[0]
 
-    def _ParseBlock(self, code):
+    def _Group(self, args):
         """
+        group(f list): a dict of lists, the elements of the list under the
+        key f returns for them, in their order.
 
-        :param code:
+        :param args:
         :return:
         """
-        code = code.lstrip()
-        if code[0] != '{':
-            self.Error('Code block must begin with "{"')
-        code = code[1:]
-        statements = []
-        while code.lstrip()[0] != '}':
-            code, statement = self._Parse(code)
-            statements.append(statement)
-        return code.lstrip()[1:], statements
+        call = self._Callable(args[0])
+        groups = {}
+        for x in self._Iter(args[1]):
+            key = call([x]).val
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [x]
+            else:
+                group.append(x)
+        return self._Dict(dict([(k, self._List(group)) for (k, group) in groups.items()]))
+
+    # -----------------------------------------------------------------------------
+    # > Output                                                                    #
+    # -----------------------------------------------------------------------------
 
-    def _ParseLiFunction(self, code):
+    class Output(object):
         """
+        Sink of `print` and `println`. The text is kept in memory and written
+        to `stream` (`sys.stdout` when None) in one call:
 
-        :param code:
-        :return:
+        - 'block': once `size` characters are pending, and on `Flush`
+        - 'line': at the end of every write that holds a line break
+        - 'none': at every write
+
+        `Eval` flushes when the script ends or fails, after writing the
+        exception that stopped it, and `scanf` before it waits. By default a terminal is line buffered, anything else is block
+        buffered. Pass an `io.StringIO` as stream to keep the output in memory
+        and read it back with `Getvalue`.
         """
-        params, rest = code.split(')', 1)
-        params = params.split()
-        rest, body = self._ParseBlock(rest)
-        return rest, {'params': params, 'fonc': body}
+        MODES = ('block', 'line', 'none')
+
+        def __init__(self, stream=None, buffering=None, size=64 * 1024):
+            if buffering is None:
+                isatty = getattr(stream if stream is not None else sys.stdout, 'isatty', None)
+                buffering = 'line' if isatty is not None and isatty() else 'block'
+            if buffering not in self.MODES:
+                raise ValueError('buffering must be one of %s, not %r' % (', '.join(self.MODES), buffering))
+            self.stream = stream
+            self.buffering = buffering
+            self.size = size if buffering == 'block' else 0
+            self._line = buffering == 'line'
+            self._parts = []
+            self._pending = 0
+
+        def Write(self, text):
+            """
+
+            :param text:
+            :return:
+            """
+            self._parts.append(text)
+            self._pending += len(text)
+            if self._line:
+                if '\n' in text:
+                    self.Flush()
+            elif self._pending >= self.size:
+                if self.size:
+                    self._Spill()
+                else:
+                    self.Flush()
+
+        def Flush(self):
+            """
+            Write the pending text and flush the stream.
+
+            :return:
+            """
+            self._Spill()
+            stream = self.stream if self.stream is not None else sys.stdout
+            stream.flush()
+
+        def Getvalue(self):
+            """
+
+            :return: everything written to an in-memory stream
+            """
+            self._Spill()
+            return self.stream.getvalue()
+
+        def _Spill(self):
+            """
+            Hand the pending text over to the stream, which may still buffer it.
 
-    def _ParseLiList(self, code):
+            :return:
+            """
+            if self._parts:
+                stream = self.stream if self.stream is not None else sys.stdout
+                text = ''.join(self._parts)
+                self._parts = []
+                self._pending = 0
+                stream.write(text)
+
+    # -----------------------------------------------------------------------------
+    # > Files                                                                     #
+    # -----------------------------------------------------------------------------
+
+    # Size of the buffers of files opened with `fopen`
+    FILE_BUFFER_SIZE = 256 * 1024
+
+    # A line of a mapped file, without its line break
+    BUFFER_LINE = re.compile(rb'([^\n]*)\n|([^\n]+)\Z')
+
+    def _FileOpen(self, args):
         """
+        fopen(path [mode]): open a text file for buffered reading ("r",
+        the default), writing ("w") or appending ("a").
 
-        :param code:
+        :param args:
         :return:
         """
-        statements = []
-        while code.lstrip()[0] != ']':
-            code, statement = self._Parse(code)
-            statements.append(statement)
-        return code.lstrip()[1:], {'lit': statements}
+        mode = args[1].val if len(args) > 1 else 'r'
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError('invalid file mode: %r' % mode)
+        return self.LiFile(open(args[0].val, mode, buffering=self.FILE_BUFFER_SIZE, encoding='utf-8'))
 
-    def _ParseLiDict(self, code):
+    def _FileRead(self, args):
         """
+        fread(file [n]): the whole content of a file (an open file, a path or
+        a mapped buffer) as a string, or its next `n` characters.
 
-        :param code:
+        :param args:
         :return:
         """
-        code, d_list = self._ParseBlock('{' + code)
-        d = {}
-        [d.update(x) for x in d_list]
-        return code, {'lit': d}
-
-    def _GetNum(self, num):
+        source = args[0]
+        if isinstance(source, self.LiFile):
+            return source.val.read(args[1].val if len(args) > 1 else -1)
+        if isinstance(source, self.LiBuffer):
+            return str(source.val, 'utf-8', 'replace')
+        with open(source.val, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _FileReadLine(self, args):
         """
+        freadline(file): the next line without its line break, null at the
+        end of the file.
 
-        :param num:
+        :param args:
         :return:
         """
-        if num == 'null':
+        line = args[0].val.readline()
+        if not line:
             return None
-        if num.isdigit():
-            return int(num)
-        try:
-            return float(num)
-        except Exception as es:
-            return num
+        return line[:-1] if line.endswith('\n') else line
 
-    def _Parse(self, code):
+    def _FileLines(self, args):
         """
+        lines(file): a lazy stream of the lines of a path, an open file or a
+        mapped buffer, for `map`, `filter` and `fold`. A path is read again
+        each time the stream is consumed.
 
-        :param code:
+        :param args:
         :return:
         """
-        global i
-        buf = ''
-        has_space = False
-        for i in range(1, len(code) + 1):
-            c = code[i - 1]
-            if c in string.whitespace + ',;':
-                has_space = True
-                continue
-            if has_space and buf or c in [']', '}', ')']:
-                if buf == 'if':
-                    return self._ParseIf(code[i - 1:])
-                if buf == 'tantque':
-                    return self._ParseLoop(code[i - 1:])
-                return code[i - 1:], self._GetNum(buf)
-            if c == ':':
-                rest, result = self._Parse(code[i:])
-                return rest, {buf: result}
-            if c == '"':
-                return self._ParseLiString(code[i:])
-            if c == '(':
-                if buf == 'fonc':
-                    return self._ParseLiFunction(code[i:])
-                code, call = self._ParseCall(code[i:], buf)
-                while len(code.lstrip()) and code.lstrip()[0] == '(':
-                    code, call = self._ParseCall(code.lstrip()[1:], call)
-                return code, call
-            if c == '[':
-                return self._ParseLiList(code[i:])
-            if c == '{':
-                return self._ParseLiDict(code[i:])
-            buf += c
-            has_space = False
-        return code[i:], self._GetNum(buf)
-
-    def Parse(self, code):
-        """
+        source = args[0]
+        lit = self.Lit
 
-        :param code:
-        :return:
-        """
-        d = {}
-        while code:
-            code, var = self._Parse(code)
-            d.update(var)
-        return d
+        def strip(line):
+            return lit(line[:-1] if line.endswith('\n') else line)
 
-    def Present(self):
+        if isinstance(source, self.LiFile):
+            return self.LiStream(lambda: map(strip, source.val), (), self)
+        if isinstance(source, self.LiBuffer):
+            view = source.val
+
+            def buffer_lines():
+                for m in self.BUFFER_LINE.finditer(view):
+                    line = m.group(m.lastindex)
+                    yield lit(str(line[:-1] if line.endswith(b'\r') else line, 'utf-8', 'replace'))
+            return self.LiStream(buffer_lines, (), self)
+
+        path = source.val
+
+        def file_lines():
+            with open(path, 'r', buffering=self.FILE_BUFFER_SIZE, encoding='utf-8') as f:
+                yield from map(strip, f)
+        return self.LiStream(file_lines, (), self)
+
+    def _FileWrite(self, args):
+        """
+        fwrite(file value...): write the values, as they are printed, to a
+        file opened for writing.
+
+        :param args:
+        :return: the number of characters written
+        """
+        write = args[0].val.write
+        LiString = self.LiString
+        written = 0
+        for arg in args[1:]:
+            written += write(arg.val if type(arg) is LiString else str(arg))
+        return written
+
+    def _FileClose(self, args):
+        """
+
+        :param args:
+        :return:
+        """
+        val = args[0].val
+        if type(val) is memoryview:
+            closing = [m for m in self._mappings if m[1] is val.obj]
+            self._mappings = [m for m in self._mappings if m[1] is not val.obj]
+            self._Unmap(closing)
+        elif type(val) is not bytes:
+            val.close()
+
+    def _FileMap(self, args):
+        """
+        mmap(path): map a file in memory, read-only. The mapping is closed by
+        `fclose`, or when the script ends.
+
+        :param args:
+        :return:
+        """
+        with open(args[0].val, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        self._mappings.append((view, mapping))
+        return view
+
+    def _Unmap(self, mappings):
+        """
+        Close the files mapped by `mmap` in `mappings`, a list of (view,
+        mapping) pairs, and empty it. A mapping still read through a slice
+        made by `cut` stays open until the slice is freed.
+
+        :param mappings:
+        :return:
+        """
+        for (view, mapping) in mappings:
+            try:
+                view.release()
+                mapping.close()
+            except BufferError:
+                pass
+        del mappings[:]
+
+    # -----------------------------------------------------------------------------
+    # > Memoization                                                               #
+    # -----------------------------------------------------------------------------
+
+    # Default number of results a `memo` function keeps
+    MEMO_SIZE = 1024
+
+    # Built-ins with an effect besides their result, by canonical name
+    EFFECTS = ('print', 'println', 'scanf', 'open', 'read', 'write', 'close', 'ins', 'del', 'assert',
+               'import', 'fopen', 'fread', 'freadline', 'lines', 'fwrite', 'fclose', 'mmap', 'update')
+
+    def _Memo(self, args):
+        """
+        memo(f [size]): `f` with its results cached, for the last `size` sets
+        of arguments. Functions that print, do I/O, change a list in place or
+        assign a variable of an enclosing scope, or call functions that do,
+        or functions not defined yet, are refused.
+
+        :param args:
+        :return:
+        """
+        func = args[0]
+        if not isinstance(func, (self.LiFunction, self.LiMemo)):
+            raise TypeError('memo expects a function, not %s' % self._Type([func]))
+        size = args[1].val if len(args) > 1 else self.MEMO_SIZE
+        if type(size) is not int or size < 1:
+            raise ValueError('memo size must be a positive integer')
+        pending = self._CheckMemo(func, False)
+        return self.LiMemo(func, size, self, pending)
+
+    def _CheckMemo(self, func, undefined):
+        """
+        Raise a `LiImpureFunctionError` when `func` has side effects, see
+        `_Effects`; calls to names bound to nothing count with `undefined`.
+
+        :param func: a Li function or a memo function
+        :param undefined:
+        :return: whether it calls such names, without `undefined`
+        """
+        if type(func) is self.LiMemo:
+            func = func.func
+        effects = self._Effects(func, undefined=undefined)
+        if effects:
+            raise self.LiImpureFunctionError(effects)
+        return not undefined and bool(self._Effects(func))
+
+    def _MemoStats(self, args):
+        """
+        memo_stats(f): {hits misses size max} of a `memo` function.
+
+        :param args:
+        :return:
+        """
+        memo = args[0]
+        if type(memo) is not self.LiMemo:
+            raise TypeError('memo_stats expects a memo function')
+        return {'hits': memo.hits, 'misses': memo.misses, 'size': len(memo.cache), 'max': memo.size}
+
+    def _Copied(self, value):
+        """
+        `value` with its lists and dicts copied, all the way down; other
+        values cannot change and are kept.
+
+        :param value:
+        :return:
+        """
+        if type(value) is self.LiArray:
+            return self.LiArray(value.val.__copy__())
+        if isinstance(value, self.LiList):
+            seq = self.LiList.__new__(self.LiList)
+            seq.val = [self._Copied(v) for v in self._Iter(value)]
+            return seq
+        if isinstance(value, self.LiDict):
+            return self._Dict(dict([(k, self._Copied(v)) for (k, v) in value.val.items()]))
+        return value
+
+    def _Frozen(self, value):
+        """
+        Hashable form of a Li value; numbers keep their type so that 1 and
+        1.0 are different keys.
+
+        :param value:
+        :return:
+        """
+        if isinstance(value, self.LiList):
+            return ('list',) + tuple([self._Frozen(v) for v in self._Iter(value)])
+        if isinstance(value, self.LiDict):
+            return ('dict', frozenset([(k, self._Frozen(v)) for (k, v) in value.val.items()]))
+        if isinstance(value, (self.LiNumber, self.LiString, self.LiNull)):
+            return (type(value.val), value.val)
+        raise TypeError('%s cannot be a memo key' % self._Type([value]))
+
+    def _Effects(self, func, applies=False, seen=None, undefined=True):
+        """
+        The side effects of calling the Li function `func`: calls to the
+        `EFFECTS` built-ins or uses of them as values, assignments to names
+        its environment already binds, calls to names bound to nothing, and
+        the effects of the functions it reaches through the names of its
+        environment (directly or in a list or dict), followed the same way.
+        With `applies`, calls to its parameters or to computed values count
+        too, since what they run is not known here.
+
+        :param func:
+        :param applies:
+        :param seen: ids of the functions and values already looked at
+        :param undefined: whether calls to names bound to nothing count
+        :return: descriptions of the effects, empty for a pure function
+        """
+        if seen is None:
+            seen = set()
+        seen.add(id(func))
+        effects = self._EffectWords()
+        found = []
+        for (kind, k) in self._Scanned(func):
+            if kind == 'applies':
+                if applies:
+                    found.append('calls ' + k)
+                continue
+            if k in self.CATALOG:
+                if k in effects and kind != 'assigns':
+                    found.append(kind + ' ' + k)
+                continue
+            try:
+                value = self._VmLookup(func._env, k)
+            except self.LiUnboundVariableError:
+                if kind == 'calls' and undefined:
+                    found.append('calls undefined ' + k)
+                continue
+            if kind == 'assigns':
+                found.append('assigns ' + k)
+            else:
+                found.extend([k + ': ' + effect for effect in self._ValueEffects(value, applies, seen, undefined)])
+        return list(OrderedDict.fromkeys(found))
+
+    def _ValueEffects(self, value, applies, seen, undefined):
+        """
+        `_Effects` of the functions in `value`: a Li function, or the lists
+        and dicts holding some.
+
+        :param value:
+        :param applies:
+        :param seen:
+        :param undefined:
+        :return:
+        """
+        if isinstance(value, str):
+            # a built-in given by name
+            return ['calls ' + value] if value in self._EffectWords() else []
+        if id(value) in seen:
+            return []
+        if type(value) is self.LiFunction:
+            return self._Effects(value, applies, seen, undefined)
+        if type(value) is self.LiList or isinstance(value, self.LiDict):
+            seen.add(id(value))
+            items = value.val.values() if isinstance(value, self.LiDict) else value.val
+            found = []
+            for v in items:
+                if isinstance(v, (self.LiFunction, self.LiDict, self.LiList)):
+                    found.extend(self._ValueEffects(v, applies, seen, undefined))
+            return found
+        return []
+
+    def _EffectWords(self):
+        """
+        The names of the `EFFECTS` built-ins in the language of the
+        interpreter.
+
+        :return:
+        """
+        words = self.keywords[self.lang]
+        return set([words[name] for name in self.EFFECTS if name in words])
+
+    def _Scanned(self, func):
+        """
+        `_ScanEffects` of the body of the Li function `func`, kept on the
+        body.
+
+        :param func:
+        :return:
+        """
+        body = func._def
+        scanned = body.effects if type(body) is self.Node else None
+        if scanned is None:
+            scanned = self._ScanEffects(body, func._params)
+            if type(body) is self.Node:
+                body.effects = scanned
+        return scanned
+
+    # Built-ins calling the function given as their first argument, by canonical name
+    HIGHER_ORDER = ('map', 'fold', 'filter', 'pmap', 'pfilter', 'group', 'memo')
+
+    def _ScanEffects(self, body, params):
+        """
+        What a function body does with the names it does not bind itself,
+        in order: ('calls', name) for a call, ('reads', name) for any other
+        use, ('assigns', name) for an assignment; and ('applies', name) for
+        a call to one of its parameters (or to the value of an expression,
+        named '?'), or a parameter given to a `HIGHER_ORDER` built-in.
+
+        :param body: the statements of the function
+        :param params:
+        :return: a tuple of (kind, name) pairs
+        """
+        words = self.keywords[self.lang]
+        higher = set([words[name] for name in self.HIGHER_ORDER if name in words])
+        found = []
+
+        def block(statements, local, params):
+            for x in statements:
+                scan(x, local, params)
+
+        def scan(exp, local, params):
+            if isinstance(exp, str):
+                if exp not in local:
+                    found.append(('reads', exp))
+            elif isinstance(exp, dict):
+                if 'lit' in exp:
+                    lit = exp['lit']
+                    if isinstance(lit, dict):
+                        block(lit.values(), local, params)
+                    elif isinstance(lit, list):
+                        block(lit, local, params)
+                elif 'fonc' in exp:
+                    inner = set(exp.get('params', []))
+                    block(exp['fonc'], local | inner, params | inner)
+                else:
+                    for (k, v) in exp.items():
+                        scan(v, local, params)
+                        if k not in local:
+                            found.append(('assigns', k))
+                            local.add(k)
+            elif isinstance(exp, list) and exp:
+                head = exp[0]
+                if head == 'if' or head == 'tantque':
+                    scan(exp[1], local, params)
+                    for x in exp[2:]:
+                        block(x, local, params)
+                    return
+                if not isinstance(head, str):
+                    scan(head, local, params)
+                    found.append(('applies', '?'))
+                elif head in params:
+                    found.append(('applies', head))
+                elif head not in local:
+                    found.append(('calls', head))
+                    if head in higher and len(exp) > 1 and isinstance(exp[1], str) and exp[1] in params:
+                        found.append(('applies', exp[1]))
+                block(exp[1:], local, params)
+
+        params = set(params)
+        block(body, set(params), params)
+        return tuple(found)
+
+    # -----------------------------------------------------------------------------
+    # > Parallel                                                                  #
+    # -----------------------------------------------------------------------------
+
+    # Below this estimated serial time (s), `pmap` and `pfilter` stay in-process
+    PARALLEL_MIN_TIME = 0.05
+
+    # Time (s) spent on the first elements to estimate the cost of the others
+    PARALLEL_SAMPLE_TIME = 0.002
+
+    # Least work (s) handed to a worker at once, and chunks per worker
+    PARALLEL_CHUNK_TIME = 0.01
+    PARALLEL_CHUNKS = 4
+
+    # Interpreter that the functions unpickled by `_Loads` belong to
+    _loading = None
+
+    def _PMap(self, args):
+        """
+        pmap(f l): the list of f(x) for the elements x of `l`, computed by
+        worker processes when `l` is long enough to make up for shipping it.
+
+        :param args:
+        :return:
+        """
+        return self._List(self._Parallel(args[0], args[1], 'map'))
+
+    def _PFilter(self, args):
+        """
+        pfilter(f l): the list of the elements x of `l` for which f(x) is
+        true, computed like `pmap`.
+
+        :param args:
+        :return:
+        """
+        items = self._Items(args[1])
+        keep = self._Parallel(args[0], items, 'filter')
+        return self._List([x for (x, k) in zip(items, keep) if k])
+
+    def _Items(self, seq):
+        """
+        The elements of `seq`: Li values, or the raw numbers of a LiArray.
+
+        :param seq:
+        :return:
+        """
+        if type(seq) is self.LiArray:
+            return seq.val
+        if isinstance(seq, self.LiList):
+            return list(self._Iter(seq))
+        raise TypeError('expected a list, not %s' % self._Type([seq]))
+
+    def _Parallel(self, func, seq, mode):
+        """
+        The results of `func` over the elements of `seq` ('map'), or their
+        truth values ('filter'), in order.
+
+        The first elements are run here and timed; when the rest would take
+        less than `PARALLEL_MIN_TIME` it is run here too. Otherwise the rest
+        is cut in chunks of at least `PARALLEL_CHUNK_TIME` and sent with a
+        pickled copy of `func` and of the variables it sees to the worker
+        processes, which run it with the tree engine.
+
+        Built-ins, memo functions and functions with side effects are always
+        run here: those that print or assign the variables they see, call
+        functions that do, or call a parameter or a name bound to nothing
+        (see `_Effects`), whose prints would miss the output sink of this
+        interpreter and whose assignments would be lost. So are functions or
+        elements that cannot be pickled, like files, and everything run
+        under a `Budget`, whose steps and deadline are only counted in this
+        process.
+
+        :param func:
+        :param seq: a Li list, or what `_Items` returned for it
+        :param mode:
+        :return:
+        """
+        items = seq if type(seq) in (list, array) else self._Items(seq)
+        call = self._Callable(func)
+        lit = self.Lit if type(items) is array else None
+        if mode == 'map':
+            run = (lambda x: call([lit(x)])) if lit else (lambda x: call([x]))
+        else:
+            run = (lambda x: bool(call([lit(x)]).val)) if lit else (lambda x: bool(call([x]).val))
+        if (self.workers < 2 or type(func) is not self.LiFunction or self.profiler is not None
+                or self.budget is not None or self._Effects(func, applies=True)):
+            return [run(x) for x in items]
+
+        n = len(items)
+        done = []
+        start = time.perf_counter()
+        while len(done) < n:
+            done.append(run(items[len(done)]))
+            if time.perf_counter() - start >= self.PARALLEL_SAMPLE_TIME:
+                break
+        rest = n - len(done)
+        per_item = (time.perf_counter() - start) / max(len(done), 1)
+        if rest * per_item < self.PARALLEL_MIN_TIME:
+            done.extend([run(x) for x in items[len(done):]])
+            return done
+
+        size = max(-(-rest // (self.workers * self.PARALLEL_CHUNKS)), int(self.PARALLEL_CHUNK_TIME / per_item) + 1)
+        try:
+            shipped = self._Dumps(func)
+            payloads = [self._Dumps((mode, shipped, items[i:i + size])) for i in range(len(done), n, size)]
+        except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+            done.extend([run(x) for x in items[len(done):]])
+            return done
+
+        # a forked worker must not inherit text still waiting to be written
+        self.output.Flush()
+        sys.stdout.flush()
+        for data in self._Workers().map(_pool_run, payloads):
+            (status, value) = self._Loads(data)
+            if status == 'error':
+                raise self.Error(value)
+            done.extend(value)
+        return done
+
+    def _Workers(self):
+        """
+        The worker processes of `pmap` and `pfilter`, started on first use.
+
+        :return:
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, initializer=_pool_init,
+                                             initargs=(self.lang, self.keywords, self.max_depth))
+        return self._pool
+
+    def Shutdown(self):
+        """
+        Stop the worker processes of `pmap` and `pfilter`, if they were
+        started. They start again when needed.
+
+        :return:
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _Portable(self, env):
+        """
+        `env` as a chain of scopes that can be pickled: the frames of the
+        virtual machine are replaced by scopes holding their bound slots.
+
+        :param env:
+        :return:
+        """
+        if type(env) is not Li.Frame:
+            return env
+        UNSET = self.UNSET
+        return self.Scope(dict([(k, v) for (k, v) in zip(env.code.slot_names, env.slots) if v is not UNSET]),
+                          self._Portable(env.parent))
+
+    def _Dumps(self, value):
+        """
+
+        :param value:
+        :return:
+        """
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _Loads(self, data):
+        """
+        Unpickle `data`, giving the Li functions in it to this interpreter.
+
+        :param data:
+        :return:
+        """
+        previous = Li._loading
+        Li._loading = self
+        try:
+            return pickle.loads(data)
+        finally:
+            Li._loading = previous
+
+    def _RunChunk(self, payload):
+        """
+        Run one chunk sent by `_Parallel`, in a worker process.
+
+        :param payload:
+        :return: the pickled ('ok', results) or ('error', message)
+        """
+        (mode, shipped, items) = self._Loads(payload)
+        if self._shipped is None or self._shipped[0] != shipped:
+            self._shipped = (shipped, self._Loads(shipped))
+        call = self._shipped[1].Eval
+        lit = self.Lit if type(items) is array else None
+        try:
+            if lit is not None:
+                items = map(lit, items)
+            with self._RecursionLimit('tree'):
+                if mode == 'map':
+                    return self._Dumps(('ok', [call([x]) for x in items]))
+                return self._Dumps(('ok', [bool(call([x]).val) for x in items]))
+        except Exception as e:
+            return self._Dumps(('error', str(e)))
+        finally:
+            self.output.Flush()
+
+    # -----------------------------------------------------------------------------
+    # > Budgets                                                                   #
+    # -----------------------------------------------------------------------------
+
+    # Steps between two looks at the clock when a budget has a deadline
+    BUDGET_CHECK = 1024
+
+    # Steps between two calls to `_Refuel` when nothing needs checking
+    FUEL = 1 << 30
+
+    # What `_Limits` sets for the running script
+    BUDGET_STATE = ('budget', '_fuel', '_steps_left', '_deadline', '_max_size', 'max_depth')
+
+    class Budget(object):
+        """
+        Limits of one run of a script, None for no limit: `steps`, the number
+        of Li function calls and `tantque` turns, `seconds` of wall-clock
+        time, `depth`, the nesting of calls (never more than the interpreter's
+        `max_depth`), and `size`, the length of the lists and strings built
+        by `+`, `*` and `ins`. Going over one raises a `LiBudgetError`.
+
+        The clock is read every `BUDGET_CHECK` steps, so a single long call
+        to a built-in can overrun the deadline.
+        """
+        __slots__ = ('steps', 'seconds', 'depth', 'size')
+
+        def __init__(self, steps=None, seconds=None, depth=None, size=None):
+            self.steps = steps
+            self.seconds = seconds
+            self.depth = depth
+            self.size = size
+
+    @contextlib.contextmanager
+    def _Limits(self, budget):
+        """
+        Enforce `budget` (a `Budget` or None) in the `with` block. The engines
+        count the steps down in `_fuel` and call `_Refuel` when it runs out.
+
+        :param budget:
+        :return:
+        """
+        saved = [getattr(self, k) for k in self.BUDGET_STATE]
+        self.budget = budget
+        self._fuel = self.FUEL
+        self._steps_left = self._deadline = self._max_size = None
+        if budget is not None:
+            self._fuel = 0
+            self._steps_left = budget.steps
+            if budget.seconds is not None:
+                self._deadline = time.perf_counter() + budget.seconds
+            self._max_size = budget.size
+            if budget.depth is not None:
+                self.max_depth = min(self.max_depth, budget.depth)
+        try:
+            yield
+        finally:
+            for (k, v) in zip(self.BUDGET_STATE, saved):
+                setattr(self, k, v)
+
+    def _Refuel(self):
+        """
+        Check the deadline and hand out the next steps, or raise a
+        `LiBudgetError`.
+
+        :return:
+        """
+        budget = self.budget
+        if budget is None:
+            self._fuel = self.FUEL
+            return
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise self.LiBudgetError('more than %s s' % budget.seconds)
+        chunk = self.BUDGET_CHECK if self._deadline is not None else self.FUEL
+        if self._steps_left is not None:
+            if self._steps_left <= 0:
+                raise self.LiBudgetError('more than %d steps' % budget.steps)
+            chunk = min(chunk, self._steps_left)
+            self._steps_left -= chunk
+        # this call takes the first step
+        self._fuel = chunk - 1
+
+    def _CheckSize(self, value):
+        """
+        Raise a `LiBudgetError` when `value` is a list or string longer than
+        the budget allows.
+
+        :param value:
+        :return:
+        """
+        if isinstance(value, (str, list, array, bytes)):
+            self._CheckLength(len(value))
+
+    def _CheckLength(self, length):
+        """
+        Raise a `LiBudgetError` when a value of `length` would be longer than
+        the budget allows, before it is built.
+
+        :param length:
+        :return:
+        """
+        if length > self._max_size:
+            raise self.LiBudgetError('a value of length %d, more than %d' % (length, self._max_size))
+
+    def _CheckRepeat(self, args):
+        """
+        `_CheckLength` for the result of `*` on `args`, a list or string
+        repeated by the product of the other (integer) arguments.
+
+        :param args:
+        :return:
+        """
+        length, times = None, 1
+        for arg in args:
+            val = arg.val
+            if type(val) is int or type(val) is bool:
+                times *= val
+            elif isinstance(val, (str, list, array, bytes)):
+                length = len(val)
+        if length is not None:
+            self._CheckLength(length * max(times, 0))
+
+    # -----------------------------------------------------------------------------
+    # > Interpreter                                                                 #
+    # -----------------------------------------------------------------------------
+
+    def _ExecLiList(self, val, env, tail_pos=False):
+        """
+
+        :param val:
+        :param env:
+        :param tail_pos:
+        :return:
+        """
+        if len(val) == 0:
+            return self.Lit(None)
+        for exp in val[:-1]:
+            self._Eval(exp, env)
+        return self._Eval(val[-1], env, tail_pos)
+
+    def _EvalLiList(self, exp, env, tail_pos=False):
+        """
+
+        :param exp:
+        :param env:
+        :param tail_pos:
+        :return:
+        """
+        if isinstance(exp[0], str) and exp[0] in self.CATALOG:
+            if self.profiler is not None:
+                return self.Lit(self.profiler.Builtin(exp[0], exp[1:]))
+            return self.Lit(self.CATALOG[exp[0]](exp[1:]))
+        if isinstance(exp[0], (self.LiDict, self.LiList, self.LiString, self.LiBuffer)):
+            if len(exp) == 2:
+                return self.Lit(exp[0].val[exp[1].val])
+            item = self._Store(exp[0], exp[2])
+            exp[0].val[exp[1].val] = item
+            return exp[2]
+        if isinstance(exp[0], (self.LiFunction, self.LiMemo)):
+            return exp[0].Eval(exp[1:])
+        raise self.LiSyntaxError('not a function name: %s' % exp[0])
+
+    # Kinds of call sites remembered by `_EvalCall` in `Node.site`
+    SITE_NEW, SITE_BUILTIN, SITE_FUNCTION, SITE_OTHER = range(4)
+    SITE_NAMES = ('new', 'built-in', 'function', 'other')
+
+    def _EvalCall(self, exp, env, tail_pos=False):
+        """
+        Call node of `_Eval`, with an inline cache: a call node remembers in
+        `site` whether its head named a built-in or evaluated to a Li
+        function, and the next time only checks that this still holds
+        before calling it, instead of going through `_EvalLiList`.
+
+        :param exp:
+        :param env:
+        :param tail_pos:
+        :return:
+        """
+        name = exp[0]
+        site = exp.site if type(exp) is self.Node else self.SITE_OTHER
+        stats = self.site_stats
+        if site == self.SITE_BUILTIN:
+            func = self.CATALOG.get(name)
+            if func is not None and self.profiler is None:
+                if stats is not None:
+                    stats[site][0] += 1
+                args = [self._Eval(x, env) for x in exp[1:]]
+                try:
+                    return self.Lit(func(args))
+                except self.LiBudgetError:
+                    raise
+                except RecursionError:
+                    raise self.LiRecursionError(self._depth, True)
+                except Exception as e:
+                    raise self.LiLiFunctionError(e, name)
+            head = self._Eval(name, env)
+        else:
+            head = self._Eval(name, env)
+            if site == self.SITE_FUNCTION and type(head) is self.LiFunction:
+                if stats is not None:
+                    stats[site][0] += 1
+                args = [self._Eval(x, env) for x in exp[1:]]
+                if tail_pos:
+                    return self.TailCall(head, args)
+                try:
+                    return head.Eval(args)
+                except self.LiBudgetError:
+                    raise
+                except RecursionError:
+                    raise self.LiRecursionError(self._depth, True)
+                except Exception as e:
+                    raise self.LiLiFunctionError(e, name)
+        # first run of the site, or its cached kind no longer holds
+        if type(name) is str and name in self.CATALOG:
+            kind = self.SITE_BUILTIN
+        elif type(head) is self.LiFunction:
+            kind = self.SITE_FUNCTION
+        else:
+            kind = self.SITE_OTHER
+        if type(exp) is self.Node:
+            exp.site = kind
+        if stats is not None:
+            stats[kind][1] += 1
+        exp = [head] + [self._Eval(x, env) for x in exp[1:]]
+        if tail_pos and isinstance(head, self.LiFunction):
+            return self.TailCall(head, exp[1:])
+        try:
+            return self._EvalLiList(exp, env, tail_pos)
+        except self.LiBudgetError:
+            raise
+        except RecursionError:
+            raise self.LiRecursionError(self._depth, True)
+        except Exception as e:
+            raise self.LiLiFunctionError(e, name)
+
+    def TrackCallSites(self):
+        """
+        Start counting the hits and misses of the call site caches of the
+        tree engine, see `CallSiteStats`.
+
+        :return:
+        """
+        self.site_stats = dict((kind, [0, 0]) for kind in range(len(self.SITE_NAMES)))
+
+    def CallSiteStats(self):
+        """
+        Hits and misses of the call site caches since `TrackCallSites`, one
+        line per kind of site. 'other' sites (indexing, built-ins passed in
+        a variable) have no fast path and only count misses.
+
+        :return:
+        """
+        lines = ['%-10s %12s %12s %9s' % ('call site', 'hits', 'misses', 'hit rate')]
+        for kind in (self.SITE_BUILTIN, self.SITE_FUNCTION, self.SITE_OTHER):
+            hits, misses = self.site_stats[kind]
+            total = hits + misses
+            lines.append('%-10s %12d %12d %8.1f%%' % (
+                self.SITE_NAMES[kind], hits, misses, 100.0 * hits / total if total else 0.0))
+        return '\n'.join(lines) + '\n'
+
+    def _IfBlock(self, exp, env, tail_pos=False):
+        """
+
+        :param exp:
+        :param env:
+        :param tail_pos:
+        :return:
+        """
+        for i in range(0, len(exp) - 1, 2):
+            if self._Eval(exp[i], env).val:
+                return self._ExecLiList(exp[i + 1], env, tail_pos)
+        if len(exp) % 2:
+            return self._ExecLiList(exp[-1], env, tail_pos)
+        return self.Lit(None)
+
+    def _LoopBlock(self, exp, env, tail_pos=False):
+        """
+
+        :param exp:
+        :param env:
+        :param tail_pos:
+        :return:
+        """
+        for i in range(0, len(exp) - 1, 2):
+            while self._Eval(exp[i], env).val:
+                self._fuel -= 1
+                if self._fuel < 0:
+                    self._Refuel()
+                self._ExecLiList(exp[i + 1], env)
+        if len(exp) % 2:
+            return self._ExecLiList(exp[-1], env, tail_pos)
+        return self.Lit(None)
+
+    def _Eval(self, exp, env, tail_pos=False):
+        """
+
+        :param exp:
+        :param env:
+        :param tail_pos:
+        :return:
+        """
+        if type(exp) is str:
+            if exp in self.CATALOG:
+                return exp
+            try:
+                return env[exp]
+            except Exception as e:
+                raise self.LiUnboundVariableError(e)
+        if isinstance(exp, self.Type):
+            return exp
+        if isinstance(exp, numbers.Number):
+            return self.Lit(exp, env)
+        if isinstance(exp, dict):
+            if 'lit' in exp:
+                return self.Lit(exp['lit'], env)
+            if 'fonc' in exp:
+                return self.LiFunction(exp, env, self)
+            ret = self.Lit(None)
+            for (k, v) in exp.items():
+                if k in self.RESERVED: raise self.LiReservedWordError(k)
+                ret = env[k] = self._Eval(v, env)
+            return ret
+        if isinstance(exp, list):
+            name = exp[0]
+            if name == 'if':
+                return self._IfBlock(exp[1:], env, tail_pos)
+            if name == 'tantque':
+                if self.profiler is not None:
+                    return self.profiler.Loop(exp, env, tail_pos)
+                return self._LoopBlock(exp[1:], env, tail_pos)
+            return self._EvalCall(exp, env, tail_pos)
+        try:
+            return env[exp]
+        except Exception as e:
+            raise self.LiUnboundVariableError(e)
+
+    # -----------------------------------------------------------------------------
+    # > Compiler                                                                  #
+    # -----------------------------------------------------------------------------
+
+    def _CompileBlock(self, val, tail_pos=False):
+        """
+        Compiled counterpart of `_ExecLiList`.
+
+        :param val:
+        :param tail_pos:
+        :return:
+        """
+        if len(val) == 0:
+            return lambda env: self.Lit(None)
+        init = [self._Compile(exp) for exp in val[:-1]]
+        last = self._Compile(val[-1], tail_pos)
+
+        def run(env):
+            for c in init:
+                c(env)
+            return last(env)
+
+        return run
+
+    def _CompileBranches(self, exp, tail_pos=False, tail_blocks=False):
+        """
+        Split the operands of `if`/`tantque` into compiled (cond, block) pairs
+        and an optional compiled trailing block.
+
+        :param exp:
+        :param tail_pos: whether the trailing block is in tail position
+        :param tail_blocks: whether the paired blocks are in tail position
+        :return:
+        """
+        branches = [(self._Compile(exp[i]), self._CompileBlock(exp[i + 1], tail_blocks))
+                    for i in range(0, len(exp) - 1, 2)]
+        if len(exp) % 2:
+            return branches, self._CompileBlock(exp[-1], tail_pos)
+        return branches, None
+
+    def _CompileIf(self, exp, tail_pos=False):
+        """
+        Compiled counterpart of `_IfBlock`.
+
+        :param exp:
+        :param tail_pos:
+        :return:
+        """
+        branches, orelse = self._CompileBranches(exp, tail_pos, tail_pos)
+
+        def run(env):
+            for (cond, block) in branches:
+                if cond(env).val:
+                    return block(env)
+            if orelse is not None:
+                return orelse(env)
+            return self.Lit(None)
+
+        return run
+
+    def _CompileLoop(self, exp, tail_pos=False):
+        """
+        Compiled counterpart of `_LoopBlock`.
+
+        :param exp:
+        :param tail_pos:
+        :return:
+        """
+        branches, orelse = self._CompileBranches(exp, tail_pos)
+
+        def run(env):
+            for (cond, block) in branches:
+                while cond(env).val:
+                    self._fuel -= 1
+                    if self._fuel < 0:
+                        self._Refuel()
+                    block(env)
+            if orelse is not None:
+                return orelse(env)
+            return self.Lit(None)
+
+        return run
+
+    def _CompileCall(self, exp, tail_pos=False):
+        """
+        Compiled counterpart of the call branch of `_Eval`; calls whose head
+        names a built-in skip `_EvalLiList` and go straight to the catalog.
+
+        :param exp:
+        :param tail_pos:
+        :return:
+        """
+        name = exp[0]
+        parts = [self._Compile(x) for x in exp]
+
+        if isinstance(name, str) and name in self.CATALOG:
+            catalog = self.CATALOG
+            args = parts[1:]
+
+            def run_builtin(env):
+                vals = [c(env) for c in args]
+                try:
+                    return self.Lit(catalog[name](vals))
+                except self.LiBudgetError:
+                    raise
+                except RecursionError:
+                    raise self.LiRecursionError(self._depth, True)
+                except Exception as e:
+                    raise self.LiLiFunctionError(e, name)
+
+            return run_builtin
+
+        def run(env):
+            vals = [c(env) for c in parts]
+            if tail_pos and isinstance(vals[0], self.LiFunction):
+                return self.TailCall(vals[0], vals[1:])
+            try:
+                return self._EvalLiList(vals, env, tail_pos)
+            except self.LiBudgetError:
+                raise
+            except RecursionError:
+                raise self.LiRecursionError(self._depth, True)
+            except Exception as e:
+                raise self.LiLiFunctionError(e, name)
+
+        return run
+
+    def _CompileLit(self, val):
+        """
+        Compile the payload of a `{'lit': ...}` node. Containers are rebuilt on
+        every run since they are mutable, everything else is built once.
+
+        :param val:
+        :return:
+        """
+        if type(val) is self.ConstList:
+            return lambda env: self._List(val)
+        if isinstance(val, list):
+            items = [self._Compile(v) for v in val]
+            return lambda env: self._List([c(env) for c in items], env)
+        if isinstance(val, dict):
+            items = [(k, self._Compile(v)) for (k, v) in val.items()]
+            return lambda env: self._Dict(dict([(k, c(env)) for (k, c) in items]), env)
+        lit = self.Lit(val)
+        return lambda env: lit
+
+    def _CompileBind(self, exp):
+        """
+        Compiled counterpart of the assignment branch of `_Eval`.
+
+        :param exp:
+        :return:
+        """
+        items = [(k, self._Compile(v)) for (k, v) in exp.items()]
+
+        def run(env):
+            ret = self.Lit(None)
+            for (k, c) in items:
+                if k in self.RESERVED: raise self.LiReservedWordError(k)
+                ret = env[k] = c(env)
+            return ret
+
+        return run
+
+    def _CompileName(self, exp):
+        """
+        Compiled variable read. Names imported into the catalog after
+        compilation still resolve to the built-in, as in `_Eval`.
+
+        :param exp:
+        :return:
+        """
+        def run(env):
+            scope = env
+            while scope is not None:
+                vars = scope.vars
+                if exp in vars:
+                    return vars[exp]
+                scope = scope.parent
+            if isinstance(exp, str) and exp in self.CATALOG:
+                return exp
+            raise self.LiUnboundVariableError(KeyError(exp))
+
+        return run
+
+    def _Compile(self, exp, tail_pos=False):
+        """
+        Turn a parse tree node into a closure `run(env)` behaving like
+        `_Eval(exp, env, tail_pos)`, with every type test done once up front.
+
+        :param exp:
+        :param tail_pos:
+        :return:
+        """
+        if isinstance(exp, self.Type) or isinstance(exp, str) and exp in self.CATALOG:
+            return lambda env: exp
+        if isinstance(exp, numbers.Number):
+            lit = self.Lit(exp)
+            return lambda env: lit
+        if isinstance(exp, dict):
+            if 'lit' in exp:
+                return self._CompileLit(exp['lit'])
+            if 'fonc' in exp:
+                body = self._CompileBlock(exp.get('fonc', []), True)
+                return lambda env: self.LiFunction(exp, env, self, body)
+            return self._CompileBind(exp)
+        if isinstance(exp, list):
+            if exp[0] == 'if':
+                return self._CompileIf(exp[1:], tail_pos)
+            if exp[0] == 'tantque':
+                return self._CompileLoop(exp[1:], tail_pos)
+            return self._CompileCall(exp, tail_pos)
+        return self._CompileName(exp)
+
+    # -----------------------------------------------------------------------------
+    # > Stack machine                                                             #
+    # -----------------------------------------------------------------------------
+
+    def _StackBody(self, block):
+        """
+        Body of a function defined under the stack machine.
+
+        :param block:
+        :return:
+        """
+        return lambda env: self._RunStack(block, env)
+
+    def _RunStack(self, block, env, tail_pos=True, awaitables=None, resume=None):
+        """
+        Evaluate a block like `_ExecLiList`, keeping pending work on an
+        explicit task stack and intermediate results on a value stack, so
+        Li calls nest without nesting Python calls. Entering a function
+        pushes a RETURN task under its body; a call in tail position finds
+        its caller's RETURN task on top and reuses it.
+
+        For `RunAsync`, with `awaitables`: a built-in called by the block
+        itself may return an awaitable, and every `ASYNC_SLICE` turns of a
+        `tantque` loop the machine gives way. It then returns a `Suspended`
+        holding its stacks, to be passed back as `resume` once the value of
+        the built-in (or its error) is there.
+
+        :param block:
+        :param env:
+        :param tail_pos:
+        :param awaitables: name -> built-in, replacing those of CATALOG
+        :param resume: a `Suspended` to go on with
+        :return:
+        """
+        EVAL, BLOCK, POP, ASSIGN, BRANCH, LOOP, CALL, RETURN, LIST, DICT = range(10)
+        catalog = self.CATALOG
+        if resume is None:
+            tasks = [(BLOCK, block, env, tail_pos)]
+            vals = []
+            base_depth = self._depth
+            turns = 0
+        else:
+            (tasks, vals, base_depth, turns) = (resume.tasks, resume.vals, resume.base_depth, resume.turns)
+        try:
+            if resume is not None and resume.error is not None:
+                raise self.LiLiFunctionError(resume.error, resume.name)
+            while tasks:
+                task = tasks.pop()
+                op = task[0]
+                if op == EVAL:
+                    _, exp, env, tail = task
+                    if isinstance(exp, str):
+                        if exp in catalog:
+                            vals.append(exp)
+                        else:
+                            try:
+                                vals.append(env[exp])
+                            except Exception as e:
+                                raise self.LiUnboundVariableError(e)
+                    elif isinstance(exp, list):
+                        if exp[0] == 'if':
+                            tasks.append((BRANCH, exp, 1, env, tail))
+                            tasks.append((EVAL, exp[1], env, False))
+                        elif exp[0] == 'tantque':
+                            tasks.append((LOOP, exp, 1, env, tail))
+                            tasks.append((EVAL, exp[1], env, False))
+                        else:
+                            tasks.append((CALL, exp, env, tail))
+                            for part in reversed(exp):
+                                tasks.append((EVAL, part, env, False))
+                    elif isinstance(exp, self.Type):
+                        vals.append(exp)
+                    elif isinstance(exp, numbers.Number):
+                        vals.append(self.Lit(exp, env))
+                    elif isinstance(exp, dict):
+                        if 'lit' in exp:
+                            val = exp['lit']
+                            if type(val) is self.ConstList:
+                                vals.append(self._List(val))
+                            elif isinstance(val, list):
+                                tasks.append((LIST, len(val), env, None))
+                                for v in reversed(val):
+                                    tasks.append((EVAL, v, env, False))
+                            elif isinstance(val, dict):
+                                tasks.append((DICT, list(val), env, None))
+                                for v in reversed(list(val.values())):
+                                    tasks.append((EVAL, v, env, False))
+                            else:
+                                vals.append(self.Lit(val, env))
+                        elif 'fonc' in exp:
+                            vals.append(self.LiFunction(exp, env, self, self._StackBody(exp.get('fonc', []))))
+                        elif not exp:
+                            vals.append(self.Lit(None))
+                        else:
+                            first = True
+                            for (k, v) in reversed(list(exp.items())):
+                                if k in self.RESERVED: raise self.LiReservedWordError(k)
+                                if not first:
+                                    tasks.append((POP,))
+                                tasks.append((ASSIGN, k, env))
+                                tasks.append((EVAL, v, env, False))
+                                first = False
+                    else:
+                        try:
+                            vals.append(env[exp])
+                        except Exception as e:
+                            raise self.LiUnboundVariableError(e)
+                elif op == CALL:
+                    _, exp, env, tail = task
+                    n = len(exp)
+                    args = vals[-n:]
+                    del vals[-n:]
+                    head = args[0]
+                    if isinstance(head, self.LiFunction):
+                        self._fuel -= 1
+                        if self._fuel < 0:
+                            self._Refuel()
+                        if not tail:
+                            self._depth += 1
+                            if self._depth > self.max_depth:
+                                raise self.LiRecursionError(self._depth)
+                            tasks.append((RETURN, exp[0]))
+                        tasks.append((BLOCK, head._def,
+                                      self.Scope(dict(zip(head._params, args[1:])), head._env), True))
+                    elif awaitables is not None and type(head) is str and self.profiler is None:
+                        try:
+                            result = awaitables.get(head, catalog[head])(args[1:])
+                        except self.LiBudgetError:
+                            raise
+                        except Exception as e:
+                            raise self.LiLiFunctionError(e, exp[0])
+                        if inspect.isawaitable(result):
+                            return self.Suspended(tasks, vals, base_depth, turns, result, exp[0])
+                        vals.append(self.Lit(result))
+                    else:
+                        try:
+                            vals.append(self._EvalLiList(args, env))
+                        except self.LiBudgetError:
+                            raise
+                        except Exception as e:
+                            raise self.LiLiFunctionError(e, exp[0])
+                elif op == BLOCK:
+                    _, stmts, env, tail = task
+                    if len(stmts) == 0:
+                        vals.append(self.Lit(None))
+                        continue
+                    tasks.append((EVAL, stmts[-1], env, tail))
+                    for i in range(len(stmts) - 2, -1, -1):
+                        tasks.append((POP,))
+                        tasks.append((EVAL, stmts[i], env, False))
+                elif op == POP:
+                    vals.pop()
+                elif op == ASSIGN:
+                    task[2][task[1]] = vals[-1]
+                elif op == RETURN:
+                    self._depth -= 1
+                elif op == BRANCH or op == LOOP:
+                    _, exp, i, env, tail = task
+                    if vals.pop().val:
+                        if op == BRANCH:
+                            tasks.append((BLOCK, exp[i + 1], env, tail))
+                        else:
+                            self._fuel -= 1
+                            if self._fuel < 0:
+                                self._Refuel()
+                            tasks.append(task)
+                            tasks.append((EVAL, exp[i], env, False))
+                            tasks.append((POP,))
+                            tasks.append((BLOCK, exp[i + 1], env, False))
+                            if awaitables is not None:
+                                turns += 1
+                                if turns == self.ASYNC_SLICE:
+                                    return self.Suspended(tasks, vals, base_depth, 0, None, None)
+                        continue
+                    i += 2
+                    if i + 1 < len(exp):
+                        tasks.append((op, exp, i, env, tail))
+                        tasks.append((EVAL, exp[i], env, False))
+                    elif i < len(exp):
+                        tasks.append((BLOCK, exp[i], env, tail))
+                    else:
+                        vals.append(self.Lit(None))
+                elif op == LIST:
+                    n = task[1]
+                    items = vals[len(vals) - n:]
+                    del vals[len(vals) - n:]
+                    vals.append(self._List(items, task[2]))
+                elif op == DICT:
+                    keys = task[1]
+                    items = vals[len(vals) - len(keys):]
+                    del vals[len(vals) - len(keys):]
+                    vals.append(self._Dict(dict(zip(keys, items)), task[2]))
+        except Exception as e:
+            if not isinstance(e, self.LiBudgetError):
+                for task in reversed(tasks):
+                    if task[0] == RETURN:
+                        e = self.LiLiFunctionError(e, task[1])
+            self._depth = base_depth
+            raise e
+        return vals[-1]
+
+    class Suspended(object):
+        """
+        Where `_RunStack` stopped for `RunAsync`: its stacks, and what it
+        waits for, the awaitable returned by the built-in `name` or None
+        when it only gives way. `error` is set when the awaitable failed.
+        """
+        __slots__ = ('tasks', 'vals', 'base_depth', 'turns', 'awaited', 'name', 'error')
+
+        def __init__(self, tasks, vals, base_depth, turns, awaited, name):
+            self.tasks = tasks
+            self.vals = vals
+            self.base_depth = base_depth
+            self.turns = turns
+            self.awaited = awaited
+            self.name = name
+            self.error = None
+
+    # -----------------------------------------------------------------------------
+    # > Bytecode                                                                  #
+    # -----------------------------------------------------------------------------
+
+    # Opcodes of the virtual machine; every opcode is followed by one argument
+    (OP_CONST, OP_NULL, OP_POP, OP_LOAD_FAST, OP_STORE_FAST, OP_STORE_LOCAL, OP_LOAD_NAME,
+     OP_LOAD_GLOBAL, OP_STORE_GLOBAL, OP_JUMP, OP_JUMP_IF_FALSE, OP_CALL, OP_TAIL_CALL,
+     OP_RETURN, OP_FUNCTION, OP_LIST, OP_DICT, OP_RESERVED) = range(18)
+
+    # Value of a frame slot whose variable is not bound yet
+    UNSET = object()
+
+    class Code(object):
+        """
+        A compiled function body, or the top level of a script. `ops` is a
+        flat array of (opcode, argument) pairs; arguments index `consts`,
+        `names`, `calls` (argument count and head of each call site) or the
+        frame slots named in `slot_names`, parameters first.
+        """
+        __slots__ = ('name', 'ops', 'consts', 'names', 'calls', 'slot_names', 'slot_index', 'nparams')
+
+        def __init__(self, name):
+            self.name = name
+            self.ops = array('i')
+            self.consts = []
+            self.names = []
+            self.calls = []
+            self.slot_names = []
+            self.slot_index = {}
+            self.nparams = 0
+
+    class Frame(object):
+        """
+        Activation of a `Code` in the virtual machine. `parent` is the scope
+        the function was defined in (a Frame or a Scope), `name` the head of
+        the call site, used to report errors.
+        """
+        __slots__ = ('code', 'slots', 'parent', 'globals', 'pc', 'name')
+
+        def __init__(self, code, slots, parent, globals, name=None):
+            self.code = code
+            self.slots = slots
+            self.parent = parent
+            self.globals = globals
+            self.pc = 0
+            self.name = name
+
+    class _Assembler(object):
+        """
+        Compiles one function body, or the top level, to a `Code`.
+
+        Parameters and names assigned in the body get a frame slot. Names
+        assigned here that may also be bound in an enclosing function or
+        dict are stored with STORE_LOCAL, which rebinds the enclosing
+        variable when it exists, like `Scope` does. Names that are only
+        read here are looked up along the enclosing scopes (LOAD_NAME), or
+        straight in the globals when no enclosing scope binds them.
+        """
+
+        def __init__(self, li, name, params=(), body=(), outer=frozenset(), globals=None):
+            self.li = li
+            self.code = li.Code(name)
+            self.ops = []
+            self.outer = outer
+            self.module = globals is None
+            self.globals = set(li._AssignedNames(body)) if self.module else globals
+            self.shared = set()
+            self.const_index = {}
+            self.name_index = {}
+            for param in params:
+                self.Slot(param)
+            self.code.nparams = len(self.code.slot_names)
+            if not self.module:
+                for k in li._AssignedNames(body):
+                    if k in self.code.slot_index:
+                        continue
+                    if k in outer:
+                        self.Slot(k)
+                        self.shared.add(k)
+                    elif k not in self.globals:
+                        self.Slot(k)
+
+        def Slot(self, k):
+            """
+
+            :param k:
+            :return:
+            """
+            self.code.slot_index[k] = len(self.code.slot_names)
+            self.code.slot_names.append(k)
+
+        def Emit(self, op, arg=0):
+            """
+            Append an instruction, return its position for `Patch`.
+
+            :param op:
+            :param arg:
+            :return:
+            """
+            self.ops.append(op)
+            self.ops.append(arg)
+            return len(self.ops) - 2
+
+        def Patch(self, at):
+            """
+            Point the jump at `at` to the next instruction.
+
+            :param at:
+            :return:
+            """
+            self.ops[at + 1] = len(self.ops)
+
+        def Const(self, val):
+            """
+
+            :param val:
+            :return:
+            """
+            key = (type(val), val) if isinstance(val, (str, numbers.Number)) else id(val)
+            if key not in self.const_index:
+                self.const_index[key] = len(self.code.consts)
+                self.code.consts.append(val)
+            return self.const_index[key]
+
+        def Name(self, k):
+            """
+
+            :param k:
+            :return:
+            """
+            if k not in self.name_index:
+                self.name_index[k] = len(self.code.names)
+                self.code.names.append(k)
+            return self.name_index[k]
+
+        def Finish(self):
+            """
+
+            :return:
+            """
+            self.Emit(self.li.OP_RETURN)
+            self.code.ops = array('i', self.ops)
+            return self.code
+
+        def Load(self, k):
+            """
+
+            :param k:
+            :return:
+            """
+            li = self.li
+            if k in self.code.slot_index:
+                self.Emit(li.OP_LOAD_FAST, self.code.slot_index[k])
+            elif k in self.outer:
+                self.Emit(li.OP_LOAD_NAME, self.Name(k))
+            else:
+                self.Emit(li.OP_LOAD_GLOBAL, self.Name(k))
+
+        def Store(self, k):
+            """
+
+            :param k:
+            :return:
+            """
+            li = self.li
+            if k not in self.code.slot_index:
+                self.Emit(li.OP_STORE_GLOBAL, self.Name(k))
+            elif k in self.shared:
+                self.Emit(li.OP_STORE_LOCAL, self.code.slot_index[k])
+            else:
+                self.Emit(li.OP_STORE_FAST, self.code.slot_index[k])
+
+        def Block(self, stmts, tail_pos=False):
+            """
+
+            :param stmts:
+            :param tail_pos:
+            :return:
+            """
+            if len(stmts) == 0:
+                self.Emit(self.li.OP_NULL)
+                return
+            for exp in stmts[:-1]:
+                self.Expr(exp)
+                self.Emit(self.li.OP_POP)
+            self.Expr(stmts[-1], tail_pos)
+
+        def If(self, exp, tail_pos):
+            """
+
+            :param exp:
+            :param tail_pos:
+            :return:
+            """
+            li = self.li
+            ends = []
+            i = 1
+            while i + 1 < len(exp):
+                self.Expr(exp[i])
+                skip = self.Emit(li.OP_JUMP_IF_FALSE)
+                self.Block(exp[i + 1], tail_pos)
+                ends.append(self.Emit(li.OP_JUMP))
+                self.Patch(skip)
+                i += 2
+            if i < len(exp):
+                self.Block(exp[i], tail_pos)
+            else:
+                self.Emit(li.OP_NULL)
+            for end in ends:
+                self.Patch(end)
+
+        def Loop(self, exp, tail_pos):
+            """
+
+            :param exp:
+            :param tail_pos:
+            :return:
+            """
+            li = self.li
+            i = 1
+            while i + 1 < len(exp):
+                start = len(self.ops)
+                self.Expr(exp[i])
+                done = self.Emit(li.OP_JUMP_IF_FALSE)
+                self.Block(exp[i + 1])
+                self.Emit(li.OP_POP)
+                self.Emit(li.OP_JUMP, start)
+                self.Patch(done)
+                i += 2
+            if i < len(exp):
+                self.Block(exp[i], tail_pos)
+            else:
+                self.Emit(li.OP_NULL)
+
+        def Call(self, exp, tail_pos):
+            """
+
+            :param exp:
+            :param tail_pos:
+            :return:
+            """
+            for part in exp:
+                self.Expr(part)
+            self.code.calls.append((len(exp) - 1, exp[0]))
+            op = self.li.OP_TAIL_CALL if tail_pos and not self.module else self.li.OP_CALL
+            self.Emit(op, len(self.code.calls) - 1)
+
+        def Function(self, d, name='fonc', members=()):
+            """
+
+            :param d:
+            :param name:
+            :param members: keys of the dict literal the function is a value of
+            :return:
+            """
+            outer = self.outer.union(self.code.slot_index, members)
+            sub = self.li._Assembler(self.li, name, d.get('params', []), d.get('fonc', []),
+                                     frozenset(outer), self.globals)
+            sub.Block(d.get('fonc', []), True)
+            self.Emit(self.li.OP_FUNCTION, self.Const((d, sub.Finish())))
+
+        def Lit(self, val):
+            """
+
+            :param val:
+            :return:
+            """
+            li = self.li
+            if isinstance(val, list):
+                for v in val:
+                    self.Expr(v)
+                self.Emit(li.OP_LIST, len(val))
+            elif isinstance(val, dict):
+                for (k, v) in val.items():
+                    if isinstance(v, dict) and 'fonc' in v:
+                        self.Function(v, k, val)
+                    else:
+                        self.Expr(v)
+                self.Emit(li.OP_DICT, self.Const(tuple(val)))
+            else:
+                self.Emit(li.OP_CONST, self.Const(li.Lit(val)))
+
+        def Expr(self, exp, tail_pos=False):
+            """
+
+            :param exp:
+            :param tail_pos:
+            :return:
+            """
+            li = self.li
+            if isinstance(exp, str):
+                if exp in li.CATALOG:
+                    self.Emit(li.OP_CONST, self.Const(exp))
+                else:
+                    self.Load(exp)
+            elif isinstance(exp, list):
+                if exp[0] == 'if':
+                    self.If(exp, tail_pos)
+                elif exp[0] == 'tantque':
+                    self.Loop(exp, tail_pos)
+                else:
+                    self.Call(exp, tail_pos)
+            elif isinstance(exp, li.Type):
+                self.Emit(li.OP_CONST, self.Const(exp))
+            elif isinstance(exp, numbers.Number):
+                self.Emit(li.OP_CONST, self.Const(li.Lit(exp)))
+            elif isinstance(exp, dict):
+                if 'lit' in exp:
+                    self.Lit(exp['lit'])
+                elif 'fonc' in exp:
+                    self.Function(exp)
+                elif not exp:
+                    self.Emit(li.OP_NULL)
+                else:
+                    for (i, (k, v)) in enumerate(exp.items()):
+                        if i:
+                            self.Emit(li.OP_POP)
+                        if k in li.RESERVED:
+                            self.Emit(li.OP_RESERVED, self.Name(k))
+                        if isinstance(v, dict) and 'fonc' in v:
+                            self.Function(v, k)
+                        else:
+                            self.Expr(v)
+                        self.Store(k)
+            else:
+                self.Load(exp)
+
+    def _AssignedNames(self, exps):
+        """
+        Names bound by assignments in `exps`, without looking into the
+        bodies of nested functions.
+
+        :param exps:
+        :return:
+        """
+        names = {}
+        todo = list(exps)
+        while todo:
+            exp = todo.pop()
+            if isinstance(exp, list):
+                todo.extend(exp)
+            elif isinstance(exp, dict):
+                if 'fonc' in exp:
+                    continue
+                if 'lit' in exp:
+                    val = exp['lit']
+                    if isinstance(val, list):
+                        todo.extend(val)
+                    elif isinstance(val, dict):
+                        todo.extend(val.values())
+                    continue
+                for (k, v) in exp.items():
+                    names[k] = True
+                    todo.append(v)
+        return list(names)
+
+    def _Assemble(self, json_dict):
+        """
+        Compile a parsed script to the `Code` of its top level.
+
+        :param json_dict:
+        :return:
+        """
+        assembler = self._Assembler(self, '<script>', (), [json_dict])
+        assembler.Expr(json_dict)
+        return assembler.Finish()
+
+    # -----------------------------------------------------------------------------
+    # > Virtual machine                                                           #
+    # -----------------------------------------------------------------------------
+
+    def _VmLookup(self, env, k):
+        """
+        Read `k` along a chain of frames and scopes.
+
+        :param env:
+        :param k:
+        :return:
+        """
+        UNSET = self.UNSET
+        while env is not None:
+            if type(env) is Li.Frame:
+                i = env.code.slot_index.get(k)
+                if i is not None and env.slots[i] is not UNSET:
+                    return env.slots[i]
+            elif k in env.vars:
+                return env.vars[k]
+            env = env.parent
+        if isinstance(k, str) and k in self.CATALOG:
+            return k
+        raise self.LiUnboundVariableError(KeyError(k))
+
+    def _VmRebind(self, env, k, v):
+        """
+        Assign `k` in the nearest frame or scope of the chain that binds it.
+
+        :param env:
+        :param k:
+        :param v:
+        :return: False when no scope binds `k`
+        """
+        UNSET = self.UNSET
+        while env is not None:
+            if type(env) is Li.Frame:
+                i = env.code.slot_index.get(k)
+                if i is not None and env.slots[i] is not UNSET:
+                    env.slots[i] = v
+                    return True
+            elif k in env.vars:
+                env.vars[k] = v
+                return True
+            env = env.parent
+        return False
+
+    def _VmSlots(self, code, args):
+        """
+        Initial frame slots of a call: the arguments, then unbound locals.
+
+        :param code:
+        :param args:
+        :return:
+        """
+        slots = list(args[:code.nparams])
+        slots.extend([self.UNSET] * (len(code.slot_names) - len(slots)))
+        return slots
+
+    def _RunVM(self, code, slots, parent, globals):
+        """
+        Execute `code` until its frame returns. Calls between compiled
+        functions push a `Frame` on a Python list instead of recursing, tail
+        calls replace the current frame.
+
+        :param code:
+        :param slots:
+        :param parent:
+        :param globals: the dict of top-level variables
+        :return:
+        """
+        (CONST, NULL, POP, LOAD_FAST, STORE_FAST, STORE_LOCAL, LOAD_NAME,
+         LOAD_GLOBAL, STORE_GLOBAL, JUMP, JUMP_IF_FALSE, CALL, TAIL_CALL,
+         RETURN, FUNCTION, LIST, DICT, RESERVED) = range(18)
+        UNSET = self.UNSET
+        catalog = self.CATALOG
+        LiFunction = self.LiFunction
+        Frame = self.Frame
+
+        frame = Frame(code, slots, parent, globals)
+        frames = []
+        stack = []
+        ops, consts, pc = code.ops, code.consts, 0
+        base_depth = self._depth
+        try:
+            while True:
+                op = ops[pc]
+                arg = ops[pc + 1]
+                pc += 2
+                if op == LOAD_FAST:
+                    v = slots[arg]
+                    if v is UNSET:
+                        v = self._VmLookup(frame.parent, code.slot_names[arg])
+                    stack.append(v)
+                elif op == CONST:
+                    stack.append(consts[arg])
+                elif op == CALL or op == TAIL_CALL:
+                    nargs, name = code.calls[arg]
+                    head = stack[-nargs - 1]
+                    if type(head) is LiFunction and head._code is not None:
+                        self._fuel -= 1
+                        if self._fuel < 0:
+                            self._Refuel()
+                        callee = head._code
+                        new_slots = stack[len(stack) - nargs:]
+                        del stack[len(stack) - nargs - 1:]
+                        if nargs != callee.nparams:
+                            del new_slots[callee.nparams:]
+                        if len(new_slots) < len(callee.slot_names):
+                            new_slots.extend([UNSET] * (len(callee.slot_names) - len(new_slots)))
+                        if op == CALL:
+                            self._depth += 1
+                            if self._depth > self.max_depth:
+                                raise self.LiRecursionError(self._depth)
+                            frame.pc = pc
+                            frames.append(frame)
+                            frame = Frame(callee, new_slots, head._env, head._globals, name)
+                        else:
+                            # closures may hold on to the old frame, do not reuse it
+                            frame = Frame(callee, new_slots, head._env, head._globals, frame.name)
+                        code, slots = callee, new_slots
+                        ops, consts, pc = code.ops, code.consts, 0
+                        globals = frame.globals
+                        continue
+                    args = stack[len(stack) - nargs - 1:]
+                    del stack[len(stack) - nargs - 1:]
+                    try:
+                        if isinstance(head, str) and head in catalog:
+                            stack.append(self.Lit(catalog[head](args[1:])))
+                        else:
+                            stack.append(self._EvalLiList(args, frame))
+                    except self.LiBudgetError:
+                        raise
+                    except RecursionError:
+                        raise self.LiRecursionError(self._depth, True)
+                    except Exception as e:
+                        raise self.LiLiFunctionError(e, name)
+                elif op == POP:
+                    stack.pop()
+                elif op == JUMP_IF_FALSE:
+                    if not stack.pop().val:
+                        pc = arg
+                elif op == JUMP:
+                    if arg < pc:
+                        # the end of a loop
+                        self._fuel -= 1
+                        if self._fuel < 0:
+                            self._Refuel()
+                    pc = arg
+                elif op == STORE_FAST:
+                    slots[arg] = stack[-1]
+                elif op == LOAD_GLOBAL:
+                    k = code.names[arg]
+                    v = globals.get(k, UNSET)
+                    if v is UNSET:
+                        if not (isinstance(k, str) and k in catalog):
+                            raise self.LiUnboundVariableError(KeyError(k))
+                        v = k
+                    stack.append(v)
+                elif op == RETURN:
+                    if not frames:
+                        return stack.pop()
+                    self._depth -= 1
+                    frame = frames.pop()
+                    code, slots, globals = frame.code, frame.slots, frame.globals
+                    ops, consts, pc = code.ops, code.consts, frame.pc
+                elif op == LOAD_NAME:
+                    stack.append(self._VmLookup(frame.parent, code.names[arg]))
+                elif op == STORE_LOCAL:
+                    if slots[arg] is not UNSET or not self._VmRebind(frame.parent, code.slot_names[arg], stack[-1]):
+                        slots[arg] = stack[-1]
+                elif op == STORE_GLOBAL:
+                    globals[code.names[arg]] = stack[-1]
+                elif op == NULL:
+                    stack.append(self.Lit(None))
+                elif op == FUNCTION:
+                    d, fcode = consts[arg]
+                    func = LiFunction(d, frame, self, code=fcode)
+                    func._globals = globals
+                    stack.append(func)
+                elif op == LIST:
+                    items = stack[len(stack) - arg:]
+                    del stack[len(stack) - arg:]
+                    stack.append(self._List(items, frame))
+                elif op == DICT:
+                    keys = consts[arg]
+                    items = stack[len(stack) - len(keys):]
+                    del stack[len(stack) - len(keys):]
+                    stack.append(self._Dict(dict(zip(keys, items)), frame))
+                elif op == RESERVED:
+                    raise self.LiReservedWordError(code.names[arg])
+        except Exception as e:
+            if not isinstance(e, self.LiBudgetError) and frames:
+                for f in reversed(frames[1:] + [frame]):
+                    e = self.LiLiFunctionError(e, f.name)
+            self._depth = base_depth
+            raise e
+
+    # Python frames a nested Li call takes on the tree and closure engines, and
+    # bytes of C stack kept for it (built-ins calling back into Li nest C calls)
+    FRAMES_PER_CALL = 16
+    STACK_PER_CALL = 1024
+
+    # Stack of the thread the command line runs scripts in, at most
+    STACK_MAX = 1 << 31
+
+    def StackSize(self):
+        """
+        Bytes of stack a thread needs for `max_depth` nested Li calls on the
+        tree and closure engines, see `_RecursionLimit`.
+
+        :return:
+        """
+        return min(self.max_depth * self.STACK_PER_CALL + (1 << 23), self.STACK_MAX)
+
+    @contextlib.contextmanager
+    def _RecursionLimit(self, engine):
+        """
+        Raise the recursion limit of Python in the `with` block so that
+        `max_depth` nested Li calls fit on the tree and closure engines, as
+        far as the stack of the running thread allows (8 MB for the main
+        thread on most systems, the command line runs scripts in a thread of
+        `StackSize` bytes). Running out of it raises a `LiRecursionError`
+        about the Python stack. The limit is put back when the last such
+        block of the process ends.
+
+        :param engine:
+        :return:
+        """
+        if engine not in ('tree', 'closure'):
+            yield
+            return
+        calls = min(self.max_depth, _thread_stack() // self.STACK_PER_CALL)
+        with _DEEP_LOCK:
+            if _DEEP['runs'] == 0:
+                _DEEP['limit'] = sys.getrecursionlimit()
+            _DEEP['runs'] += 1
+            sys.setrecursionlimit(max(sys.getrecursionlimit(), calls * self.FRAMES_PER_CALL + _DEEP['limit']))
+        try:
+            yield
+        finally:
+            with _DEEP_LOCK:
+                _DEEP['runs'] -= 1
+                if _DEEP['runs'] == 0:
+                    sys.setrecursionlimit(_DEEP['limit'])
+
+    def Eval(self, json_dict, engine='tree', budget=None, **kwargs):
+        """
+        Run the parsed program's `main` function.
+
+        :param json_dict: the tree returned by `Parse`
+        :param engine: 'tree' walks the parse tree with `_Eval` (the reference
+            path), 'closure' compiles it first with `_Compile`, 'stack' runs
+            `_RunStack`, which does not use the Python stack for Li calls, 'vm'
+            compiles it to bytecode with `_Assemble` and runs it with `_RunVM`
+        :param budget: an optional `Budget`
+        :param kwargs:
+        :return:
+        """
+        env = self.Scope()
+        if kwargs:
+            json_dict = dict(json_dict, **kwargs)
+        self._depth = 0
+        self.error = None
+        try:
+            with self._Limits(budget), self._RecursionLimit(engine):
+                self._Define(json_dict, env, engine)
+                return env['main'].Eval([])
+        except Exception as e:
+            self.error = e
+            # after what the script printed, in the same sink
+            self.output.Write('Exception: %s\n' % e)
+        finally:
+            self._Unmap(self._mappings)
+            self.output.Flush()
+
+    def _Define(self, json_dict, env, engine):
+        """
+        Run the top level of a parsed program in `env` with `engine` (see
+        `Eval`), which binds its functions and variables there.
+
+        :param json_dict:
+        :param env:
+        :param engine:
+        :return:
+        """
+        if engine == 'closure':
+            self._Compile(json_dict)(env)
+        elif engine == 'stack':
+            self._RunStack([json_dict], env, False)
+        elif engine == 'vm':
+            self._RunVM(self._Assemble(json_dict), [], env, env.vars)
+        else:
+            self._Eval(json_dict, env)
+
+    def Profile(self, json_dict, **kwargs):
+        """
+        Run the parsed program like `Eval` with the tree engine, timing every
+        Li function and built-in call and counting `tantque` iterations.
+
+        :param json_dict: the tree returned by `Parse`
+        :param kwargs:
+        :return: the `Profiler` holding the measures
+        """
+        profiler = self.Profiler(self, json_dict)
+        self.profiler = profiler
+        try:
+            self.Eval(json_dict, 'tree', **kwargs)
+        finally:
+            self.profiler = None
+        return profiler
+
+    # -----------------------------------------------------------------------------
+    # > Embedding                                                                 #
+    # -----------------------------------------------------------------------------
+
+    class Program(object):
+        """
+        A parsed and optimized script, returned by `Load`. It cannot be
+        changed and `Run` never changes its tree, so one program can be run
+        any number of times, by any interpreter with the same keywords, from
+        any thread.
+        """
+        __slots__ = ('tree', 'optimizations')
+
+        def __init__(self, tree, optimizations=()):
+            object.__setattr__(self, 'tree', tree)
+            object.__setattr__(self, 'optimizations', tuple(optimizations))
+
+        def __setattr__(self, name, value):
+            raise AttributeError('a Program cannot be changed')
+
+    class Result(object):
+        """
+        What `Run` returns: `value`, the result of the entry function as a
+        Python value (None when it failed), `output`, what it printed,
+        `error`, the exception that stopped it or None, and `seconds`.
+        """
+        __slots__ = ('value', 'output', 'error', 'seconds')
+
+        def __init__(self, value, output, error, seconds):
+            self.value = value
+            self.output = output
+            self.error = error
+            self.seconds = seconds
+
+        def Get(self):
+            """
+            The value, or raise the error.
+
+            :return:
+            """
+            if self.error is not None:
+                raise self.error
+            return self.value
+
+    def Load(self, code, cache=None):
+        """
+        Parse a script once for `Run`.
+
+        :param code:
+        :param cache: an optional `ParseCache`
+        :return: a `Program`
+        """
+        return self.Program(self.Parse(code, cache), self.optimizations)
+
+    def Run(self, program, variables=None, entry='main', args=(), engine='tree', budget=None):
+        """
+        Run a `Program` in a fresh global scope: its top level, then the
+        function `entry` with `args`. `variables` (Python values, see
+        `_FromPython`) are bound after the top level, so they replace the
+        script's own definitions of the same names. Nothing is printed:
+        the output, the result and the error come back in a `Result`.
+
+        :param program:
+        :param variables: name -> Python value
+        :param entry:
+        :param args: Python values
+        :param engine: see `Eval`
+        :param budget: an optional `Budget`
+        :return: a `Result`
+        """
+        output = self.output
+        self.output = self.Output(io.StringIO(), 'block')
+        env = self.Scope()
+        self._depth = 0
+        value = error = None
+        start = time.perf_counter()
+        try:
+            with self._Limits(budget), self._RecursionLimit(engine):
+                self._Define(program.tree, env, engine)
+                if variables:
+                    for (k, v) in variables.items():
+                        env.vars[k] = self._FromPython(v)
+                call = self._Callable(self._VmLookup(env, entry))
+                value = self._ToPython(call([self._FromPython(arg) for arg in args]))
+        except Exception as e:
+            error = e
+        finally:
+            self._Unmap(self._mappings)
+            sink, self.output = self.output, output
+        self.error = error
+        return self.Result(value, sink.Getvalue(), error, time.perf_counter() - start)
+
+    def _FromPython(self, value):
+        """
+        Li value of a Python value: numbers, strings, None, bytes, and lists,
+        tuples and dicts of them. Li values are kept as they are.
+
+        :param value:
+        :return:
+        """
+        if isinstance(value, self.Type):
+            return value
+        if isinstance(value, (list, tuple)):
+            return self._List([self._FromPython(v) for v in value])
+        if isinstance(value, dict):
+            return self._Dict(dict([(k, self._FromPython(v)) for (k, v) in value.items()]))
+        if type(value) not in self.LITERALS:
+            raise TypeError('%s cannot be passed to Li' % type(value).__name__)
+        return self.Lit(value)
+
+    def _ToPython(self, value):
+        """
+        Python value of a Li value; functions are kept as they are.
+
+        :param value:
+        :return:
+        """
+        if type(value) is self.LiArray:
+            return value.val.tolist()
+        if isinstance(value, self.LiList):
+            return [self._ToPython(v) for v in self._Iter(value)]
+        if isinstance(value, self.LiDict):
+            return dict([(k, self._ToPython(v)) for (k, v) in value.val.items()])
+        if type(value) is self.LiBuffer:
+            # a copy, the file mapped by `mmap` is closed when the script ends
+            return bytes(value.val)
+        if isinstance(value, self.LiLiteral):
+            return value.val
+        return value
+
+    class Pool(object):
+        """
+        Interpreters created in advance and lent to one thread at a time, for
+        servers running programs from a thread pool. An interpreter is not
+        thread safe; `Run` and `Interpreter` wait for a free one when all
+        `size` are busy. `options` are passed to `Li`.
+        """
+
+        def __init__(self, size=None, **options):
+            self.size = size or os.cpu_count() or 1
+            self._idle = queue.LifoQueue()
+            for _ in range(self.size):
+                self._idle.put(Li(**options))
+
+        @contextlib.contextmanager
+        def Interpreter(self):
+            """
+            Borrow an interpreter for the duration of a `with` block.
+
+            :return:
+            """
+            li = self._idle.get()
+            try:
+                yield li
+            finally:
+                self._idle.put(li)
+
+        def Load(self, code, cache=None):
+            """
+            See `Li.Load`.
+
+            :param code:
+            :param cache:
+            :return:
+            """
+            with self.Interpreter() as li:
+                return li.Load(code, cache)
+
+        def Run(self, program, variables=None, entry='main', args=(), engine='tree', budget=None):
+            """
+            See `Li.Run`.
+
+            :param program:
+            :param variables:
+            :param entry:
+            :param args:
+            :param engine:
+            :param budget:
+            :return:
+            """
+            with self.Interpreter() as li:
+                return li.Run(program, variables, entry, args, engine, budget)
+
+    # Built-ins run in the executor of the event loop by `RunAsync`, by canonical name
+    ASYNC_BUILTINS = ('scanf', 'open', 'read', 'write', 'close',
+                      'fopen', 'fread', 'freadline', 'lines', 'fwrite', 'fclose')
+
+    # Turns of a `tantque` loop after which `RunAsync` lets other tasks run
+    ASYNC_SLICE = 1000
+
+    async def RunAsync(self, program, variables=None, entry='main', args=(), budget=None):
+        """
+        `Run` as a coroutine, with the stack engine. The `ASYNC_BUILTINS`
+        run in the executor of the event loop instead of blocking it, and
+        built-ins added by `import` may be coroutine functions. Long loops
+        give way to the other tasks every `ASYNC_SLICE` turns, so that many
+        scripts can run side by side on one loop, and on one interpreter.
+
+        Only calls made by the script itself are waited for: the functions
+        run by built-ins (`map`, `fold`, `memo`, ...) run to the end and
+        call the blocking built-ins.
+
+        :param program:
+        :param variables:
+        :param entry:
+        :param args:
+        :param budget: an optional `Budget`
+        :return: a `Result`
+        """
+        loop = asyncio.get_running_loop()
+        words = self.keywords[self.lang]
+        awaitables = {}
+        for name in self.ASYNC_BUILTINS:
+            if name in words and words[name] in self.CATALOG:
+                builtin = self.CATALOG[words[name]]
+                awaitables[words[name]] = (lambda args, f=builtin: loop.run_in_executor(None, f, args))
+        sink = self.Output(io.StringIO(), 'block')
+        with self._Limits(budget):
+            state = [0, sink, []] + [getattr(self, k) for k in self.BUDGET_STATE]
+        env = self.Scope()
+        value = error = None
+        start = time.perf_counter()
+        try:
+            await self._Resume([program.tree], env, False, awaitables, state)
+            if variables:
+                for (k, v) in variables.items():
+                    env.vars[k] = self._FromPython(v)
+            call = [entry] + [self._FromPython(arg) for arg in args]
+            value = self._ToPython(await self._Resume([call], env, True, awaitables, state))
+        except Exception as e:
+            error = e
+        finally:
+            self._Unmap(state[2])
+        self.error = error
+        return self.Result(value, sink.Getvalue(), error, time.perf_counter() - start)
+
+    # What belongs to the running script rather than to the interpreter
+    RUN_STATE = ('_depth', 'output', '_mappings') + BUDGET_STATE
+
+    async def _Resume(self, block, env, tail_pos, awaitables, state):
+        """
+        Run a block with `_RunStack` to the end, awaiting what it waits for.
+        While it runs, the `RUN_STATE` of the interpreter (depth of calls,
+        output, mapped files, budget) is that of its own script, kept in `state`.
+
+        :param block:
+        :param env:
+        :param tail_pos:
+        :param awaitables:
+        :param state: the values of `RUN_STATE`
+        :return:
+        """
+        suspended = None
+        while True:
+            saved = [getattr(self, k) for k in self.RUN_STATE]
+            for (k, v) in zip(self.RUN_STATE, state):
+                setattr(self, k, v)
+            try:
+                result = self._RunStack(block, env, tail_pos, awaitables, suspended)
+            finally:
+                state[:] = [getattr(self, k) for k in self.RUN_STATE]
+                for (k, v) in zip(self.RUN_STATE, saved):
+                    setattr(self, k, v)
+            if type(result) is not self.Suspended:
+                return result
+            suspended = result
+            try:
+                if suspended.awaited is None:
+                    await asyncio.sleep(0)
+                else:
+                    suspended.vals.append(self.Lit(await suspended.awaited))
+            except Exception as e:
+                suspended.error = e
+
+    # -----------------------------------------------------------------------------
+    # > Profiler                                                                  #
+    # -----------------------------------------------------------------------------
+
+    class Profiler(object):
+        """
+        Measures of a script run by `Profile`. Li functions are named after
+        the key they are bound to in the parse tree, anonymous ones after
+        where they are defined (`fonc@line:col`); built-ins after their
+        keyword.
+
+        - `functions`: name -> [calls, inclusive time, exclusive time]
+        - `builtins`: keyword -> [calls, time]
+        - `loops`: (function, (line, col)) -> [runs, iterations]
+        - `stacks`: tuple of the names on the call stack -> exclusive time
+
+        Tail calls replace the caller on the stack, as they do in the
+        interpreter.
+        """
+
+        def __init__(self, li, json_dict=None):
+            self.li = li
+            self.functions = {}
+            self.builtins = {}
+            self.loops = {}
+            self.stacks = {}
+            self._names = {}
+            # [name, start, time spent in callees] of each running call
+            self._stack = []
+            self._path = []
+            self._active = {}
+            if json_dict is not None:
+                self._Name(json_dict)
+
+        def _Name(self, exp):
+            """
+            Record the name each function definition of the tree is bound to.
+
+            :param exp:
+            :return:
+            """
+            if isinstance(exp, dict):
+                for (k, v) in exp.items():
+                    if k == 'lit':
+                        continue
+                    if isinstance(v, dict) and 'fonc' in v:
+                        self._names[id(v['fonc'])] = k
+                    self._Name(v)
+            elif isinstance(exp, list):
+                for x in exp:
+                    self._Name(x)
+
+        def Name(self, func):
+            """
+
+            :param func: a `LiFunction`
+            :return:
+            """
+            name = self._names.get(id(func._def))
+            if name is None:
+                pos = getattr(func._def, 'pos', None)
+                name = 'fonc@%d:%d' % pos if pos else 'fonc'
+            return name
+
+        def _Enter(self, name):
+            self._stack.append([name, time.perf_counter(), 0.0])
+            self._path.append(name)
+            self._active[name] = self._active.get(name, 0) + 1
+
+        def _Leave(self, table):
+            name, start, inner = self._stack.pop()
+            elapsed = time.perf_counter() - start
+            path = tuple(self._path)
+            self._path.pop()
+            self._active[name] -= 1
+            if self._stack:
+                self._stack[-1][2] += elapsed
+            self.stacks[path] = self.stacks.get(path, 0.0) + elapsed - inner
+            stat = table.get(name)
+            if stat is None:
+                stat = table[name] = [0, 0.0, 0.0] if table is self.functions else [0, 0.0]
+            stat[0] += 1
+            # the time of a recursive call is already in its outermost call
+            if not self._active[name]:
+                stat[1] += elapsed
+            if table is self.functions:
+                stat[2] += elapsed - inner
+
+        def Call(self, func, args):
+            """
+            Profiled counterpart of `LiFunction.Eval`.
+
+            :param func:
+            :param args:
+            :return:
+            """
+            li = self.li
+            li._depth += 1
+            try:
+                if li._depth > li.max_depth:
+                    raise li.LiRecursionError(li._depth)
+                while True:
+                    li._fuel -= 1
+                    if li._fuel < 0:
+                        li._Refuel()
+                    self._Enter(self.Name(func))
+                    try:
+                        if func._code is not None:
+                            return li._RunVM(func._code, li._VmSlots(func._code, args), func._env, func._globals)
+                        env = li.Scope(dict(zip(func._params, args)), func._env)
+                        if func._body is not None:
+                            result = func._body(env)
+                        else:
+                            result = li._ExecLiList(func._def, env, True)
+                    finally:
+                        self._Leave(self.functions)
+                    if type(result) is not li.TailCall:
+                        return result
+                    func, args = result.func, result.args
+            finally:
+                li._depth -= 1
+
+        def Builtin(self, name, args):
+            """
+
+            :param name: the keyword of the built-in
+            :param args:
+            :return:
+            """
+            self._Enter(name)
+            try:
+                return self.li.CATALOG[name](args)
+            finally:
+                self._Leave(self.builtins)
+
+        def Loop(self, exp, env, tail_pos=False):
+            """
+            Profiled counterpart of `_LoopBlock`.
+
+            :param exp: the `tantque` node
+            :param env:
+            :param tail_pos:
+            :return:
+            """
+            li = self.li
+            key = (self._path[-1] if self._path else '', getattr(exp, 'pos', None))
+            stat = self.loops.get(key)
+            if stat is None:
+                stat = self.loops[key] = [0, 0]
+            stat[0] += 1
+            for i in range(1, len(exp) - 1, 2):
+                while li._Eval(exp[i], env).val:
+                    stat[1] += 1
+                    li._fuel -= 1
+                    if li._fuel < 0:
+                        li._Refuel()
+                    li._ExecLiList(exp[i + 1], env)
+            if len(exp) % 2 == 0:
+                return li._ExecLiList(exp[-1], env, tail_pos)
+            return li.Lit(None)
+
+        def Table(self, limit=None):
+            """
+            The measures as text tables, slowest first.
+
+            :param limit: the number of rows of each table, all by default
+            :return:
+            """
+            total = sum(self.stacks.values()) or 1.0
+            lines = ['%-24s %10s %12s %12s %7s' % ('function', 'calls', 'incl (s)', 'excl (s)', 'excl %')]
+            rows = sorted(self.functions.items(), key=lambda kv: -kv[1][2])[:limit]
+            for (name, (calls, incl, excl)) in rows:
+                lines.append('%-24s %10d %12.6f %12.6f %6.1f%%' % (name, calls, incl, excl, 100 * excl / total))
+            lines.append('')
+            lines.append('%-24s %10s %12s %12s %7s' % ('built-in', 'calls', 'time (s)', 'per call', '%'))
+            rows = sorted(self.builtins.items(), key=lambda kv: -kv[1][1])[:limit]
+            for (name, (calls, spent)) in rows:
+                lines.append('%-24s %10d %12.6f %12.9f %6.1f%%' % (name, calls, spent, spent / calls, 100 * spent / total))
+            if self.loops:
+                lines.append('')
+                lines.append('%-24s %10s %12s %12s' % ('tantque', 'runs', 'iterations', 'per run'))
+                rows = sorted(self.loops.items(), key=lambda kv: -kv[1][1])[:limit]
+                for ((name, pos), (runs, iterations)) in rows:
+                    where = '%s@%d:%d' % ((name,) + pos) if pos else name
+                    lines.append('%-24s %10d %12d %12.1f' % (where, runs, iterations, iterations / runs))
+            return '\n'.join(lines) + '\n'
+
+        def Collapsed(self):
+            """
+            The exclusive time of each call stack in the collapsed format of
+            flamegraph tools: `main;fib;+ 1520`, in microseconds.
+
+            :return:
+            """
+            lines = []
+            for (path, spent) in sorted(self.stacks.items()):
+                us = int(round(spent * 1e6))
+                if us:
+                    lines.append('%s %d' % (';'.join(path), us))
+            return '\n'.join(lines) + '\n' if lines else ''
+
+    # -----------------------------------------------------------------------------
+    # > Parser                                                                    #
+    # -----------------------------------------------------------------------------
+
+    class _Parser(object):
+        """
+        Recursive-descent parser over the token stream of `_Tokenize`. Every
+        method consumes tokens from `self.i` on and returns the parsed node.
+        """
+
+        def __init__(self, li, code):
+            self.li = li
+            self.tokens = li._Tokenize(code)
+            self.i = 0
+
+        def Error(self, msg, pos=None):
+            """
+
+            :param msg:
+            :param pos:
+            :return:
+            """
+            if pos is None:
+                pos = self.tokens[self.i][2]
+            return self.li.LiSyntaxError('line %d, col %d: %s' % (pos[0], pos[1], msg))
+
+        def Peek(self, kind, text=None):
+            """
+            True when the next token is of `kind` (and spelled `text`).
+
+            :param kind:
+            :param text:
+            :return:
+            """
+            token = self.tokens[self.i]
+            return token[0] == kind and (text is None or token[1] == text)
+
+        def Expect(self, text):
+            """
+
+            :param text:
+            :return:
+            """
+            if not self.Peek('punct', text):
+                raise self.Error("expected '%s'" % text)
+            self.i += 1
+
+        def Program(self):
+            """
+
+            :return:
+            """
+            d = self.li.NodeDict((1, 1))
+            while not self.Peek('end'):
+                pos = self.tokens[self.i][2]
+                statement = self.Expr()
+                if not isinstance(statement, dict):
+                    raise self.Error('a script is made of `name: value` definitions', pos)
+                d.update(statement)
+                d.child_pos.update(statement.child_pos)
+            return d
+
+        def Sequence(self, closing):
+            """
+            Parse expressions up to the `closing` bracket.
+
+            :param closing:
+            :return: the expressions and their positions
+            """
+            tokens = self.tokens
+            items, child_pos = [], []
+            while True:
+                kind, text, pos, _ = tokens[self.i]
+                if text in ')]}' and kind == 'punct' or kind == 'end':
+                    if text != closing or kind == 'end':
+                        raise self.Error("expected '%s'" % closing)
+                    break
+                child_pos.append(pos)
+                items.append(self.Expr())
+            self.i += 1
+            return items, child_pos
+
+        def Block(self):
+            """
+
+            :return:
+            """
+            pos = self.tokens[self.i][2]
+            self.Expect('{')
+            return self.li.Node(pos, *self.Sequence('}'))
+
+        def Call(self, head, pos, head_pos):
+            """
+
+            :param head:
+            :param pos:
+            :param head_pos:
+            :return:
+            """
+            self.Expect('(')
+            args, child_pos = self.Sequence(')')
+            return self.li.Node(pos, [head] + args, [head_pos] + child_pos)
+
+        def Function(self, pos):
+            """
+
+            :param pos:
+            :return:
+            """
+            self.Expect('(')
+            params = self.li.Node(self.tokens[self.i][2])
+            while not self.Peek('punct', ')'):
+                if not self.Peek('atom'):
+                    raise self.Error('expected a parameter name')
+                params.append(self.tokens[self.i][1])
+                params.child_pos.append(self.tokens[self.i][2])
+                self.i += 1
+            self.i += 1
+            body_pos = self.tokens[self.i][2]
+            return self.li.NodeDict(pos, {'params': params, 'fonc': self.Block()},
+                                    {'params': params.pos, 'fonc': body_pos})
+
+        def Branches(self, node):
+            """
+            Append a `cond {block}` pair to an `if`/`tantque` node.
+
+            :param node:
+            :return:
+            """
+            node.child_pos.append(self.tokens[self.i][2])
+            node.append(self.Expr())
+            node.child_pos.append(self.tokens[self.i][2])
+            node.append(self.Block())
+
+        def If(self, pos):
+            """
+
+            :param pos:
+            :return:
+            """
+            node = self.li.Node(pos, ['if'], [pos])
+            self.Branches(node)
+            while self.Peek('atom', 'elif'):
+                self.i += 1
+                self.Branches(node)
+            if self.Peek('atom', 'else'):
+                self.i += 1
+                node.child_pos.append(self.tokens[self.i][2])
+                node.append(self.Block())
+            return node
+
+        def Loop(self, pos):
+            """
+
+            :param pos:
+            :return:
+            """
+            node = self.li.Node(pos, ['tantque'], [pos])
+            self.Branches(node)
+            return node
+
+        def Expr(self):
+            """
+
+            :return:
+            """
+            kind, text, pos, _ = self.tokens[self.i]
+            self.i += 1
+            if kind == 'string':
+                return self.li.NodeDict(pos, {'lit': self.li._Unescape(text[1:-1])}, {'lit': pos})
+            if kind == 'atom':
+                following = self.tokens[self.i]
+                if following[0] == 'punct' and not following[3]:
+                    if following[1] == ':':
+                        self.i += 1
+                        value_pos = self.tokens[self.i][2]
+                        return self.li.NodeDict(pos, {text: self.Expr()}, {text: value_pos})
+                    if following[1] == '(':
+                        if text == 'fonc':
+                            return self.Function(pos)
+                        node = self.Call(text, pos, pos)
+                        while self.Peek('punct', '('):
+                            node = self.Call(node, pos, pos)
+                        return node
+                if text == 'if':
+                    return self.If(pos)
+                if text == 'tantque':
+                    return self.Loop(pos)
+                return self.li._GetNum(text)
+            if kind == 'punct' and text == '[':
+                items, child_pos = self.Sequence(']')
+                return self.li.NodeDict(pos, {'lit': self.li.Node(pos, items, child_pos)}, {'lit': pos})
+            if kind == 'punct' and text == '{':
+                d = self.li.NodeDict(pos)
+                for entry_pos, entry in zip(*reversed(self.Sequence('}'))):
+                    if not isinstance(entry, dict):
+                        raise self.Error('dictionary entries must be `name: value`', entry_pos)
+                    d.update(entry)
+                    d.child_pos.update(entry.child_pos)
+                return self.li.NodeDict(pos, {'lit': d}, {'lit': pos})
+            if kind == 'end':
+                raise self.Error('unexpected end of script', pos)
+            raise self.Error("unexpected '%s'" % text, pos)
+
+    TOKENS = re.compile(r'''
+        [\s,;]*
+        (?:
+          (?P<string>"(?:[^"\\]|\\.)*")
+        | (?P<punct>[()\[\]{}:])
+        | (?P<atom>[^\s,;()\[\]{}:"]+)
+        )
+    ''', re.VERBOSE | re.DOTALL)
+
+    def _Tokenize(self, code):
+        """
+        Split the source in a single pass over the buffer.
+
+        :param code:
+        :return: a list of (kind, text, (line, col), preceded_by_space) tuples
+            terminated by an 'end' token
+        """
+        tokens = []
+        append = tokens.append
+        count = code.count
+        line, line_start, end = 1, 0, 0
+        for m in self.TOKENS.finditer(code):
+            if m.start() != end:
+                break
+            kind = m.lastgroup
+            start, stop = m.span(kind)
+            newlines = count('\n', end, start)
+            if newlines:
+                line += newlines
+                line_start = code.rindex('\n', end, start) + 1
+            append((kind, m.group(kind), (line, start - line_start + 1), start != end or not end))
+            end = stop
+            if kind == 'string':
+                newlines = count('\n', start, stop)
+                if newlines:
+                    line += newlines
+                    line_start = code.rindex('\n', start, stop) + 1
+        rest = code[end:].lstrip(string.whitespace + ',;')
+        offset = len(code) - len(rest)
+        line += count('\n', end, offset)
+        pos = (line, offset - code.rfind('\n', 0, offset))
+        if rest:
+            raise self.LiSyntaxError('line %d, col %d: unterminated string' % pos)
+        append(('end', '', pos, True))
+        return tokens
+
+    def _Unescape(self, text):
+        """
+        `\\n` is a newline, any other escaped character stands for itself.
+
+        :param text:
+        :return:
+        """
+        if '\\' not in text:
+            return text
+        return re.sub(r'\\(.)', lambda m: '\n' if m.group(1) == 'n' else m.group(1), text, flags=re.DOTALL)
+
+    def _GetNum(self, num):
+        """
+
+        :param num:
+        :return:
+        """
+        if num == 'null':
+            return None
+        if num.isdigit():
+            return int(num)
+        if not (num[:1].isdigit() or num[:1] in '+-.iInN'):
+            return num
+        try:
+            return float(num)
+        except Exception as es:
+            return num
+
+    def Parse(self, code, cache=None):
+        """
+
+        :param code:
+        :param cache: an optional `ParseCache`
+        :return:
+        """
+        if cache is None:
+            tree = self._Parser(self, code).Program()
+        else:
+            key = cache.Key(self, code)
+            tree = cache.Get(key)
+            if tree is None:
+                tree = self._Parser(self, code).Program()
+                cache.Put(key, tree)
+        if self.optimize:
+            self.optimizations = self.Optimize(tree)
+        return tree
+
+    # -----------------------------------------------------------------------------
+    # > Optimizer                                                                 #
+    # -----------------------------------------------------------------------------
+
+    # Built-ins folded when all their arguments are constants, by canonical name
+    FOLDABLE = ('+', '-', '*', '/', '=', '!', '<', '>', '<=', '>=', 'round', 'type', 'len',
+                'find', 'replace', 'format')
+
+    # Longest string or list a folded call may build, longer ones are left to run
+    FOLD_MAX_SIZE = 1024
+
+    # Characters of a folded value shown in the report of `Optimize`
+    FOLD_REPORT_WIDTH = 40
+
+    def Optimize(self, tree):
+        """
+        Rewrite a parsed program in place: calls of `FOLDABLE` built-ins on
+        constants are replaced by their result, `if` branches whose condition
+        is constant and `tantque` loops that never run are removed, and list
+        literals of constants are built once as a `ConstList`. `Parse` runs it
+        unless the interpreter was created with `optimize=False`.
+
+        :param tree: the tree returned by `_Parser.Program`
+        :return: what was done, as ((line, col), message) pairs
+        """
+        optimizer = self._Optimizer(self)
+        optimizer.Expr(tree)
+        return optimizer.report
+
+    class _Optimizer(object):
+        """
+        One pass over the parse tree for `Optimize`, bottom-up: the operands
+        of a node are rewritten before the node itself.
+        """
+
+        def __init__(self, li):
+            self.li = li
+            words = li.keywords[li.lang]
+            self.foldable = set([words[name] for name in li.FOLDABLE if name in words])
+            self.report = []
+
+        def Const(self, exp):
+            """
+            The Li value of a constant node: a number, a string or null
+            literal, or a folded value; None for anything else.
+
+            :param exp:
+            :return:
+            """
+            li = self.li
+            t = type(exp)
+            if t is int or t is float or t is bool:
+                return li.Lit(exp)
+            if t is li.NodeDict and len(exp) == 1 and 'lit' in exp and (exp['lit'] is None or type(exp['lit']) is str):
+                return li.Lit(exp['lit'])
+            if t is li.LiNumber or t is li.LiString or t is li.LiNull:
+                return exp
+            return None
+
+        def Expr(self, exp):
+            """
+
+            :param exp:
+            :return: the rewritten node
+            """
+            li = self.li
+            if isinstance(exp, dict):
+                if 'lit' in exp:
+                    lit = exp['lit']
+                    if isinstance(lit, list):
+                        exp['lit'] = self.List(lit)
+                    elif isinstance(lit, dict):
+                        for k in lit:
+                            lit[k] = self.Expr(lit[k])
+                elif 'fonc' in exp:
+                    exp['fonc'] = self.Block(exp['fonc'])
+                else:
+                    for k in exp:
+                        exp[k] = self.Expr(exp[k])
+                return exp
+            if isinstance(exp, list) and exp:
+                head = exp[0]
+                if head == 'if' or head == 'tantque':
+                    return self.Branches(exp)
+                for i in range(len(exp)):
+                    exp[i] = self.Expr(exp[i])
+                if isinstance(head, str) and head in self.foldable:
+                    args = [self.Const(x) for x in exp[1:]]
+                    if all(arg is not None for arg in args):
+                        # the size checks of the budgets stop a large value before it is built
+                        limit, li._max_size = li._max_size, li.FOLD_MAX_SIZE
+                        try:
+                            val = li.CATALOG[head](args)
+                        except Exception:
+                            # left for the script to raise when it gets there
+                            return exp
+                        finally:
+                            li._max_size = limit
+                        if isinstance(val, li.LiString):
+                            val = val.val
+                        t = type(val)
+                        if t is int or t is float or t is bool:
+                            self.Folded(exp, head, val)
+                            return val
+                        if t is str or val is None:
+                            self.Folded(exp, head, li.Lit(val))
+                            return li.NodeDict(exp.pos, {'lit': val}, {'lit': exp.pos})
+            return exp
+
+        def Folded(self, exp, head, val):
+            """
+            Report the folding of the call `exp` into `val`, shortened to
+            `FOLD_REPORT_WIDTH` characters.
+
+            :param exp:
+            :param head:
+            :param val:
+            :return:
+            """
+            shown = str(val)
+            width = self.li.FOLD_REPORT_WIDTH
+            if len(shown) > width:
+                shown = '%s... (%d characters)' % (shown[:width], len(shown))
+            self.report.append((exp.pos, 'folded %s(...) into %s' % (head, shown)))
+
+        def Branches(self, exp):
+            """
+            Drop the `cond {block}` pairs of an `if` or `tantque` node whose
+            condition is constant. For an `if`, a true one becomes the else
+            block and ends the node. When no pair would be left, the first
+            constant one is kept, as the engines expect at least one.
+
+            :param exp:
+            :return:
+            """
+            head = exp[0]
+            items, positions = [head], [exp.child_pos[0] if exp.child_pos else exp.pos]
+            n = len(exp)
+            orelse = kept = None
+            for i in range(1, n - 1, 2):
+                cond = self.Expr(exp[i])
+                value = self.Const(cond)
+                if value is None or head == 'tantque' and value.val:
+                    items.extend([cond, self.Block(exp[i + 1])])
+                    positions.extend(exp.child_pos[i:i + 2])
+                    continue
+                if kept is None:
+                    kept = (cond, i)
+                if value.val:
+                    self.report.append((exp.pos, 'if: condition always true, later branches removed'))
+                    orelse = i + 1
+                    break
+                self.report.append((exp.pos, '%s: condition always false, branch removed' % head))
+            else:
+                if n % 2 == 0:
+                    orelse = n - 1
+            if len(items) == 1 and kept is not None:
+                (cond, i) = kept
+                items.extend([cond, self.Block(exp[i + 1])])
+                positions.extend(exp.child_pos[i:i + 2])
+                if orelse == i + 1:
+                    orelse = None
+            if orelse is not None:
+                items.append(self.Block(exp[orelse]))
+                positions.extend(exp.child_pos[orelse:orelse + 1])
+            return self.li.Node(exp.pos, items, positions)
+
+        def Block(self, stmts):
+            """
+            Rewrite the statements of a block; an `if` or `tantque` left with a
+            single constant condition is replaced by the statements of the
+            block that runs.
+
+            :param stmts:
+            :return:
+            """
+            li = self.li
+            items, positions = [], []
+            last = len(stmts) - 1
+            for (i, stmt) in enumerate(stmts):
+                pos = stmts.child_pos[i] if i < len(stmts.child_pos) else None
+                stmt = self.Expr(stmt)
+                value = None
+                if type(stmt) is li.Node and stmt and stmt[0] in ('if', 'tantque') and len(stmt) in (3, 4):
+                    value = self.Const(stmt[1])
+                    if value is not None and stmt[0] == 'tantque' and value.val:
+                        value = None
+                if value is not None:
+                    block = stmt[2] if value.val else stmt[3] if len(stmt) == 4 else []
+                    items.extend(block)
+                    positions.extend(getattr(block, 'child_pos', []))
+                    if i == last and not block:
+                        # the block, like the `if`, evaluated to null
+                        items.append(li.NodeDict(pos, {'lit': None}, {'lit': pos}))
+                        positions.append(pos)
+                else:
+                    items.append(stmt)
+                    positions.append(pos)
+            return li.Node(getattr(stmts, 'pos', None), items, positions)
+
+        def List(self, val):
+            """
+            Rewrite the elements of a list literal, into a `ConstList` when
+            they are all constants.
+
+            :param val:
+            :return:
+            """
+            li = self.li
+            for i in range(len(val)):
+                val[i] = self.Expr(val[i])
+            if not val:
+                return val
+            items = [self.Const(x) for x in val]
+            if any(item is None for item in items):
+                return val
+            packed = li._Unboxed(items) if len(items) >= li.ARRAY_MIN_SIZE else None
+            self.report.append((val.pos, 'list of %d constants built once' % len(items)))
+            return li.ConstList(val.pos, items, val.child_pos, packed)
+
+    # -----------------------------------------------------------------------------
+    # > Parse cache                                                               #
+    # -----------------------------------------------------------------------------
+
+    class ParseCache(object):
+        """
+        On-disk cache of parse trees, one pickle per script under `path`.
+
+        Entries are keyed by the hash of the script, the interpreter version,
+        the source of this module and the keywords of the language, so any
+        change to one of them simply misses. Files are written to a temporary
+        name and renamed into place; once the directory grows over
+        `max_size` bytes the least recently used entries are removed.
+        """
+        SUFFIX = '.lic'
+
+        def __init__(self, path, max_size=64 * 1024 * 1024):
+            self.path = path
+            self.max_size = max_size
+            self.hits = 0
+            self.misses = 0
+            os.makedirs(path, exist_ok=True)
+
+        def Key(self, li, code):
+            """
+
+            :param li:
+            :param code:
+            :return:
+            """
+            h = hashlib.sha256()
+            # classes pickle by module name, which is '__main__' when li.py is run as a script
+            for part in (li.version, __name__, _source_digest(), repr(sorted(li.keywords[li.lang].items())), code):
+                h.update(part.encode('utf-8', 'surrogatepass'))
+                h.update(b'\0')
+            return h.hexdigest()
+
+        def Get(self, key):
+            """
+
+            :param key:
+            :return: the cached tree, None on a miss
+            """
+            name = os.path.join(self.path, key + self.SUFFIX)
+            # the collector would run many times over the freshly allocated nodes
+            enabled = gc.isenabled()
+            gc.disable()
+            try:
+                with open(name, 'rb') as f:
+                    tree = pickle.load(f)
+                os.utime(name)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            except Exception:
+                # truncated or written by an incompatible Python, drop it
+                self.misses += 1
+                self._Remove(name)
+                return None
+            finally:
+                if enabled:
+                    gc.enable()
+            self.hits += 1
+            return tree
+
+        def Put(self, key, tree):
+            """
+
+            :param key:
+            :param tree:
+            :return:
+            """
+            try:
+                data = pickle.dumps(tree, pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                # too deep, or classes pickle cannot find again: keep parsing
+                return
+            fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, os.path.join(self.path, key + self.SUFFIX))
+            except OSError:
+                self._Remove(tmp)
+                return
+            self.Evict()
+
+        def Evict(self):
+            """
+            Remove the least recently used entries until the cache fits in
+            `max_size`.
+
+            :return:
+            """
+            entries, total = [], 0
+            for entry in os.scandir(self.path):
+                if entry.name.endswith(self.SUFFIX):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            entries.sort()
+            for (mtime, size, name) in entries:
+                if total <= self.max_size:
+                    break
+                self._Remove(name)
+                total -= size
+
+        def _Remove(self, name):
+            """
+
+            :param name:
+            :return:
+            """
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+    def Present(self):
 
         print("Li " + str(self.version) + " Build using Python 3.7.3")
         print('Hit `li your_script.l`, for more information contact @sanixdarker.')
@@ -974,9 +5152,98 @@ class Li:
 
 
 if __name__ == '__main__':
-    li = Li()
+    parser = argparse.ArgumentParser(description='Run Li scripts.')
+    parser.add_argument('scripts', nargs='*', metavar='script')
+    parser.add_argument('--engine', choices=['tree', 'closure', 'stack', 'vm'], default='tree',
+                        help='evaluation engine (default: tree)')
+    parser.add_argument('--max-depth', type=int, default=100000,
+                        help='maximum number of nested Li calls (default: 100000)')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='keep parsed scripts in DIR and reuse them while the source is unchanged')
+    parser.add_argument('--cache-size', type=int, default=64, metavar='MB',
+                        help='size above which the oldest cache entries are removed (default: 64)')
+    parser.add_argument('--output', metavar='FILE',
+                        help='write what the scripts print to FILE instead of the standard output')
+    parser.add_argument('--buffering', choices=Li.Output.MODES,
+                        help='when printed text is written out: per block, per line or at once '
+                             '(default: line on a terminal, block otherwise)')
+    parser.add_argument('--profile', action='store_true',
+                        help='time the Li functions, built-ins and loops of each script (tree engine) '
+                             'and print the result on the standard error')
+    parser.add_argument('--profile-stacks', metavar='FILE',
+                        help='with --profile, write the call stacks to FILE in the collapsed format of '
+                             'flamegraph tools')
+    parser.add_argument('--no-optimize', action='store_true',
+                        help='run the scripts as parsed, without folding constant expressions')
+    parser.add_argument('--optimizations', action='store_true',
+                        help='print what constant folding changed in each script on the standard error')
+    parser.add_argument('--call-stats', action='store_true',
+                        help='print the hit rates of the call site caches of the tree engine on the '
+                             'standard error')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='number of worker processes of pmap and pfiltre (default: one per CPU)')
+    parser.add_argument('--jobs', type=int, metavar='N',
+                        help='run each script in its own interpreter, N at a time in worker processes '
+                             '(0: one per CPU), and print a summary on the standard error')
+    parser.add_argument('--max-steps', type=int, metavar='N',
+                        help='stop a script after N Li function calls and tantque turns')
+    parser.add_argument('--timeout', type=float, metavar='S',
+                        help='stop a script after S seconds')
+    parser.add_argument('--max-size', type=int, metavar='N',
+                        help='stop a script that builds a list or string longer than N')
+    options = parser.parse_args()
+    if options.profile and options.engine != 'tree':
+        parser.error('--profile only works with the tree engine')
+    if options.jobs is not None and (options.profile or options.call_stats or options.optimizations):
+        parser.error('--jobs cannot be used with --profile, --call-stats or --optimizations')
+
+    stacks = open(options.profile_stacks, 'w') if options.profile and options.profile_stacks else None
+    out = open(options.output, 'w', encoding='utf-8') if options.output else None
+    li = Li(max_depth=options.max_depth, output=Li.Output(out, options.buffering),
+            optimize=not options.no_optimize, workers=options.workers)
+    if options.call_stats:
+        li.TrackCallSites()
+    cache = Li.ParseCache(options.cache, options.cache_size * 1024 * 1024) if options.cache else None
+    budget = None
+    if (options.max_steps, options.timeout, options.max_size) != (None, None, None):
+        budget = Li.Budget(steps=options.max_steps, seconds=options.timeout, size=options.max_size)
     li.Present()
-    for arg in sys.argv[1:]:
-        with open(arg, 'r') as f:
-            li.Eval(li.Parse(f.read()))
+    failed = 0
+    if options.jobs is not None:
+        settings = {'engine': options.engine, 'max_depth': options.max_depth, 'optimize': not options.no_optimize,
+                    'cache': options.cache, 'cache_size': options.cache_size * 1024 * 1024, 'budget': budget}
+        failed = _batch(options.scripts, options.jobs or os.cpu_count() or 1, settings,
+                        out if out is not None else sys.stdout, sys.stderr)
+    else:
+        def run_scripts():
+            for arg in options.scripts:
+                with open(arg, 'r') as f:
+                    code = f.read()
+                try:
+                    tree = li.Parse(code, cache)
+                except Li.LiSyntaxError as e:
+                    print('SyntaxError:', arg, e)
+                    continue
+                if options.optimizations:
+                    for ((line, col), message) in li.optimizations:
+                        sys.stderr.write('%s:%d:%d: %s\n' % (arg, line, col, message))
+                if options.profile:
+                    profiler = li.Profile(tree, budget=budget)
+                    sys.stderr.write('-- profile of %s\n%s' % (arg, profiler.Table()))
+                    if stacks is not None:
+                        stacks.write(profiler.Collapsed())
+                else:
+                    li.Eval(tree, engine=options.engine, budget=budget)
+                if options.call_stats:
+                    sys.stderr.write('-- call sites of %s\n%s' % (arg, li.CallSiteStats()))
+                    li.TrackCallSites()
+
+        # with a stack deep enough for --max-depth nested calls
+        _run_with_stack(run_scripts, li.StackSize())
+    if out is not None:
+        out.close()
+    if stacks is not None:
+        stacks.close()
     print()
+    if failed:
+        sys.exit(1)